@@ -0,0 +1,355 @@
+"""
+Benchmark every encode and recover stage and the full pipelines.
+
+Synthetic inputs are generated for each requested size. Each stage class
+runs on its own in a forked child process, so its peak RSS and I/O
+counters are not mixed with other stages. Results are written as JSON and
+can be compared against an earlier run to flag throughput regressions.
+
+Example
+-------
+    python -m benchmarks.bench_pipeline --sizes 1M 64M 1G --output bench.json
+    python -m benchmarks.bench_pipeline --sizes 64M --compare bench.json
+"""
+
+import argparse
+import copy
+import filecmp
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from pipeline.encode import encode_file
+from pipeline.recover import recover_file
+from src.encoding.config_reader import read_config
+from src.encoding.metadata1_appender import Metadata1Appender
+from src.encoding.metadata2_adder import Metadata2Adder
+from src.encoding.padding_prepend import PaddingAdder
+from src.encoding.rs_encoding import RSEncoding
+from src.recover.metadata1_remover import Metadata1Remover
+from src.recover.metadata2_remover import Metadata2Remover
+from src.recover.remove_padding import PaddingRemover
+from src.recover.rs_decode import RSDecoder
+
+MB = 1024 * 1024
+GENERATE_CHUNK = 64 * MB
+SIZE_UNITS = {"K": 1024, "M": MB, "G": 1024 * MB}
+
+
+def parse_size(text: str) -> int:
+    """Parse sizes such as ``512K``, ``64M`` or ``2G`` into bytes."""
+    text = text.strip().upper().removesuffix("B")
+    unit = SIZE_UNITS.get(text[-1:], 1)
+    number = text[:-1] if text[-1:] in SIZE_UNITS else text
+    return int(float(number) * unit)
+
+
+def generate_input(path: Path, size: int, seed: int = 0):
+    """Write ``size`` pseudo-random bytes to ``path`` in bounded chunks."""
+    rng = np.random.default_rng(seed)
+    with open(path, "wb") as f:
+        for offset in range(0, size, GENERATE_CHUNK):
+            f.write(rng.bytes(min(GENERATE_CHUNK, size - offset)))
+
+
+def _io_counters() -> dict:
+    """Bytes read and written by this process (Linux /proc/self/io)."""
+    counters = {}
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                counters[key] = int(value)
+    except OSError:
+        pass
+    return counters
+
+
+def _peak_rss() -> int:
+    """Peak RSS in bytes of this process and its finished children."""
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is KB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale
+
+
+def _child(conn, func, args):
+    io_before = _io_counters()
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+    except Exception as e:
+        conn.send((None, None, repr(e)))
+        return
+    wall = time.perf_counter() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    io_after = _io_counters()
+
+    cpu = sum(
+        getattr(after, field) - getattr(before, field)
+        for before, after in ((usage_before, usage), (children_before, children))
+        for field in ("ru_utime", "ru_stime")
+    )
+    metrics = {
+        "seconds": wall,
+        "cpu_seconds": cpu,
+        "peak_rss_bytes": _peak_rss(),
+        # wchar/rchar count bytes passed to write/read calls, whether or not
+        # they reached the disk yet; worker processes are not included.
+        "bytes_written": io_after.get("wchar", 0) - io_before.get("wchar", 0),
+        "bytes_read": io_after.get("rchar", 0) - io_before.get("rchar", 0),
+    }
+    conn.send((result, metrics, None))
+
+
+def measure(func, *args):
+    """
+    Run ``func(*args)`` in a forked child and return ``(result, metrics)``.
+
+    The result must be picklable. Exceptions in the child are re-raised
+    here as RuntimeError.
+    """
+    ctx = multiprocessing.get_context("fork")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(child_conn, func, args))
+    process.start()
+    child_conn.close()
+    try:
+        result, metrics, error = parent_conn.recv()
+    except EOFError:
+        error = f"stage process exited with code {process.exitcode}"
+    process.join()
+    if error is not None:
+        raise RuntimeError(f"{getattr(func, '__name__', func)} failed: {error}")
+    return result, metrics
+
+
+def _metadata1_stage(config, path):
+    appender = Metadata1Appender(config, path)
+    out = appender.run()
+    return out, appender.metadata, appender.file_size + len(appender.footer())
+
+
+def _rs_encoding_stage(config, path):
+    return RSEncoding(config, path).run()
+
+
+def _padding_stage(config, path):
+    return PaddingAdder(config, path).run()
+
+
+def _metadata2_stage(config, path, metadata1, payload_size):
+    return Metadata2Adder(
+        config, path, metadata1=metadata1, payload_size=payload_size
+    ).run()
+
+
+def _metadata2_remove_stage(config, path):
+    return Metadata2Remover(config, path).run()
+
+
+def _padding_remove_stage(config, padding, path):
+    keep = config["decoding"].get("keep_removed_padding", False)
+    return PaddingRemover(padding, path, keep).run()[1]
+
+
+def _rs_decoding_stage(config, metadata, path):
+    return RSDecoder(metadata, path, config["decoding"]).run()
+
+
+def _metadata1_remove_stage(path, metadata1):
+    return Metadata1Remover(path, metadata1).run()
+
+
+def _file_size(path) -> int:
+    return Path(path).stat().st_size
+
+
+class PipelineBenchmark:
+    """Time each stage class and the full pipelines for a set of input sizes."""
+
+    def __init__(self, config, sizes, workdir: Path, repeat: int = 1):
+        self.config = copy.deepcopy(config)
+        self.config.setdefault("decoding", {})
+        self.sizes = sizes
+        self.workdir = Path(workdir)
+        self.repeat = max(1, repeat)
+        self.results = []
+
+    def _record(self, size, stage, metrics, data_bytes):
+        seconds = metrics["seconds"]
+        entry = {
+            "input_bytes": size,
+            "stage": stage,
+            "data_bytes": data_bytes,
+            "mb_per_s": data_bytes / MB / seconds if seconds > 0 else None,
+            **metrics,
+        }
+        self.results.append(entry)
+        rate = entry["mb_per_s"]
+        print(
+            f"{size / MB:>10.1f} MB  {stage:<24} {seconds:>9.3f} s  "
+            f"{rate if rate is not None else 0:>9.1f} MB/s  "
+            f"rss {metrics['peak_rss_bytes'] / MB:>8.1f} MB  "
+            f"written {metrics['bytes_written'] / MB:>10.1f} MB"
+        )
+
+    def _run_stages(self, size, source, dest):
+        """Run the encode and recover stages one class at a time."""
+        config = copy.deepcopy(self.config)
+        config["encoding"]["destination_directory"] = str(dest)
+        config["encoding"]["streaming"] = False
+        dest.mkdir(parents=True, exist_ok=True)
+
+        (path, metadata1, payload_size), m = measure(_metadata1_stage, config, source)
+        self._record(size, "Metadata1Appender", m, size)
+
+        path, m = measure(_rs_encoding_stage, config, path)
+        self._record(size, "RSEncoding", m, payload_size)
+
+        encoded_size = _file_size(path)
+        path, m = measure(_padding_stage, config, path)
+        self._record(size, "PaddingAdder", m, encoded_size)
+
+        path, m = measure(_metadata2_stage, config, path, metadata1, payload_size)
+        self._record(size, "Metadata2Adder", m, _file_size(path))
+
+        artifact_size = _file_size(path)
+        (metadata, path), m = measure(_metadata2_remove_stage, config, path)
+        self._record(size, "Metadata2Remover", m, artifact_size)
+
+        padded_size = _file_size(path)
+        path, m = measure(_padding_remove_stage, config, metadata["padding"], path)
+        self._record(size, "PaddingRemover", m, padded_size)
+
+        path, m = measure(_rs_decoding_stage, config, metadata, path)
+        self._record(size, "RSDecoder", m, size)
+
+        path, m = measure(_metadata1_remove_stage, path, metadata.get("metadata1"))
+        self._record(size, "Metadata1Remover", m, size)
+        return path
+
+    def _run_pipelines(self, size, source, dest):
+        """Run pipeline/encode.py and pipeline/recover.py end to end."""
+        config = copy.deepcopy(self.config)
+        config["encoding"]["destination_directory"] = str(dest)
+        dest.mkdir(parents=True, exist_ok=True)
+
+        artifact, m = measure(encode_file, config, source)
+        self._record(size, "pipeline/encode.py", m, size)
+
+        recovered, m = measure(recover_file, config, artifact)
+        self._record(size, "pipeline/recover.py", m, size)
+        return recovered
+
+    def run(self):
+        for size in self.sizes:
+            for _ in range(self.repeat):
+                case_dir = Path(tempfile.mkdtemp(dir=self.workdir))
+                try:
+                    source = case_dir / "input.bin"
+                    generate_input(source, size)
+                    for runner, name in (
+                        (self._run_stages, "stages"),
+                        (self._run_pipelines, "pipeline"),
+                    ):
+                        recovered = runner(size, source, case_dir / name)
+                        if not filecmp.cmp(source, recovered, shallow=False):
+                            raise RuntimeError(
+                                f"Recovered file differs from input ({name}, {size})"
+                            )
+                finally:
+                    shutil.rmtree(case_dir, ignore_errors=True)
+        return self.results
+
+    def report(self) -> dict:
+        return {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "config": self.config,
+            "results": self.results,
+        }
+
+
+def _median_rates(results) -> dict:
+    rates = {}
+    for entry in results:
+        if entry["mb_per_s"] is not None:
+            key = (entry["input_bytes"], entry["stage"])
+            rates.setdefault(key, []).append(entry["mb_per_s"])
+    return {key: float(np.median(values)) for key, values in rates.items()}
+
+
+def compare(current: dict, baseline: dict, threshold: float):
+    """
+    Return the (size, stage, baseline MB/s, current MB/s) rows whose
+    throughput dropped by more than ``threshold`` (a fraction).
+    """
+    now = _median_rates(current["results"])
+    before = _median_rates(baseline["results"])
+    regressions = []
+    for key, rate in sorted(now.items()):
+        old = before.get(key)
+        if old and rate < old * (1 - threshold):
+            regressions.append((*key, old, rate))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--config", default="configs/configs.yaml")
+    parser.add_argument(
+        "--sizes", nargs="+", default=["1M", "16M", "256M"], help="e.g. 1M 64M 2G"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--workdir", default=None, help="Scratch directory")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10, help="Allowed MB/s drop (0.10)"
+    )
+    args = parser.parse_args(argv)
+
+    config = read_config(args.config)
+    workdir = Path(args.workdir or tempfile.gettempdir())
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    bench = PipelineBenchmark(
+        config, [parse_size(s) for s in args.sizes], workdir, args.repeat
+    )
+    bench.run()
+    report = bench.report()
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(report, baseline, args.threshold)
+        for size, stage, old, new in regressions:
+            print(
+                f"REGRESSION {stage} @ {size / MB:.1f} MB: "
+                f"{old:.1f} -> {new:.1f} MB/s"
+            )
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
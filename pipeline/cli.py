@@ -0,0 +1,195 @@
+"""
+Command-line entry point for batch encoding and recovery.
+
+Examples
+--------
+    python -m pipeline.cli encode data/ extra.bin --cpu-jobs 4 --io-jobs 8
+    python -m pipeline.cli recover --manifest artifacts.txt --report out.json
+    python -m pipeline.cli range artifact.dll 1048576 4096 -o part.bin
+    python -m pipeline.cli verify artifacts/ --report health.json
+    python -m pipeline.cli repair damaged.dll
+    pg_dump db | python -m pipeline.cli encode-stream -o db.sql --name db.sql
+    python -m pipeline.cli recover-stream db.sql.dll | psql db
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from pipeline.recover_range import recover_range
+from pipeline.scheduler import BatchScheduler, collect_inputs
+from pipeline.stream import encode_stream, recover_stream
+from pipeline.verify import repair_file, verify_file
+from src.encoding.config_reader import read_config
+from src.logging.metrics import configure_metrics
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def _print_result(result):
+    if result.ok:
+        print(f"OK      {result.source} -> {result.output} ({result.seconds:.2f} s)")
+    else:
+        print(f"FAILED  {result.source}: {result.error}", file=sys.stderr)
+
+
+def _batch(args, configs) -> int:
+    suffix = ""
+    if args.command == "recover":
+        suffix = configs["encoding"].get("encoded_file_suffix", "")
+    files = collect_inputs(args.paths, args.manifest, suffix)
+    if not files:
+        print("No input files given", file=sys.stderr)
+        return EXIT_USAGE
+
+    scheduler = BatchScheduler(configs, args.command, args.cpu_jobs, args.io_jobs)
+    results = scheduler.run(files, on_result=_print_result)
+
+    failed = sum(not r.ok for r in results)
+    print(f"{len(results) - failed} succeeded, {failed} failed")
+    if args.report:
+        Path(args.report).write_text(
+            json.dumps([r.as_dict() for r in results], indent=2)
+        )
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def _range(args, configs) -> int:
+    try:
+        recover_range(configs, Path(args.artifact), args.offset, args.length, args.out)
+    except Exception as e:
+        print(f"FAILED  {args.artifact}: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    print(f"OK      {args.artifact} -> {args.out}")
+    return EXIT_OK
+
+
+def _stream(args, configs) -> int:
+    # Status goes to stderr: stdout may be the recovered data.
+    try:
+        if args.command == "encode-stream":
+            output = encode_stream(configs, sys.stdin.buffer, Path(args.out), args.name)
+        else:
+            output = "stdout"
+            recover_stream(configs, Path(args.artifact), sys.stdout.buffer)
+    except BrokenPipeError:
+        print("FAILED  output pipe closed", file=sys.stderr)
+        return EXIT_FAILED
+    except Exception as e:
+        print(f"FAILED  {e}", file=sys.stderr)
+        return EXIT_FAILED
+    source = "stdin" if args.command == "encode-stream" else args.artifact
+    print(f"OK      {source} -> {output}", file=sys.stderr)
+    return EXIT_OK
+
+
+def _scrub(args, configs) -> int:
+    suffix = configs["encoding"].get("encoded_file_suffix", "")
+    files = collect_inputs(args.paths, args.manifest, suffix)
+    if not files:
+        print("No input files given", file=sys.stderr)
+        return EXIT_USAGE
+
+    reports, status = [], EXIT_OK
+    for path in files:
+        try:
+            if args.command == "repair":
+                report = repair_file(configs, path)
+            else:
+                report = verify_file(configs, path)
+        except Exception as e:
+            print(f"FAILED  {path}: {e}", file=sys.stderr)
+            reports.append({"artifact": str(path), "error": str(e)})
+            status = EXIT_FAILED
+            continue
+        reports.append(report)
+        state = "OK" if report["healthy"] else "DAMAGED"
+        repaired = ""
+        if "symbols_repaired" in report:
+            repaired = f", {report['symbols_repaired']} symbols repaired"
+        print(
+            f"{state:<8}{path}: {report['clean']} clean, "
+            f"{report['correctable']} correctable, "
+            f"{report['uncorrectable']} uncorrectable, "
+            f"worst {report['worst_errors']}/{report['correction_capacity']} "
+            f"symbol errors{repaired}"
+        )
+        if not report["healthy"]:
+            status = EXIT_FAILED
+
+    if args.report:
+        Path(args.report).write_text(json.dumps(reports, indent=2))
+    return status
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="trsenc", description=__doc__.split("\n")[1])
+    parser.add_argument("--config", default="configs/configs.yaml")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cores = os.cpu_count() or 1
+    for name, help_text in (
+        ("encode", "Encode files into artifacts"),
+        ("recover", "Recover original files from artifacts"),
+    ):
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument("paths", nargs="*", help="Files or directories")
+        sub.add_argument("--manifest", help="File listing one input path per line")
+        sub.add_argument(
+            "--cpu-jobs", type=int, default=cores, help="Files RS-coded at once"
+        )
+        sub.add_argument(
+            "--io-jobs", type=int, default=2, help="Files copied or padded at once"
+        )
+        sub.add_argument("--report", help="Write per-file results as JSON")
+
+    for name, help_text in (
+        ("verify", "Check artifacts without recovering"),
+        ("repair", "Correct damaged codewords of artifacts in place"),
+    ):
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument("paths", nargs="*", help="Artifacts or directories")
+        sub.add_argument("--manifest", help="File listing one artifact per line")
+        sub.add_argument("--report", help="Write the health reports as JSON")
+
+    sub = commands.add_parser("range", help="Recover a byte range of one artifact")
+    sub.add_argument("artifact")
+    sub.add_argument("offset", type=int)
+    sub.add_argument("length", type=int)
+    sub.add_argument("-o", "--out", required=True)
+
+    sub = commands.add_parser("encode-stream", help="Encode stdin into an artifact")
+    sub.add_argument("-o", "--out", required=True, help="Artifact to write")
+    sub.add_argument("--name", default="stdin", help="File name recorded for recovery")
+
+    sub = commands.add_parser(
+        "recover-stream", help="Recover an artifact's original bytes to stdout"
+    )
+    sub.add_argument("artifact")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        configs = read_config(args.config)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return EXIT_USAGE
+    configure_metrics(configs)
+
+    if args.command == "range":
+        return _range(args, configs)
+    if args.command in ("encode-stream", "recover-stream"):
+        return _stream(args, configs)
+    if args.command in ("verify", "repair"):
+        return _scrub(args, configs)
+    return _batch(args, configs)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
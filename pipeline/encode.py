@@ -1,25 +1,104 @@
+from contextlib import nullcontext
 from pathlib import Path
 
+from src.encoding.compression import (
+    ChunkCompressor,
+    compressed_size,
+    compression_codec,
+)
 from src.encoding.config_reader import read_config
+from src.encoding.encode_cache import EncodeCache
 from src.encoding.metadata1_appender import Metadata1Appender
 from src.encoding.metadata2_adder import Metadata2Adder
 from src.encoding.padding_prepend import PaddingAdder
 from src.encoding.rs_encoding import RSEncoding
+from src.encoding.streaming_encoder import StreamingEncoder
+from src.logging.metrics import configure_metrics
 
-if __name__ == "__main__":
 
-    configs = read_config("configs/configs.yaml")
+def encode_file(configs, input_file: Path, limits=None) -> Path:
+    """
+    Encode ``input_file`` into an artifact and return the artifact path.
 
-    input_file = Path(input("file to encode:"))
+    ``limits`` (see pipeline.scheduler.JobLimits) gates the CPU-bound RS
+    coding and the I/O-bound copy and padding stages separately when many
+    files are encoded at once.
+
+    With ``encoding.cache.enabled``, an input already encoded with the same
+    settings is linked from the EncodeCache instead of being encoded again.
+    """
+    if not EncodeCache.enabled(configs):
+        return _encode_file(configs, input_file, limits)
+
+    io = limits.io if limits is not None else nullcontext()
+    with io:
+        cache = EncodeCache(configs)
+        content, signature = cache.content_hash(input_file)
+        key = cache.key(content, Metadata1Appender(configs, input_file).metadata)
+        artifact = cache.fetch(key, configs["encoding"]["destination_directory"])
+    if artifact is not None:
+        return artifact
+
+    artifact = _encode_file(configs, input_file, limits)
+    with io:
+        cache.store(key, artifact, input_file, signature)
+    return artifact
+
+
+def _encode_file(configs, input_file: Path, limits=None) -> Path:
+    cpu = limits.cpu if limits is not None else nullcontext()
+    io = limits.io if limits is not None else nullcontext()
+
+    if configs["encoding"].get("streaming", False):
+        with cpu:
+            return StreamingEncoder(configs, input_file).run()
 
-    metadata1append = Metadata1Appender(configs, input_file)
-    input_file_path = metadata1append.run()
+    with io:
+        metadata1append = Metadata1Appender(configs, input_file)
+        input_file_path = metadata1append.run()
 
-    rs_encode = RSEncoding(configs, input_file_path)
-    rs_encoded_file = rs_encode.run()
+    compression = None
+    digest = None
+    payload_size = metadata1append.file_size
+    with cpu:
+        if compression_codec(configs["encoding"]) is not None:
+            compressor = ChunkCompressor(
+                configs,
+                input_file_path,
+                length=metadata1append.file_size,
+                tail=metadata1append.footer(),
+            )
+            compression = compressor.run()
+            digest = compressor.digest
+            if compression is not None:
+                payload_size = compressed_size(compression)
 
-    padding = PaddingAdder(configs, rs_encoded_file)
-    padded_file = padding.run()
+        rs_encode = RSEncoding(
+            configs, input_file_path, hash_bytes=payload_size, digest=digest
+        )
+        rs_encoded_file = rs_encode.run()
+
+    with io:
+        padding = PaddingAdder(configs, rs_encoded_file)
+        padded_file = padding.run()
+
+        Metadata2Adde = Metadata2Adder(
+            configs,
+            padded_file,
+            metadata1=metadata1append.metadata,
+            payload_size=payload_size + len(metadata1append.footer()),
+            digest=rs_encode.digest,
+            compression=compression,
+            checksum_index=rs_encode.checksum_index,
+        )
+        return Metadata2Adde.run()
+
+
+if __name__ == "__main__":
+
+    configs = read_config("configs/configs.yaml")
+    configure_metrics(configs)
+
+    input_file = Path(input("file to encode:"))
 
-    Metadata2Adde = Metadata2Adder(configs, padded_file)
-    Metadata2Adde.run()
+    encode_file(configs, input_file)
@@ -1,27 +1,59 @@
+from contextlib import nullcontext
 from pathlib import Path
 
 from src.encoding.config_reader import read_config
+from src.logging.metrics import configure_metrics
+from src.recover.decompressor import ChunkDecompressor
 from src.recover.metadata1_remover import Metadata1Remover
 from src.recover.metadata2_remover import Metadata2Remover
 from src.recover.remove_padding import PaddingRemover
 from src.recover.rs_decode import RSDecoder
 
-if __name__ == "__main__":
-    input_file = Path(input("file to decode:"))
 
-    configs = read_config("configs/configs.yaml")
+def recover_file(configs, input_file: Path, limits=None) -> Path:
+    """
+    Recover the original file from an artifact and return its path.
+
+    ``limits`` gates the I/O-bound metadata and padding stages and the
+    CPU-bound RS decoding (and decompression) separately, as in
+    encode_file.
+    """
+    decoding_cfg = configs.get("decoding") or {}
+    cpu = limits.cpu if limits is not None else nullcontext()
+    io = limits.io if limits is not None else nullcontext()
+
+    with io:
+        metadata2_remover = Metadata2Remover(configs, input_file)
+        metadata, file_after_metadata_removal = metadata2_remover.run()
+
+        padding_remover = PaddingRemover(
+            metadata["padding"],
+            file_after_metadata_removal,
+            decoding_cfg.get("keep_removed_padding", False),
+        )
+        removed_padding_path, file_without_padding = padding_remover.run()
 
-    metadata2_remover = Metadata2Remover(configs, input_file)
-    metadata, file_after_metadata_removal = metadata2_remover.run()
+    with cpu:
+        decoder = RSDecoder(
+            metadata,
+            file_without_padding,
+            decoding_cfg,
+        )
+        decoded_file_path = decoder.run()
 
-    padding_remover = PaddingRemover(metadata["padding"], file_after_metadata_removal)
-    removed_padding_path, file_without_padding = padding_remover.run()
+        if metadata.get("compression") is not None:
+            decoded_file_path = ChunkDecompressor(
+                metadata, decoded_file_path, decoding_cfg
+            ).run()
 
-    decoder = RSDecoder(
-        metadata,
-        file_without_padding,
-    )
-    decoded_file_path = decoder.run()
+    metadata1_remover = Metadata1Remover(decoded_file_path, metadata.get("metadata1"))
+    return metadata1_remover.run()
+
+
+if __name__ == "__main__":
+    input_file = Path(input("file to decode:"))
+
+    configs = read_config("configs/configs.yaml")
+    configure_metrics(configs)
 
-    metadata1_remover = Metadata1Remover(decoded_file_path)
-    metadata1_remover.run()
+    recover_file(configs, input_file)
@@ -0,0 +1,24 @@
+import argparse
+from pathlib import Path
+
+from src.encoding.config_reader import read_config
+from src.recover.range_reader import RangeRecovery
+
+
+def recover_range(configs, input_file: Path, offset: int, length: int, out_path):
+    """Recover ``length`` original bytes at ``offset`` from an artifact."""
+    return RangeRecovery(configs, input_file).extract(offset, length, out_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recover a byte range of one artifact")
+    parser.add_argument("artifact", type=Path)
+    parser.add_argument("offset", type=int, help="Start offset in the original data")
+    parser.add_argument("length", type=int, help="Number of bytes to recover")
+    parser.add_argument("-o", "--out", type=Path, required=True)
+    parser.add_argument("--config", default="configs/configs.yaml")
+    args = parser.parse_args()
+
+    configs = read_config(args.config)
+
+    recover_range(configs, args.artifact, args.offset, args.length, args.out)
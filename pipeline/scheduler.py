@@ -0,0 +1,178 @@
+import copy
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from pipeline.encode import encode_file
+from pipeline.recover import recover_file
+from src.logging.logger import get_logger
+from src.logging.metrics import configure_metrics
+
+logger = get_logger(__name__)
+
+
+class JobLimits:
+    """
+    Separate concurrency limits for CPU-bound and I/O-bound stages.
+
+    ``cpu`` and ``io`` are semaphores shared by every job process; a stage
+    holds one slot of its kind while it runs, so at most ``cpu_jobs`` files
+    are being RS-coded and at most ``io_jobs`` are being copied or padded
+    at any moment.
+    """
+
+    def __init__(self, manager, cpu_jobs: int, io_jobs: int):
+        self.cpu = manager.BoundedSemaphore(cpu_jobs)
+        self.io = manager.BoundedSemaphore(io_jobs)
+
+
+class JobResult:
+    """Outcome of one file: the output path on success, the error otherwise."""
+
+    def __init__(self, source, output=None, error=None, seconds=0.0):
+        self.source = Path(source)
+        self.output = output
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def as_dict(self) -> dict:
+        return {
+            "source": str(self.source),
+            "output": str(self.output) if self.output else None,
+            "ok": self.ok,
+            "error": self.error,
+            "seconds": self.seconds,
+        }
+
+
+def _run_job(mode, configs, path, limits):
+    """Encode or recover one file in a job process."""
+    configure_metrics(configs)
+    start = time.perf_counter()
+    try:
+        if mode == "encode":
+            output = encode_file(configs, path, limits)
+        else:
+            output = recover_file(configs, path, limits)
+    except Exception as e:
+        logger.error(f"{mode} failed for {path}: {e}")
+        return JobResult(path, error=f"{type(e).__name__}: {e}")
+    return JobResult(path, output, seconds=time.perf_counter() - start)
+
+
+def collect_inputs(paths, manifest=None, suffix: str = "") -> list[Path]:
+    """
+    Expand files, directories (recursively) and a manifest into input files.
+
+    A manifest lists one path per line; blank lines and lines starting with
+    ``#`` are ignored. With ``suffix`` set, files found in directories must
+    end with it (explicitly named files are always kept). Duplicates are
+    dropped, keeping the first occurrence.
+    """
+    candidates = [Path(p) for p in paths]
+    if manifest is not None:
+        for line in Path(manifest).read_text().splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                candidates.append(Path(line))
+
+    files, seen = [], set()
+    for candidate in candidates:
+        if candidate.is_dir():
+            found = sorted(
+                p
+                for p in candidate.rglob("*")
+                if p.is_file() and (not suffix or p.name.endswith(suffix))
+            )
+        else:
+            found = [candidate]
+        for path in found:
+            key = path.resolve()
+            if key not in seen:
+                seen.add(key)
+                files.append(path)
+    return files
+
+
+class BatchScheduler:
+    """
+    Encode or recover many files concurrently.
+
+    Every file is one job running in its own process. ``cpu_jobs +
+    io_jobs`` processes are started so I/O-bound stages of some files
+    overlap the RS coding of others, and JobLimits keeps each kind of stage
+    within its own limit. With more than one CPU job the per-file
+    ``workers`` setting is forced to 1 to avoid oversubscribing the cores.
+    """
+
+    def __init__(self, configs, mode: str, cpu_jobs: int = 1, io_jobs: int = 1):
+        if mode not in ("encode", "recover"):
+            raise ValueError(f"Unknown mode {mode!r}")
+        self.mode = mode
+        self.cpu_jobs = max(1, int(cpu_jobs))
+        self.io_jobs = max(1, int(io_jobs))
+
+        self.configs = copy.deepcopy(configs)
+        if self.cpu_jobs > 1:
+            self.configs["encoding"]["workers"] = 1
+            self.configs.setdefault("decoding", {})["workers"] = 1
+
+    def _duplicate_names(self, files):
+        """
+        Files whose name repeats an earlier one's.
+
+        Encoding stages a copy under the file name in the destination
+        directory, so two inputs with the same name would overwrite each
+        other.
+        """
+        if self.mode != "encode":
+            return {}
+        names, duplicates = {}, {}
+        for path in files:
+            if path.name in names:
+                duplicates[path] = names[path.name]
+            else:
+                names[path.name] = path
+        return duplicates
+
+    def run(self, files, on_result=None) -> list[JobResult]:
+        """Run every job and return their results in input order."""
+        results: dict[Path, JobResult] = {}
+
+        duplicates = self._duplicate_names(files)
+        for path, first in duplicates.items():
+            results[path] = JobResult(
+                path, error=f"Same file name as {first}; encode it separately"
+            )
+            if on_result is not None:
+                on_result(results[path])
+        todo = [p for p in files if p not in duplicates]
+
+        logger.info(
+            f"Scheduling {len(todo)} {self.mode} jobs "
+            f"(cpu_jobs={self.cpu_jobs}, io_jobs={self.io_jobs})"
+        )
+        with multiprocessing.Manager() as manager:
+            limits = JobLimits(manager, self.cpu_jobs, self.io_jobs)
+            workers = max(1, min(len(todo), self.cpu_jobs + self.io_jobs))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(_run_job, self.mode, self.configs, path, limits): path
+                    for path in todo
+                }
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = JobResult(path, error=f"{type(e).__name__}: {e}")
+                    results[path] = result
+                    if on_result is not None:
+                        on_result(result)
+
+        return [results[path] for path in files]
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from src.encoding.integrity import check_digest, new_digest
+from src.encoding.pipe_encoder import PipeEncoder
+from src.logging.logger import get_logger
+from src.logging.metrics import stage
+from src.recover.range_reader import RangeRecovery
+
+logger = get_logger(__name__)
+
+
+def encode_stream(configs, stream, out_path: Path, name: str = "stdin") -> Path:
+    """
+    Encode the binary ``stream`` (read to its end) into an artifact.
+
+    ``name`` is recorded in Metadata1 as the original file name. Returns
+    the artifact path (``out_path`` with the encoded suffix).
+    """
+    return PipeEncoder(configs, stream, out_path, name).run()
+
+
+def recover_stream(configs, input_file: Path, out) -> int:
+    """
+    Write the original bytes of an artifact to the binary stream ``out``.
+
+    The artifact is read in place and decoded batch by batch, so nothing
+    is written to disk and memory stays bounded. Returns the number of
+    bytes written.
+
+    A digest recorded at encode time is checked once everything has been
+    written; on a mismatch IntegrityError is raised, so callers must treat
+    the output as bad.
+    """
+    reader = RangeRecovery(configs, input_file)
+    expected = reader.metadata.get("digest")
+    digest = new_digest(expected["algorithm"]) if expected else None
+    written = 0
+    with stage("StreamRecovery", path=str(input_file)) as metrics:
+        for chunk in reader.iter_range(0, reader.original_size):
+            out.write(chunk)
+            written += len(chunk)
+            if digest is not None:
+                digest.update(chunk)
+            metrics.progress(written, reader.original_size)
+        out.flush()
+        metrics.add(bytes_written=written)
+    if digest is not None:
+        check_digest(expected, digest.hexdigest(), input_file)
+    logger.info(f"Recovered {written} bytes of {input_file} to a stream")
+    return written
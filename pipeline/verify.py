@@ -0,0 +1,25 @@
+import json
+from pathlib import Path
+
+from src.encoding.config_reader import read_config
+from src.logging.metrics import configure_metrics
+from src.recover.verifier import ArtifactRepairer, ArtifactVerifier
+
+
+def verify_file(configs, input_file: Path) -> dict:
+    """Check an artifact in place and return its health report."""
+    return ArtifactVerifier(configs, input_file).run()
+
+
+def repair_file(configs, input_file: Path) -> dict:
+    """Correct the damaged codewords of an artifact in place."""
+    return ArtifactRepairer(configs, input_file).run()
+
+
+if __name__ == "__main__":
+    input_file = Path(input("artifact to verify:"))
+
+    configs = read_config("configs/configs.yaml")
+    configure_metrics(configs)
+
+    print(json.dumps(verify_file(configs, input_file), indent=2))
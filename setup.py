@@ -9,4 +9,5 @@ setup(
     author="Alireza Alipoor,Aryan Shapasand",
     packages=find_packages(),
     install_requires=requirements,
+    entry_points={"console_scripts": ["trsenc=pipeline.cli:main"]},
 )
@@ -0,0 +1,305 @@
+import os
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from src.encoding.parallel import run_ranges
+from src.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+# CRC32 per region, stored big-endian right before the Metadata2 JSON.
+INDEX_DTYPE = np.dtype(">u4")
+# Regions checksummed per pread.
+REGIONS_PER_BATCH = 1024
+
+
+def index_size(metadata: dict) -> int:
+    """Bytes taken by the checksum index described in Metadata2 (0 if none)."""
+    checksums = metadata.get("checksums")
+    return int(checksums["count"]) * INDEX_DTYPE.itemsize if checksums else 0
+
+
+def _crc_range(path, base, length, region, first, last) -> np.ndarray:
+    """CRC32 of regions ``[first, last)`` of ``length`` bytes at ``base``."""
+    crcs = np.empty(last - first, dtype=INDEX_DTYPE)
+    with open(path, "rb") as f:
+        for start in range(first, last, REGIONS_PER_BATCH):
+            stop = min(start + REGIONS_PER_BATCH, last)
+            lo, hi = start * region, min(stop * region, length)
+            chunk = os.pread(f.fileno(), hi - lo, base + lo)
+            if len(chunk) != hi - lo:
+                raise EOFError(f"Unexpected end of {path} at {base + lo + len(chunk)}")
+            view = memoryview(chunk)
+            for i in range(stop - start):
+                crcs[start - first + i] = zlib.crc32(
+                    view[i * region : (i + 1) * region]
+                )
+    return crcs
+
+
+def compute_index(path: Path, base: int, length: int, region: int, workers: int = 1):
+    """
+    Checksum the interleaved data ``[base, base + length)`` of ``path``.
+
+    Returns one CRC32 per ``region`` bytes (the last region may be short)
+    as an array ready to be written with ``tobytes()``.
+    """
+    count = -(-length // region)
+    parts = run_ranges(
+        _crc_range, count, REGIONS_PER_BATCH, workers, path, base, length, region
+    )
+    if not parts:
+        return np.empty(0, dtype=INDEX_DTYPE)
+    # concatenate returns native byte order; the index is stored big-endian.
+    return np.concatenate(parts).astype(INDEX_DTYPE, copy=False)
+
+
+class RegionCRCs:
+    """
+    Region CRC32s of data written in scattered pieces, in any order.
+
+    CRC32 is affine over GF(2): the CRC of a region is the XOR of what each
+    of its pieces contributes on its own, as if the rest of the region were
+    zeros, and of the CRC of an all-zero region. A piece contributes its
+    CRC continued over the zeros up to the end of its region, so pieces
+    written by different workers can be combined later, and all-zero
+    pieces (holes) contribute nothing and can be skipped.
+
+    ``parts`` maps region indices to the XOR of their contributions;
+    combine the parts of all writers with assemble_index.
+    """
+
+    def __init__(self, region: int, length: int):
+        self.region = region
+        self.length = length
+        self.parts = {}
+        self._zeros = memoryview(bytes(region))
+
+    def update(self, offset: int, data):
+        """Add ``data`` written at ``offset`` of the checksummed data."""
+        view = memoryview(data).cast("B")
+        pos = 0
+        while pos < len(view):
+            idx, start = divmod(offset + pos, self.region)
+            end = min(self.region, self.length - idx * self.region)
+            n = min(end - start, len(view) - pos)
+            crc = zlib.crc32(view[pos : pos + n], 0xFFFFFFFF)
+            if start + n < end:
+                crc = zlib.crc32(self._zeros[: end - start - n], crc)
+            self.parts[idx] = self.parts.get(idx, 0) ^ crc ^ 0xFFFFFFFF
+            pos += n
+
+
+def assemble_index(parts, length: int, region: int) -> np.ndarray:
+    """
+    Checksum index of ``length`` bytes from the RegionCRCs ``parts`` of
+    every writer, ready to be written with ``tobytes()``.
+    """
+    count = -(-length // region)
+    index = np.full(count, zlib.crc32(bytes(region)), dtype=np.uint32)
+    if count:
+        index[-1] = zlib.crc32(bytes(length - (count - 1) * region))
+    for part in parts:
+        if part:
+            idx = np.fromiter(part.keys(), dtype=np.int64, count=len(part))
+            index[idx] ^= np.fromiter(part.values(), dtype=np.uint32, count=len(part))
+    return index.astype(INDEX_DTYPE)
+
+
+class SequentialCRCs:
+    """Region CRC32s of data written front to back, e.g. by PipeEncoder."""
+
+    def __init__(self, region: int):
+        self.region = region
+        self.crcs = []
+        self._crc = 0
+        self._filled = 0
+
+    def update(self, data):
+        """Add the next ``data`` bytes."""
+        view = memoryview(data).cast("B")
+        while view:
+            n = min(self.region - self._filled, len(view))
+            self._crc = zlib.crc32(view[:n], self._crc)
+            self._filled += n
+            view = view[n:]
+            if self._filled == self.region:
+                self.crcs.append(self._crc)
+                self._crc, self._filled = 0, 0
+
+    def index(self) -> np.ndarray:
+        """The checksum index of everything added so far."""
+        crcs = self.crcs + ([self._crc] if self._filled else [])
+        return np.array(crcs, dtype=INDEX_DTYPE)
+
+
+def _bad_range(path, base, length, region, index_path, index_offset, first, last):
+    with open(index_path, "rb") as f:
+        expected = np.frombuffer(
+            os.pread(
+                f.fileno(),
+                (last - first) * INDEX_DTYPE.itemsize,
+                index_offset + first * INDEX_DTYPE.itemsize,
+            ),
+            dtype=INDEX_DTYPE,
+        )
+    actual = _crc_range(path, base, length, region, first, last)
+    return np.flatnonzero(actual != expected) + first
+
+
+def find_bad_regions(
+    path: Path,
+    base: int,
+    length: int,
+    region: int,
+    index_path: Path,
+    workers=1,
+    index_offset: int = 0,
+    regions=None,
+) -> np.ndarray:
+    """
+    Sorted indices of the regions whose CRC32 no longer matches the index.
+
+    The index is read from ``index_offset`` of ``index_path`` (a sidecar
+    file, or the artifact itself). With ``regions`` (sorted region indices)
+    only those are read and checked, in runs of consecutive regions.
+    """
+    args = (path, base, length, region, index_path, index_offset)
+    if regions is None:
+        count = -(-length // region)
+        parts = run_ranges(_bad_range, count, REGIONS_PER_BATCH, workers, *args)
+    else:
+        regions = np.asarray(regions, dtype=np.int64)
+        runs = np.split(regions, np.flatnonzero(np.diff(regions) != 1) + 1)
+        parts = [_bad_range(*args, run[0], run[-1] + 1) for run in runs if len(run)]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+def _symbol_offsets(layout, codeword: int) -> np.ndarray:
+    """Offsets of the nsize symbols of ``codeword`` in the interleaved data."""
+    first, last = layout.segment(codeword)
+    return (
+        first * layout.nsize
+        + np.arange(layout.nsize, dtype=np.int64) * (last - first)
+        + (codeword - first)
+    )
+
+
+class ErasureMap:
+    """
+    Map codewords to the symbols that lie in regions with a bad checksum.
+
+    Those symbols are known to be suspect, so the decoder can pass them as
+    erasures: RS corrects up to nsym erasures but only nsym / 2 errors of
+    unknown position.
+    """
+
+    def __init__(self, layout, region: int, bad_regions: np.ndarray):
+        self.layout = layout
+        self.region = region
+        self.bad_regions = np.asarray(bad_regions, dtype=np.int64)
+
+    def __bool__(self):
+        return bool(len(self.bad_regions))
+
+    def positions(self, codeword: int) -> list[int]:
+        """Positions within ``codeword`` whose region failed its checksum."""
+        regions = _symbol_offsets(self.layout, codeword) // self.region
+        return np.flatnonzero(np.isin(regions, self.bad_regions)).tolist()
+
+
+class RegionChecker:
+    """
+    Checksum regions of the interleaved data on demand.
+
+    Decoders rely on syndromes first and only ask for the codewords they
+    could not correct: just the regions holding symbols of those codewords
+    are read and compared against the index, so a clean artifact is never
+    read twice. Results are cached, so each region is checked at most once
+    per checker (each worker process has its own copy).
+
+    The index is read from ``index_offset`` of ``index_path``. With
+    ``index_crc`` the index itself is checked on first use; a damaged index
+    is ignored and no erasures are reported.
+    """
+
+    def __init__(
+        self,
+        layout,
+        path: Path,
+        base: int,
+        region: int,
+        index_path: Path,
+        index_offset: int = 0,
+        index_crc: int | None = None,
+    ):
+        self.layout = layout
+        self.path = path
+        self.base = base
+        self.region = region
+        self.index_path = index_path
+        self.index_offset = index_offset
+        self.index_crc = index_crc
+        # Whether the index matches index_crc; None until first checked.
+        self.intact = True if index_crc is None else None
+        self.checked = np.empty(0, dtype=np.int64)
+        self.bad_regions = np.empty(0, dtype=np.int64)
+
+    def _index_intact(self) -> bool:
+        if self.intact is None:
+            count = -(-self.layout.data_size // self.region)
+            with open(self.index_path, "rb") as f:
+                index = os.pread(
+                    f.fileno(), count * INDEX_DTYPE.itemsize, self.index_offset
+                )
+            self.intact = zlib.crc32(index) == self.index_crc
+            if not self.intact:
+                logger.warning(f"Checksum index of {self.path} is damaged; ignoring")
+        return self.intact
+
+    def erasures(self, codewords) -> ErasureMap:
+        """ErasureMap covering ``codewords``, checking their regions first."""
+        regions = np.unique(
+            np.concatenate([_symbol_offsets(self.layout, c) for c in codewords])
+            // self.region
+        )
+        unchecked = np.setdiff1d(regions, self.checked, assume_unique=True)
+        if len(unchecked) and self._index_intact():
+            bad = find_bad_regions(
+                self.path,
+                self.base,
+                self.layout.data_size,
+                self.region,
+                self.index_path,
+                index_offset=self.index_offset,
+                regions=unchecked,
+            )
+            self.checked = np.union1d(self.checked, unchecked)
+            self.bad_regions = np.union1d(self.bad_regions, bad)
+            logger.info(
+                f"Checksum index: {len(bad)} of {len(unchecked)} regions "
+                f"checked for {len(codewords)} codewords are damaged"
+            )
+        return ErasureMap(self.layout, self.region, self.bad_regions)
+
+
+def artifact_regions(layout, path: Path, metadata: dict, record_start: int):
+    """
+    RegionChecker over the index stored in an artifact, right before its
+    Metadata2 JSON (``record_start`` as returned by read_metadata), or None
+    if the artifact has no index.
+    """
+    checksums = metadata.get("checksums")
+    if not checksums:
+        return None
+    return RegionChecker(
+        layout,
+        path,
+        int(metadata["padding"]),
+        int(checksums["region"]),
+        path,
+        record_start,
+        checksums["index_crc"],
+    )
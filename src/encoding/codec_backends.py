@@ -0,0 +1,234 @@
+import importlib
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import numpy as np
+
+from src.encoding.gf_batch import BatchRSCodec
+from src.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Blocks timed per backend when picking the fastest one.
+CALIBRATION_BLOCKS = 256
+
+
+class CodecBackend(ABC):
+    """
+    Reed-Solomon codec used by RSEncoding and RSDecoder.
+
+    Every backend produces byte-identical codewords for the same parameters.
+    ``encode_blocks`` and ``dirty_mask`` work on whole batches; ``correct``
+    and ``decode`` fix a single codeword and are only used for blocks that
+    failed the syndrome check.
+    """
+
+    name = ""
+
+    def __init__(self, rs_params: dict):
+        self.rs_params = dict(rs_params)
+        self.nsize = self.rs_params["nsize"]
+        self.nsym = self.rs_params["nsym"]
+        self.block_size = self.nsize - self.nsym
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    @abstractmethod
+    def encode_blocks(self, blocks: np.ndarray) -> np.ndarray:
+        """Encode (n, block_size) uint8 messages into (n, nsize) codewords."""
+
+    @abstractmethod
+    def dirty_mask(self, codewords: np.ndarray) -> np.ndarray:
+        """Boolean mask of the codewords that are not valid."""
+
+    @abstractmethod
+    def correct(self, codeword: bytes, erase_pos=None, only_erasures=False):
+        """
+        Correct one codeword.
+
+        ``erase_pos`` lists symbols known to be bad; with ``only_erasures``
+        no other errors are searched for. Returns the message, the corrected
+        codeword and the positions of the symbols that were fixed; raises
+        ``reedsolo.ReedSolomonError`` when the codeword cannot be corrected.
+        """
+
+    def decode(self, codeword: bytes, erase_pos=None, only_erasures=False) -> bytes:
+        """Correct one codeword and return its message bytes."""
+        return self.correct(codeword, erase_pos, only_erasures)[0]
+
+
+class ReedsoloBackend(CodecBackend):
+    """Pure-Python ``reedsolo.RSCodec``, one block at a time."""
+
+    name = "reedsolo"
+    module = "reedsolo"
+
+    def __init__(self, rs_params: dict):
+        super().__init__(rs_params)
+        self.RS = importlib.import_module(self.module).RSCodec(**self.rs_params)
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            importlib.import_module(cls.module)
+        except ImportError:
+            return False
+        return True
+
+    def encode_blocks(self, blocks: np.ndarray) -> np.ndarray:
+        codewords = np.empty((blocks.shape[0], self.nsize), dtype=np.uint8)
+        for i, block in enumerate(blocks):
+            codewords[i] = np.frombuffer(
+                bytes(self.RS.encode(bytearray(block.tobytes()))), np.uint8
+            )
+        return codewords
+
+    def dirty_mask(self, codewords: np.ndarray) -> np.ndarray:
+        return np.array(
+            [not self.RS.check(bytearray(cw.tobytes()))[0] for cw in codewords],
+            dtype=bool,
+        )
+
+    def correct(self, codeword: bytes, erase_pos=None, only_erasures=False):
+        message, corrected, errata = self.RS.decode(
+            bytearray(codeword), erase_pos=erase_pos, only_erasures=only_erasures
+        )
+        return bytes(message), bytes(corrected), list(errata)
+
+
+class CReedsoloBackend(ReedsoloBackend):
+    """The optional Cython build of reedsolo (``creedsolo``)."""
+
+    name = "creedsolo"
+    module = "creedsolo"
+
+
+class NumpyBackend(CodecBackend):
+    """
+    Vectorized BatchRSCodec for encoding and syndrome checks.
+
+    Codewords that need correcting are handed to the fastest available
+    reedsolo build.
+    """
+
+    name = "numpy"
+
+    def __init__(self, rs_params: dict):
+        super().__init__(rs_params)
+        self.batch = BatchRSCodec(**self.rs_params)
+        fallback = CReedsoloBackend if CReedsoloBackend.available() else ReedsoloBackend
+        self.corrector = fallback(self.rs_params)
+
+    def encode_blocks(self, blocks: np.ndarray) -> np.ndarray:
+        return self.batch.encode_blocks(blocks)
+
+    def dirty_mask(self, codewords: np.ndarray) -> np.ndarray:
+        return self.batch.dirty_mask(codewords)
+
+    def correct(self, codeword: bytes, erase_pos=None, only_erasures=False):
+        return self.corrector.correct(codeword, erase_pos, only_erasures)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (NumpyBackend, CReedsoloBackend, ReedsoloBackend)
+}
+
+
+def available_backends() -> list[str]:
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def _test_vectors(block_size: int) -> np.ndarray:
+    """Fixed messages: all zeros, all ones, a ramp and seeded random blocks."""
+    rng = np.random.default_rng(0x5EED)
+    return np.vstack(
+        [
+            np.zeros((1, block_size), dtype=np.uint8),
+            np.full((1, block_size), 0xFF, dtype=np.uint8),
+            (np.arange(block_size, dtype=np.uint32) % 256).astype(np.uint8)[None],
+            rng.integers(0, 256, size=(13, block_size), dtype=np.uint8),
+        ]
+    )
+
+
+def self_test(backend: CodecBackend) -> bool:
+    """
+    Check ``backend`` against reedsolo on known vectors.
+
+    Codewords must match reedsolo byte for byte, clean codewords must pass
+    the syndrome check, and a codeword with nsym // 2 errors must be flagged
+    and corrected.
+    """
+    reference = ReedsoloBackend(backend.rs_params)
+    blocks = _test_vectors(backend.block_size)
+    expected = reference.encode_blocks(blocks)
+    codewords = backend.encode_blocks(blocks)
+    if not np.array_equal(codewords, expected):
+        return False
+    if backend.dirty_mask(codewords).any():
+        return False
+
+    damaged = codewords[-1].copy()
+    damaged[: backend.nsym // 2] ^= 0xA5
+    if not backend.dirty_mask(damaged[None])[0]:
+        return False
+    return backend.decode(damaged.tobytes()) == blocks[-1].tobytes()
+
+
+def _timing(backend: CodecBackend) -> float:
+    blocks = np.random.default_rng(1).integers(
+        0, 256, size=(CALIBRATION_BLOCKS, backend.block_size), dtype=np.uint8
+    )
+    start = time.perf_counter()
+    codewords = backend.encode_blocks(blocks)
+    backend.dirty_mask(codewords)
+    return time.perf_counter() - start
+
+
+@lru_cache(maxsize=None)
+def resolve_backend(rs_items: tuple, requested: str = "auto") -> str:
+    """
+    Pick the backend for ``rs_items`` and return its name.
+
+    A named backend is used if it is installed and passes the self-test.
+    With ``auto``, every available backend is self-tested and the fastest
+    on a short encode + syndrome calibration is chosen.
+    """
+    params = dict(rs_items)
+    requested = (requested or "auto").lower()
+    if requested != "auto":
+        if requested not in BACKENDS:
+            raise ValueError(
+                f"Unknown codec backend {requested!r}; choose from {list(BACKENDS)}"
+            )
+        if not BACKENDS[requested].available():
+            raise ValueError(f"Codec backend {requested!r} is not installed")
+        if not self_test(BACKENDS[requested](params)):
+            raise RuntimeError(f"Codec backend {requested!r} failed its self-test")
+        logger.info(f"Using codec backend {requested} (configured)")
+        return requested
+
+    timings = {}
+    for name in available_backends():
+        backend = BACKENDS[name](params)
+        if not self_test(backend):
+            logger.warning(f"Codec backend {name} failed its self-test; skipping")
+            continue
+        timings[name] = _timing(backend)
+    if not timings:
+        raise RuntimeError("No Reed-Solomon codec backend passed its self-test")
+
+    chosen = min(timings, key=timings.get)
+    summary = ", ".join(f"{n}={t * 1000:.1f} ms" for n, t in timings.items())
+    logger.info(f"Using codec backend {chosen} (calibration: {summary})")
+    return chosen
+
+
+@lru_cache(maxsize=None)
+def get_backend(rs_items: tuple, name: str) -> CodecBackend:
+    """Build (once per process) the backend ``name`` for ``rs_items``."""
+    return BACKENDS[name](dict(rs_items))
@@ -0,0 +1,203 @@
+import json
+import lzma
+import os
+import zlib
+from itertools import accumulate
+from pathlib import Path
+
+from src.encoding.integrity import digest_record, new_digest
+from src.encoding.parallel import map_ordered, resolve_workers
+from src.logging.logger import get_logger
+from src.logging.metrics import stage
+
+logger = get_logger(__name__)
+
+DEFAULT_CHUNK = 4 * 1024 * 1024  # 4 MB of original data per chunk
+DEFAULT_LEVEL = 6
+
+_COMPRESS = {
+    "zlib": lambda data, level: zlib.compress(data, level),
+    "lzma": lambda data, level: lzma.compress(data, preset=level),
+}
+_DECOMPRESS = {
+    "zlib": zlib.decompress,
+    "lzma": lzma.decompress,
+}
+
+
+def compression_codec(encoding_cfg: dict) -> str | None:
+    """The ``encoding.compression`` codec, or None when compression is off."""
+    codec = str(encoding_cfg.get("compression") or "none").lower()
+    if codec == "none":
+        return None
+    if codec not in _COMPRESS:
+        raise ValueError(
+            f"Unsupported compression codec {codec!r} "
+            f"(expected one of: none, {', '.join(_COMPRESS)})"
+        )
+    return codec
+
+
+def compress_chunk(codec: str, level: int, data: bytes) -> bytes:
+    """
+    Compress one chunk, or return it unchanged if that would not shrink it.
+
+    A stored chunk as long as the original is therefore always raw.
+    """
+    packed = _COMPRESS[codec](data, level)
+    return packed if len(packed) < len(data) else data
+
+
+def decompress_chunk(codec: str, stored: bytes, size: int) -> bytes:
+    """Expand a chunk stored by compress_chunk back into its ``size`` bytes."""
+    if len(stored) == size:
+        return stored
+    data = _DECOMPRESS[codec](stored)
+    if len(data) != size:
+        raise ValueError(f"Chunk decompressed to {len(data)} bytes, expected {size}")
+    return data
+
+
+def chunk_spans(record: dict) -> list[tuple[int, int, int, int]]:
+    """
+    ``(offset, size, stored_offset, stored_size)`` of every chunk.
+
+    ``offset`` and ``size`` locate the chunk in the original data,
+    ``stored_offset`` and ``stored_size`` in the compressed payload.
+    """
+    chunk_size = int(record["chunk_size"])
+    total = int(record["size"])
+    stored = [int(n) for n in record["chunks"]]
+    starts = [0, *accumulate(stored)]
+    return [
+        (i * chunk_size, min(chunk_size, total - i * chunk_size), starts[i], n)
+        for i, n in enumerate(stored)
+    ]
+
+
+def compressed_size(record: dict) -> int:
+    """Length of the compressed payload described by ``record``."""
+    return sum(int(n) for n in record["chunks"])
+
+
+class ChunkCompressor:
+    """
+    Compress the input in independent chunks before RS encoding.
+
+    The first ``length`` bytes of ``in_path`` are cut into
+    ``encoding.compression_chunk`` byte chunks, compressed with
+    ``encoding.compression`` (zlib or lzma) on ``encoding.workers``
+    threads, and written back to back to ``out_path``, followed by
+    ``tail``. Chunks that do not shrink are stored raw. The Metadata2
+    ``compression`` record lists the stored size of every chunk, so
+    recovery can decompress them in parallel or pick out single chunks
+    for range reads.
+
+    The original data is hashed as it is read; ``self.digest`` holds the
+    Metadata2 digest entry so RS encoding need not read it again.
+    """
+
+    def __init__(
+        self,
+        config,
+        in_path: Path,
+        out_path: Path | None = None,
+        length: int | None = None,
+        tail: bytes = b"",
+    ):
+        encoding_cfg = config["encoding"]
+        self.codec = compression_codec(encoding_cfg)
+        if self.codec is None:
+            raise ValueError("encoding.compression is not enabled")
+        self.level = int(encoding_cfg.get("compression_level", DEFAULT_LEVEL))
+        self.chunk_size = int(encoding_cfg.get("compression_chunk", DEFAULT_CHUNK))
+        if self.chunk_size <= 0:
+            raise ValueError("encoding.compression_chunk must be positive")
+        self.workers = resolve_workers(encoding_cfg.get("workers", 1))
+        self.digest_algorithm = encoding_cfg.get("digest")
+
+        self.in_path = Path(in_path)
+        # Without an output path the input is replaced by its compressed form.
+        self.in_place = out_path is None
+        if self.in_place:
+            out_path = self.in_path.with_name(self.in_path.name + ".chunks")
+        self.out_path = Path(out_path)
+        self.length = self.in_path.stat().st_size if length is None else length
+        self.tail = tail
+
+        # Metadata2 "digest" entry of the original data, set by run().
+        self.digest = None
+
+    def _read_chunks(self, f, digest):
+        """Yield compress_chunk arguments for each chunk, hashing as we go."""
+        for offset in range(0, self.length, self.chunk_size):
+            size = min(self.chunk_size, self.length - offset)
+            data = f.read(size)
+            if len(data) != size:
+                raise EOFError(f"Unexpected end of {self.in_path} at offset {offset}")
+            if digest is not None:
+                digest.update(data)
+            yield self.codec, self.level, data
+
+    def run(self) -> dict | None:
+        """
+        Compress the input and return the Metadata2 ``compression`` record.
+
+        Returns None, and leaves no output behind, when the compressed
+        payload plus its record would not be smaller than the input: the
+        caller then encodes the input as it is.
+        """
+        logger.info(
+            f"Compressing {self.in_path} with {self.codec} "
+            f"(level {self.level}, chunks of {self.chunk_size} bytes)"
+        )
+        digest = new_digest(self.digest_algorithm)
+        chunks = []
+        try:
+            with (
+                stage("ChunkCompressor", path=str(self.in_path)) as metrics,
+                open(self.in_path, "rb") as fin,
+                open(self.out_path, "wb") as fout,
+            ):
+                for stored in map_ordered(
+                    compress_chunk, self._read_chunks(fin, digest), self.workers
+                ):
+                    fout.write(stored)
+                    chunks.append(len(stored))
+                    metrics.progress(
+                        min(len(chunks) * self.chunk_size, self.length), self.length
+                    )
+                fout.write(self.tail)
+                metrics.add(bytes_read=self.length, bytes_written=fout.tell())
+        except Exception as e:
+            logger.error(f"Compression failed for {self.in_path}: {e}")
+            self.out_path.unlink(missing_ok=True)
+            raise
+
+        if digest is not None:
+            self.digest = digest_record(digest.name, digest.hexdigest())
+
+        record = {
+            "codec": self.codec,
+            "chunk_size": self.chunk_size,
+            "size": self.length,
+            "chunks": chunks,
+        }
+        stored = sum(chunks)
+        raw = sum(1 for (_, size, _, n) in chunk_spans(record) if size == n)
+        if stored + len(json.dumps(record)) >= self.length:
+            logger.info(
+                f"Compression would not shrink {self.in_path} "
+                f"({self.length} -> {stored} bytes); encoding it uncompressed"
+            )
+            self.out_path.unlink(missing_ok=True)
+            return None
+
+        if self.in_place:
+            os.replace(self.out_path, self.in_path)
+            self.out_path = self.in_path
+        logger.info(
+            f"Compressed {self.length} -> {stored} bytes "
+            f"({stored / self.length:.1%}, {raw} of {len(chunks)} chunks stored raw)"
+        )
+        return record
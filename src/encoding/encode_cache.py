@@ -0,0 +1,303 @@
+import fcntl
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.encoding.file_ops import link_or_copy
+from src.encoding.integrity import hash_file
+from src.logging.logger import get_logger
+from src.logging.metrics import stage
+
+logger = get_logger(__name__)
+
+# Bump when the artifact format changes, so old entries stop matching.
+CACHE_VERSION = 1
+CONTENT_DIGEST = "blake2b"
+# encoding settings that change the artifact bytes; the others (workers,
+# backends, single_pass, streaming, ...) only change how it is produced.
+ARTIFACT_KEYS = (
+    "reed_solomon",
+    "padding_size",
+    "interleave_depth",
+    "checksum_region",
+    "digest",
+    "compression",
+    "compression_level",
+    "compression_chunk",
+    "encoded_file_suffix",
+)
+# Eviction trims the cache to this fraction of max_size, so the entries
+# are not scanned again on the very next store.
+EVICT_TO = 0.9
+
+
+def _write_json(path: Path, record: dict):
+    """Write ``record`` to ``path`` atomically."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(record))
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def file_signature(path: Path) -> dict:
+    """The (size, mtime, inode) of ``path`` that the content hash is tied to."""
+    st = Path(path).stat()
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "inode": st.st_ino,
+        "device": st.st_dev,
+    }
+
+
+class EncodeCache:
+    """
+    Content-addressed cache of encoded artifacts.
+
+    An entry is keyed by a hash of the input's contents, its Metadata1
+    (name, path and size, which the artifact embeds) and the encoding
+    settings that change the artifact bytes (ARTIFACT_KEYS). On a hit the
+    artifact is produced by reflink, hard link or, failing both, a copy of
+    the cached one instead of being encoded again; keep the cache on the
+    artifacts' filesystem so links are possible.
+
+    Layout of ``encoding.cache.directory``:
+
+    - ``objects/<key>``: the cached artifact, and ``objects/<key>.json``
+      its file name and (size, mtime, inode); the record's mtime is the
+      entry's last use
+    - ``sources/<hash of path>.json``: the content hash of an input file
+      and the (size, mtime, inode) it was computed for, so unchanged
+      files are not read again
+    - ``total``: bytes held in ``objects``, updated under ``lock``
+
+    A hard-linked artifact shares its inode with the cache entry. Entries
+    are not copied when handed out, so links stay free; instead, recovery
+    and repair, which change artifacts in place, give a hard-linked
+    artifact its own copy first (file_ops.break_link), and the copy is
+    only paid for artifacts that are actually recovered. An entry whose
+    file was changed anyway (by other tools) no longer matches its
+    recorded signature and is dropped instead of being served.
+
+    Entries are evicted least recently used first once the total exceeds
+    ``encoding.cache.max_size`` (0 = unbounded). Several processes may
+    share a cache.
+    """
+
+    def __init__(self, config):
+        self.encoding_cfg = config["encoding"]
+        cache_cfg = self.encoding_cfg.get("cache") or {}
+        self.directory = Path(cache_cfg.get("directory", "cache"))
+        self.max_size = int(cache_cfg.get("max_size", 0))
+        self.objects = self.directory / "objects"
+        self.sources = self.directory / "sources"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.sources.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def enabled(config) -> bool:
+        """True if ``encoding.cache.enabled`` is set."""
+        return bool((config["encoding"].get("cache") or {}).get("enabled", False))
+
+    @contextmanager
+    def _locked(self):
+        with open(self.directory / "lock", "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def content_hash(self, input_file: Path) -> tuple[str, dict]:
+        """
+        Hash of the contents of ``input_file`` and the signature it matches.
+
+        The recorded hash is reused without reading the file while its
+        size, mtime and inode are unchanged.
+        """
+        path = Path(input_file).resolve()
+        signature = file_signature(path)
+        name = hashlib.blake2b(str(path).encode(), digest_size=16).hexdigest()
+        record_path = self.sources / f"{name}.json"
+
+        record = _read_json(record_path)
+        if record is not None and record.get("signature") == signature:
+            logger.info(f"{input_file} unchanged since it was last hashed")
+            return record["content"], signature
+
+        with stage("EncodeCache.hash", path=str(input_file)) as metrics:
+            content = hash_file(path, signature["size"], CONTENT_DIGEST)
+            metrics.add(bytes_read=signature["size"])
+        _write_json(
+            record_path,
+            {"path": str(path), "signature": signature, "content": content},
+        )
+        return content, signature
+
+    def key(self, content: str, metadata1: dict) -> str:
+        """Cache key of an input with these contents and Metadata1."""
+        material = {
+            "version": CACHE_VERSION,
+            "content": content,
+            "metadata1": metadata1,
+            "encoding": {k: self.encoding_cfg.get(k) for k in ARTIFACT_KEYS},
+        }
+        return hashlib.blake2b(
+            json.dumps(material, sort_keys=True).encode(), digest_size=32
+        ).hexdigest()
+
+    def fetch(self, key: str, dest_dir: Path) -> Path | None:
+        """
+        Put the cached artifact for ``key`` into ``dest_dir``.
+
+        Returns its path, or None on a miss.
+        """
+        record_path = self.objects / f"{key}.json"
+        record = _read_json(record_path)
+        if record is None:
+            return None
+
+        object_path = self.objects / key
+        try:
+            current = file_signature(object_path)
+        except FileNotFoundError:
+            # Evicted by another process since the record was read.
+            return None
+        if current != record["signature"]:
+            # Changed in place, e.g. through a hard-linked artifact edited
+            # by other tools, so the entry no longer holds the artifact.
+            logger.warning(f"Encode cache entry {key} was modified; dropping it")
+            self._drop(key)
+            return None
+
+        dest_dir = Path(dest_dir)
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        artifact = dest_dir / record["name"]
+        try:
+            with stage("EncodeCache.fetch", path=str(artifact)) as metrics:
+                method = link_or_copy(object_path, artifact)
+                if method == "copy":
+                    metrics.add(bytes_written=record["signature"]["size"])
+            os.utime(record_path)
+        except FileNotFoundError:
+            return None
+        logger.info(f"Encode cache hit: {artifact} ({method} of entry {key})")
+        return artifact
+
+    def store(self, key: str, artifact: Path, input_file: Path, signature: dict):
+        """
+        Add ``artifact`` to the cache under ``key``, evicting if needed.
+
+        Nothing is stored if ``input_file`` no longer matches the
+        ``signature`` it was hashed with: it changed while being encoded.
+        """
+        artifact = Path(artifact)
+        if file_signature(Path(input_file).resolve()) != signature:
+            logger.warning(f"{input_file} changed while encoding; not cached")
+            return
+        record_path = self.objects / f"{key}.json"
+        if record_path.exists():
+            os.utime(record_path)
+            return
+
+        size = artifact.stat().st_size
+        if self.max_size and size > self.max_size:
+            logger.info(f"{artifact} is larger than the encode cache; not cached")
+            return
+
+        object_path = self.objects / key
+        staged = self.objects / f"{key}.{os.getpid()}.tmp"
+        try:
+            with stage("EncodeCache.store", path=str(artifact)) as metrics:
+                method = link_or_copy(artifact, staged)
+                if method == "copy":
+                    metrics.add(bytes_written=size)
+
+            with self._locked():
+                if record_path.exists():
+                    # Another process stored the same input meanwhile.
+                    os.utime(record_path)
+                    return
+                os.replace(staged, object_path)
+                # Counted before the record is written: a total rebuilt by
+                # _scan_total must not include this entry already.
+                total = self._read_total() + size
+                _write_json(
+                    record_path,
+                    {"name": artifact.name, "signature": file_signature(object_path)},
+                )
+                if self.max_size and total > self.max_size:
+                    total = self._evict(int(self.max_size * EVICT_TO))
+                self._write_total(total)
+        finally:
+            staged.unlink(missing_ok=True)
+        logger.info(f"Stored {artifact} in the encode cache ({method}, entry {key})")
+
+    def _read_total(self) -> int:
+        try:
+            return int((self.directory / "total").read_text())
+        except (OSError, ValueError):
+            return self._scan_total()
+
+    def _write_total(self, total: int):
+        tmp_path = self.directory / "total.tmp"
+        tmp_path.write_text(str(total))
+        os.replace(tmp_path, self.directory / "total")
+
+    def _entries(self) -> list[tuple[float, str, int]]:
+        """``(last_used, key, size)`` of every entry, oldest first."""
+        entries = []
+        for record_path in self.objects.glob("*.json"):
+            record = _read_json(record_path)
+            try:
+                last_used = record_path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if record is not None:
+                size = int(record["signature"]["size"])
+                entries.append((last_used, record_path.stem, size))
+        return sorted(entries)
+
+    def _scan_total(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _remove(self, key: str):
+        (self.objects / f"{key}.json").unlink(missing_ok=True)
+        (self.objects / key).unlink(missing_ok=True)
+
+    def _drop(self, key: str):
+        """Remove one entry and take it off the total."""
+        with self._locked():
+            record = _read_json(self.objects / f"{key}.json")
+            if record is None:
+                return
+            self._remove(key)
+            total = self._read_total() - int(record["signature"]["size"])
+            self._write_total(max(0, total))
+
+    def _evict(self, target: int) -> int:
+        """Remove least recently used entries down to ``target`` bytes."""
+        entries = self._entries()
+        total = sum(size for _, _, size in entries)
+        evicted = 0
+        for last_used, key, size in entries:
+            if total <= target:
+                break
+            self._remove(key)
+            total -= size
+            evicted += 1
+            logger.debug(
+                f"Evicted encode cache entry {key} "
+                f"(last used {time.ctime(last_used)})"
+            )
+        logger.info(f"Evicted {evicted} encode cache entries; {total} bytes left")
+        return total
@@ -0,0 +1,242 @@
+import ctypes
+import errno
+import fcntl
+import os
+import shutil
+from pathlib import Path
+
+from src.encoding.parallel import pwrite_all
+from src.encoding.sparse import data_extents, page_runs
+from src.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+COPY_CHUNK = 64 * 1024 * 1024  # 64 MB per copy_file_range / pread call
+
+FALLOC_FL_KEEP_SIZE = 0x01
+FALLOC_FL_PUNCH_HOLE = 0x02
+FALLOC_FL_COLLAPSE_RANGE = 0x08
+FALLOC_FL_INSERT_RANGE = 0x20
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int): clone a whole file (reflink)
+
+# Errors that mean a syscall is unavailable here, not that I/O failed.
+_UNSUPPORTED = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP}
+
+
+def copy_range(fd_in: int, fd_out: int, src_offset: int, dst_offset: int, length):
+    """
+    Copy ``length`` bytes between two descriptors (or within one file).
+
+    Uses ``copy_file_range`` so the kernel (or the filesystem, via reflinks)
+    moves the data, and falls back to bounded pread/pwrite chunks when the
+    syscall is unavailable. Source and destination ranges must not overlap.
+    """
+    use_kernel = hasattr(os, "copy_file_range")
+    while length > 0:
+        step = min(length, COPY_CHUNK)
+        copied = 0
+        if use_kernel:
+            try:
+                copied = os.copy_file_range(fd_in, fd_out, step, src_offset, dst_offset)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+                logger.debug(f"copy_file_range unavailable ({e}); using pread")
+                use_kernel = False
+        if not use_kernel:
+            data = os.pread(fd_in, step, src_offset)
+            pwrite_all(fd_out, data, dst_offset)
+            copied = len(data)
+        if copied == 0:
+            raise EOFError(f"Unexpected end of file at offset {src_offset}")
+        src_offset += copied
+        dst_offset += copied
+        length -= copied
+
+
+def copy_sparse(src_path, dst_path):
+    """
+    Copy a file, keeping its holes.
+
+    Only the data extents found with SEEK_DATA / SEEK_HOLE are copied into
+    a destination truncated to the full size; holes are never read or
+    written. Permission bits are copied as ``shutil.copy`` does.
+    """
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        size = os.fstat(src.fileno()).st_size
+        dst.truncate(size)
+        for lo, hi in data_extents(src.fileno(), 0, size):
+            copy_range(src.fileno(), dst.fileno(), lo, lo, hi - lo)
+    shutil.copymode(src_path, dst_path)
+
+
+def reflink(src_path, dst_path) -> bool:
+    """
+    Create ``dst_path`` as a copy-on-write clone of ``src_path``.
+
+    The clone shares the source's extents, so no data is copied. Returns
+    False (and leaves no ``dst_path``) on filesystems without reflinks.
+    """
+    try:
+        with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError as e:
+        Path(dst_path).unlink(missing_ok=True)
+        if e.errno not in _UNSUPPORTED | {errno.ENOTTY, errno.EPERM}:
+            raise
+        logger.debug(f"reflink unavailable ({e})")
+        return False
+    shutil.copymode(src_path, dst_path)
+    return True
+
+
+def link_or_copy(src_path, dst_path) -> str:
+    """
+    Make ``dst_path`` hold the contents of ``src_path`` as cheaply as possible.
+
+    Tries a reflink, then a hard link, then a sparse copy, and returns the
+    method used (``"reflink"``, ``"hardlink"`` or ``"copy"``). An existing
+    ``dst_path`` is replaced atomically.
+    """
+    dst_path = Path(dst_path)
+    tmp_path = dst_path.with_name(f"{dst_path.name}.{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        if reflink(src_path, tmp_path):
+            method = "reflink"
+        else:
+            try:
+                os.link(src_path, tmp_path)
+                method = "hardlink"
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED | {errno.EPERM, errno.EMLINK}:
+                    raise
+                logger.debug(f"hard link unavailable ({e}); copying")
+                copy_sparse(src_path, tmp_path)
+                method = "copy"
+        os.replace(tmp_path, dst_path)
+    finally:
+        # rename() is a no-op when both names are links to the same file.
+        tmp_path.unlink(missing_ok=True)
+    return method
+
+
+def break_link(path) -> bool:
+    """
+    Give ``path`` an inode of its own if other hard links share it.
+
+    Call before changing a file in place, so the other links (e.g. an
+    EncodeCache entry) keep their bytes. The file is cloned (reflink) or
+    copied next to itself and renamed over ``path``. Returns True if it
+    was hard-linked and has been replaced.
+    """
+    path = Path(path)
+    if path.stat().st_nlink <= 1:
+        return False
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        if not reflink(path, tmp_path):
+            copy_sparse(path, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    logger.info(f"{path} was hard-linked; modifying a private copy")
+    return True
+
+
+def _fallocate(fd: int, mode: int, offset: int, length: int) -> bool:
+    """
+    Call fallocate(2) with ``mode``; return False if it is not supported.
+
+    Unsupported covers platforms without fallocate, filesystems that do not
+    implement the mode and ranges that are not aligned to the block size.
+    """
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fallocate = libc.fallocate
+    except (AttributeError, OSError):
+        return False
+
+    fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+    fallocate.restype = ctypes.c_int
+    if fallocate(fd, mode, offset, length) == 0:
+        return True
+
+    err = ctypes.get_errno()
+    if err in _UNSUPPORTED:
+        logger.debug(f"fallocate mode {mode:#x} unsupported: {os.strerror(err)}")
+        return False
+    raise OSError(err, os.strerror(err))
+
+
+def insert_range(fd: int, offset: int, length: int) -> bool:
+    """Insert a hole of ``length`` bytes at ``offset`` without moving data."""
+    return _fallocate(fd, FALLOC_FL_INSERT_RANGE, offset, length)
+
+
+def collapse_range(fd: int, offset: int, length: int) -> bool:
+    """Remove ``length`` bytes at ``offset`` without moving data."""
+    return _fallocate(fd, FALLOC_FL_COLLAPSE_RANGE, offset, length)
+
+
+def punch_hole(fd: int, offset: int, length: int) -> bool:
+    """Deallocate ``length`` bytes at ``offset``; they then read as zeros."""
+    return _fallocate(fd, FALLOC_FL_PUNCH_HOLE | FALLOC_FL_KEEP_SIZE, offset, length)
+
+
+def _write_chunk(fd: int, data: bytes, offset: int):
+    """Write ``data`` at ``offset``, punching holes for its all-zero pages."""
+    buf, runs = page_runs(data)
+    for lo, hi, live in runs:
+        if live or not punch_hole(fd, offset + lo, hi - lo):
+            pwrite_all(fd, buf[lo:hi], offset + lo)
+
+
+def shift_up(fd: int, size: int, shift: int):
+    """
+    Move bytes ``[0, size)`` of a file to ``[shift, shift + size)`` in place.
+
+    Chunks are moved back to front so no byte is overwritten before it has
+    been copied; the file is extended by ``shift`` bytes first. All-zero
+    pages are punched as holes, keeping sparse files sparse.
+    """
+    os.ftruncate(fd, size + shift)
+    end = size
+    while end > 0:
+        start = max(0, end - COPY_CHUNK)
+        data = os.pread(fd, end - start, start)
+        _write_chunk(fd, data, start + shift)
+        end = start
+
+
+def shift_down(fd: int, size: int, shift: int, offset: int = 0):
+    """
+    Move bytes ``[offset + shift, size)`` of a file down by ``shift`` in place.
+
+    This drops ``[offset, offset + shift)``; with the default offset the
+    first ``shift`` bytes are removed. Chunks are moved front to back with
+    bounded memory, then the file is truncated to its new size. All-zero
+    pages are punched as holes.
+    """
+    start = offset + shift
+    while start < size:
+        data = os.pread(fd, min(COPY_CHUNK, size - start), start)
+        if not data:
+            raise EOFError(f"Unexpected end of file at offset {start}")
+        _write_chunk(fd, data, start - shift)
+        start += len(data)
+    os.ftruncate(fd, size - shift)
+
+
+def remove_range(fd: int, offset: int, length: int):
+    """
+    Remove ``length`` bytes at ``offset``, moving the rest of the file down.
+
+    FALLOC_FL_COLLAPSE_RANGE is used when the filesystem supports it and
+    the range is block-aligned; otherwise the tail is shifted down.
+    """
+    if length <= 0 or collapse_range(fd, offset, length):
+        return
+    shift_down(fd, os.fstat(fd).st_size, length, offset)
@@ -0,0 +1,233 @@
+import numpy as np
+
+from src.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _gf_mult_nolut(x, y, prim, field_charac_full):
+    """Carry-less multiplication of two field elements reduced by ``prim``."""
+    result = 0
+    while y:
+        if y & 1:
+            result ^= x
+        y >>= 1
+        x <<= 1
+        if prim > 0 and x & field_charac_full:
+            x ^= prim
+    return result
+
+
+class BatchRSCodec:
+    """
+    Vectorized GF(2^8) Reed-Solomon codec operating on many blocks at once.
+
+    The codec is driven by the same parameters as ``reedsolo.RSCodec`` and
+    produces byte-identical codewords, so artifacts written with either
+    implementation can be decoded by the other.
+
+    Parity and syndromes are linear maps over GF(2^8): every output symbol
+    is the XOR of one table lookup per input symbol. The lookup tables are
+    precomputed once, stored as ``uint64`` words, and applied to a whole
+    batch of blocks per input position.
+    """
+
+    SLICE_BLOCKS = 4096
+
+    def __init__(
+        self,
+        nsym=10,
+        nsize=255,
+        fcr=0,
+        prim=0x11D,
+        generator=2,
+        c_exp=8,
+        single_gen=True,
+    ):
+        if c_exp != 8:
+            raise ValueError(f"BatchRSCodec only supports c_exp=8, got {c_exp}")
+        if not 0 < nsym < nsize <= 255:
+            raise ValueError(f"Invalid RS parameters: nsize={nsize}, nsym={nsym}")
+
+        self.nsym = nsym
+        self.nsize = nsize
+        self.fcr = fcr
+        self.prim = prim
+        self.generator = generator
+        self.block_size = nsize - nsym
+
+        self.gf_exp, self.gf_log = self._init_tables(prim, generator)
+        self.gf_mul = self._mul_table()
+        self.gen = self._generator_poly()
+
+        # Parity and syndrome rows are padded to whole uint64 words.
+        self._words = -(-nsym // 8)
+        self._parity_table = self._pack(self._parity_rows())
+        self._syndrome_table = self._pack(self._syndrome_rows())
+
+    @staticmethod
+    def _init_tables(prim, generator):
+        """Build the anti-log and log tables exactly like reedsolo.init_tables."""
+        field_charac = 255
+        gf_exp = np.zeros(field_charac * 2, dtype=np.int64)
+        gf_log = np.zeros(field_charac + 1, dtype=np.int64)
+        x = 1
+        for i in range(field_charac):
+            gf_exp[i] = x
+            gf_log[x] = i
+            x = _gf_mult_nolut(x, generator, prim, field_charac + 1)
+        gf_exp[field_charac:] = gf_exp[:field_charac]
+        return gf_exp, gf_log
+
+    def _mul_table(self):
+        """Full 256x256 multiplication table."""
+        logs = self.gf_log
+        table = self.gf_exp[(logs[:, None] + logs[None, :]) % 255].astype(np.uint8)
+        table[0, :] = 0
+        table[:, 0] = 0
+        return table
+
+    def _pow(self, x, power):
+        return int(self.gf_exp[(int(self.gf_log[x]) * power) % 255])
+
+    def _generator_poly(self):
+        """Generator polynomial, highest degree first, as in rs_generator_poly."""
+        g = [1]
+        for i in range(self.nsym):
+            root = self._pow(self.generator, i + self.fcr)
+            shifted = g + [0]
+            for j, coef in enumerate(g):
+                shifted[j + 1] ^= int(self.gf_mul[coef, root])
+            g = shifted
+        return g
+
+    def _parity_rows(self):
+        """
+        Parity contribution of a unit symbol at each message position.
+
+        The parity of ``x^e`` is ``x^(e + nsym) mod g``; the remainders are
+        generated by repeated multiplication by ``x`` starting from the last
+        message position.
+        """
+        nsym = self.nsym
+        rem = [0] * (nsym - 1) + [1]  # x^0, highest degree first
+        for _ in range(nsym):
+            rem = self._times_x(rem)
+
+        rows = np.zeros((self.block_size, nsym), dtype=np.uint8)
+        for pos in range(self.block_size - 1, -1, -1):
+            rows[pos] = rem
+            rem = self._times_x(rem)
+        return rows
+
+    def _times_x(self, rem):
+        """Multiply a remainder polynomial by ``x`` modulo the generator."""
+        lead = rem[0]
+        shifted = rem[1:] + [0]
+        if lead:
+            for j in range(self.nsym):
+                shifted[j] ^= int(self.gf_mul[lead, self.gen[j + 1]])
+        return shifted
+
+    def _syndrome_rows(self):
+        """
+        Contribution of each codeword position to each syndrome.
+
+        Syndrome ``j`` evaluates the codeword polynomial (highest degree
+        first) at ``generator^(j + fcr)``, as rs_calc_syndromes does.
+        """
+        n = self.nsize
+        rows = np.zeros((n, self.nsym), dtype=np.uint8)
+        for j in range(self.nsym):
+            root = self._pow(self.generator, j + self.fcr)
+            for pos in range(n):
+                rows[pos, j] = self._pow(root, n - 1 - pos)
+        return rows
+
+    def _pack(self, rows):
+        """Expand (positions, nsym) coefficients into uint64 lookup tables."""
+        positions = rows.shape[0]
+        table = np.zeros((positions, 256, self._words * 8), dtype=np.uint8)
+        table[:, :, : self.nsym] = self.gf_mul[:, rows].transpose(1, 0, 2)
+        return table.view(np.uint64)
+
+    def _apply(self, table, symbols):
+        """XOR-accumulate one table lookup per column of ``symbols``."""
+        n_blocks = symbols.shape[0]
+        out = np.empty((n_blocks, self._words), dtype=np.uint64)
+        # Work through cache-sized slices so the accumulator stays hot.
+        for start in range(0, n_blocks, self.SLICE_BLOCKS):
+            stop = min(start + self.SLICE_BLOCKS, n_blocks)
+            columns = np.ascontiguousarray(symbols[start:stop].T)
+            acc = out[start:stop]
+            acc.fill(0)
+            lookup = np.empty_like(acc)
+            for pos in range(columns.shape[0]):
+                np.take(table[pos], columns[pos], axis=0, out=lookup)
+                acc ^= lookup
+        return out.view(np.uint8)[:, : self.nsym]
+
+    def parity(self, blocks: np.ndarray) -> np.ndarray:
+        """
+        Compute the ECC symbols of a batch of message blocks.
+
+        Parameters
+        ----------
+        blocks : np.ndarray
+            ``uint8`` array shaped ``(n_blocks, nsize - nsym)``.
+
+        Returns
+        -------
+        np.ndarray
+            ``uint8`` array shaped ``(n_blocks, nsym)``.
+        """
+        if blocks.ndim != 2 or blocks.shape[1] != self.block_size:
+            raise ValueError(
+                f"Expected blocks shaped (n, {self.block_size}), got {blocks.shape}"
+            )
+        return self._apply(self._parity_table, blocks)
+
+    def encode_blocks(self, blocks: np.ndarray) -> np.ndarray:
+        """
+        Systematically encode a batch of message blocks.
+
+        Parameters
+        ----------
+        blocks : np.ndarray
+            ``uint8`` array shaped ``(n_blocks, nsize - nsym)``.
+
+        Returns
+        -------
+        np.ndarray
+            ``uint8`` array shaped ``(n_blocks, nsize)``: each row is the
+            message followed by its ECC symbols, as ``RSCodec.encode`` emits.
+        """
+        codewords = np.empty((blocks.shape[0], self.nsize), dtype=np.uint8)
+        codewords[:, : self.block_size] = blocks
+        codewords[:, self.block_size :] = self.parity(blocks)
+        return codewords
+
+    def syndromes(self, codewords: np.ndarray) -> np.ndarray:
+        """
+        Compute the syndromes of a batch of codewords.
+
+        Parameters
+        ----------
+        codewords : np.ndarray
+            ``uint8`` array shaped ``(n_blocks, nsize)``.
+
+        Returns
+        -------
+        np.ndarray
+            ``uint8`` array shaped ``(n_blocks, nsym)``; a row is all zeros
+            exactly when the codeword is valid.
+        """
+        if codewords.ndim != 2 or codewords.shape[1] != self.nsize:
+            raise ValueError(
+                f"Expected codewords shaped (n, {self.nsize}), got {codewords.shape}"
+            )
+        return self._apply(self._syndrome_table, codewords)
+
+    def dirty_mask(self, codewords: np.ndarray) -> np.ndarray:
+        """Boolean mask of codewords with at least one nonzero syndrome."""
+        return self.syndromes(codewords).any(axis=1)
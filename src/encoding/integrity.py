@@ -0,0 +1,89 @@
+import hashlib
+import os
+
+from src.encoding.sparse import data_extents
+from src.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+HASH_CHUNK = 8 * 1024 * 1024  # 8 MB per pread when hashing a whole file
+_ZEROS = bytes(HASH_CHUNK)
+
+
+class IntegrityError(ValueError):
+    """Recovered data does not match the digest recorded at encode time."""
+
+
+def new_digest(algorithm: str | None):
+    """
+    Return a fresh hashlib object for ``algorithm``, or None if disabled.
+
+    ``algorithm`` is any hashlib name (e.g. ``blake2b`` or ``sha256``);
+    ``None``, ``""`` and ``"none"`` disable the digest.
+    """
+    if not algorithm or str(algorithm).lower() == "none":
+        return None
+    try:
+        return hashlib.new(str(algorithm).lower())
+    except ValueError as e:
+        raise ValueError(f"Unsupported digest algorithm {algorithm!r}") from e
+
+
+def update_zeros(digest, length: int):
+    """Feed ``length`` zero bytes (e.g. a hole that was never read)."""
+    while length > 0:
+        step = min(length, HASH_CHUNK)
+        digest.update(_ZEROS[:step])
+        length -= step
+
+
+def update_pieces(digest, pieces):
+    """
+    Feed ``pieces`` in order: bytes-like data, or ints counting zero bytes.
+
+    Workers return what they read or wrote in this form, so holes need not
+    be sent back as zeros.
+    """
+    for piece in pieces:
+        if isinstance(piece, int):
+            update_zeros(digest, piece)
+        else:
+            digest.update(piece)
+
+
+def hash_file(path, length: int, algorithm: str) -> str:
+    """
+    Hex digest of the first ``length`` bytes of ``path``.
+
+    Holes are hashed as zeros without being read.
+    """
+    digest = new_digest(algorithm)
+    with open(path, "rb") as f:
+        fd = f.fileno()
+        offset = 0
+        for lo, hi in data_extents(fd, 0, length):
+            update_zeros(digest, lo - offset)
+            while lo < hi:
+                chunk = os.pread(fd, min(HASH_CHUNK, hi - lo), lo)
+                if not chunk:
+                    raise EOFError(f"Unexpected end of {path} at offset {lo}")
+                digest.update(chunk)
+                lo += len(chunk)
+            offset = hi
+        update_zeros(digest, length - offset)
+    return digest.hexdigest()
+
+
+def digest_record(algorithm: str, hexdigest: str) -> dict:
+    """The Metadata2 ``digest`` entry."""
+    return {"algorithm": algorithm, "hexdigest": hexdigest}
+
+
+def check_digest(expected: dict, hexdigest: str, what):
+    """Raise IntegrityError unless ``hexdigest`` matches ``expected``."""
+    if hexdigest != expected["hexdigest"]:
+        raise IntegrityError(
+            f"{expected['algorithm']} digest mismatch for {what}: "
+            f"expected {expected['hexdigest']}, got {hexdigest}"
+        )
+    logger.info(f"{expected['algorithm']} digest verified for {what}")
@@ -0,0 +1,130 @@
+import os
+
+import numpy as np
+
+from src.encoding.parallel import pwrite_all
+from src.encoding.sparse import pwrite_sparse
+
+
+class InterleaveLayout:
+    """
+    Position of every codeword symbol in the interleaved (transposed) data.
+
+    The codeword stream is cut into segments of ``depth`` codewords (the last
+    one may be shorter). Each segment of ``n`` codewords is stored as its own
+    ``(nsize, n)`` transpose, and segments follow one another, so symbol
+    ``j`` of the ``i``-th codeword of a segment starting at codeword ``f``
+    lives at ``f * nsize + j * n + i``.
+
+    A depth of 0 (or one covering all codewords) is the original layout:
+    the whole file is a single ``(nsize, rows)`` transpose. A burst of up to
+    ``depth * nsym // 2`` bytes is still correctable within each segment.
+    """
+
+    def __init__(self, nsize: int, total_codewords: int, depth: int = 0):
+        self.nsize = nsize
+        self.total_codewords = total_codewords
+        depth = int(depth or 0)
+        if depth <= 0 or depth > total_codewords:
+            depth = max(1, total_codewords)
+        self.depth = depth
+
+    @property
+    def data_size(self) -> int:
+        """Size in bytes of the interleaved data."""
+        return self.total_codewords * self.nsize
+
+    def segment(self, codeword: int) -> tuple[int, int]:
+        """Return ``(first, last)`` codeword bounds of a codeword's segment."""
+        first = (codeword // self.depth) * self.depth
+        return first, min(first + self.depth, self.total_codewords)
+
+    def segments(self):
+        """Yield the ``(first, last)`` bounds of every segment."""
+        for first in range(0, self.total_codewords, self.depth):
+            yield first, min(first + self.depth, self.total_codewords)
+
+    def split(self, first: int, last: int):
+        """Split codewords ``[first, last)`` at segment boundaries."""
+        while first < last:
+            _, seg_last = self.segment(first)
+            stop = min(last, seg_last)
+            yield first, stop
+            first = stop
+
+    def symbol_offset(self, codeword: int, symbol: int) -> int:
+        """Byte offset of symbol ``symbol`` of ``codeword``."""
+        seg_first, seg_last = self.segment(codeword)
+        return (
+            seg_first * self.nsize
+            + symbol * (seg_last - seg_first)
+            + (codeword - seg_first)
+        )
+
+    def stripes(self, first: int, last: int):
+        """
+        Yield ``(symbol, offset)`` for each row-stripe of ``[first, last)``.
+
+        The range must lie within one segment; each stripe is
+        ``last - first`` bytes long.
+        """
+        for symbol in range(self.nsize):
+            yield symbol, self.symbol_offset(first, symbol)
+
+    def is_whole_segment(self, first: int, last: int) -> bool:
+        """True if ``[first, last)`` is exactly one segment (one contiguous run)."""
+        return self.segment(first) == (first, last)
+
+
+def write_interleaved(
+    fd: int,
+    layout: InterleaveLayout,
+    base: int,
+    first,
+    codewords,
+    sparse=False,
+    checksums=None,
+):
+    """
+    Scatter codewords ``first, first + 1, ...`` into their interleaved places.
+
+    ``codewords`` is shaped (n, nsize) and ``base`` is the file offset of the
+    interleaved data. A range covering a whole segment is written as one
+    sequential run. With ``sparse`` the target reads as zeros and all-zero
+    pages are skipped (see pwrite_sparse). Every run written is also added
+    to ``checksums`` (a RegionCRCs of the interleaved data), if given.
+    Returns the number of bytes actually written.
+    """
+    write = pwrite_sparse if sparse else pwrite_all
+    last = first + codewords.shape[0]
+    written = 0
+    for start, stop in layout.split(first, last):
+        columns = np.ascontiguousarray(codewords[start - first : stop - first].T)
+        if layout.is_whole_segment(start, stop):
+            written += write(fd, columns, base + start * layout.nsize)
+            if checksums is not None:
+                checksums.update(start * layout.nsize, columns)
+            continue
+        for symbol, offset in layout.stripes(start, stop):
+            written += write(fd, columns[symbol], base + offset)
+            if checksums is not None:
+                checksums.update(offset, columns[symbol])
+    return written
+
+
+def read_interleaved(fd: int, layout: InterleaveLayout, base: int, first, last):
+    """Gather codewords ``[first, last)`` as an (n, nsize) uint8 array."""
+    codewords = np.empty((last - first, layout.nsize), dtype=np.uint8)
+    for start, stop in layout.split(first, last):
+        count = stop - start
+        if layout.is_whole_segment(start, stop):
+            chunk = os.pread(fd, count * layout.nsize, base + start * layout.nsize)
+            columns = np.frombuffer(chunk, dtype=np.uint8).reshape(layout.nsize, -1)
+        else:
+            columns = np.empty((layout.nsize, count), dtype=np.uint8)
+            for symbol, offset in layout.stripes(start, stop):
+                columns[symbol] = np.frombuffer(
+                    os.pread(fd, count, base + offset), np.uint8
+                )
+        codewords[start - first : stop - first] = columns.T
+    return codewords
@@ -2,11 +2,18 @@ import json
 import shutil
 from pathlib import Path
 
+from src.encoding.file_ops import copy_sparse
 from src.logging.logger import get_logger
+from src.logging.metrics import stage
 
 logger = get_logger(__name__)
 
 
+def metadata1_footer(metadata: dict) -> bytes:
+    """The Metadata1 footer (name, path and size) that follows the contents"""
+    return f"Metadata1 for : {json.dumps(metadata)}\n".encode("utf-8")
+
+
 class Metadata1Appender:
 
     def __init__(self, config, file_path: Path):
@@ -50,12 +57,15 @@ class Metadata1Appender:
         }
         return metadata
 
+    def footer(self) -> bytes:
+        """The Metadata1 footer that follows the file contents"""
+        return metadata1_footer(self.metadata)
+
     def append_metadata(self):
         """Append metadata to destination file"""
         try:
             with open(self.dest_path, "ab") as f:
-                metadata_str = f"Metadata1 for : {json.dumps(self.metadata)}\n"
-                f.write(metadata_str.encode("utf-8"))
+                f.write(self.footer())
             logger.debug(f"Metadata appended to {self.dest_path}")
         except IOError as e:
             logger.error(f"Failed to append metadata to {self.dest_path}: {e}")
@@ -65,7 +75,7 @@ class Metadata1Appender:
         """Copy file to destination directory"""
         try:
             self.dest_dir.mkdir(exist_ok=True, parents=True)
-            shutil.copy(self.file_path, self.dest_path)
+            copy_sparse(self.file_path, self.dest_path)
             logger.info(f"File copied from {self.file_path} to {self.dest_path}")
         except (shutil.Error, IOError) as e:
             logger.error(f"Failed to copy file to {self.dest_path}: {e}")
@@ -78,11 +88,16 @@ class Metadata1Appender:
                 f"Starting metadata1 processing for {self.file_path} (size: {self.file_size})"
             )
 
-            self.copy_file()
-            logger.info(f"File copied successfully to {self.dest_path}")
+            with stage("Metadata1Appender", path=str(self.file_path)) as metrics:
+                self.copy_file()
+                logger.info(f"File copied successfully to {self.dest_path}")
 
-            self.append_metadata()
-            logger.info("Metadata1 appended successfully")
+                self.append_metadata()
+                logger.info("Metadata1 appended successfully")
+                metrics.add(
+                    bytes_read=self.file_size,
+                    bytes_written=self.file_size + len(self.footer()),
+                )
 
         except Exception as e:
             logger.error(f"Failed to process file {self.file_path}: {e}")
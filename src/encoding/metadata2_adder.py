@@ -1,50 +1,66 @@
-import ast
-import json
+import zlib
 from pathlib import Path
 
+from src.encoding.checksums import INDEX_DTYPE, compute_index
+from src.encoding.metadata2_trailer import build_record
+from src.encoding.parallel import resolve_workers
 from src.logging.logger import get_logger
+from src.logging.metrics import stage
 
 logger = get_logger(__name__)
 
 
 class Metadata2Adder:
-    def __init__(self, config, file_path: Path):
-        """Initialize the Metadata2Adder with configuration and file path."""
+    def __init__(
+        self,
+        config,
+        file_path: Path,
+        metadata1: dict | None = None,
+        payload_size: int | None = None,
+        interleave_depth: int | None = None,
+        digest: dict | None = None,
+        compression: dict | None = None,
+        checksum_index=None,
+    ):
+        """
+        Initialize the Metadata2Adder with configuration and file path.
+
+        ``metadata1`` (name, path and size of the original file) and
+        ``payload_size`` (bytes fed to the RS encoder, Metadata1 footer
+        included) are recorded so recovery can write the exact original
+        bytes without scanning for the footer. ``interleave_depth``
+        overrides ``encoding.interleave_depth`` for encoders that pick
+        their own. ``digest`` (algorithm and hex digest of the original
+        data) lets recovery verify its output end to end. ``compression``
+        (codec and stored chunk sizes, from ChunkCompressor) marks a payload
+        that recovery must decompress. ``checksum_index`` is the CRC32 index
+        of the interleaved data when the encoder computed it while writing;
+        otherwise it is computed here by reading the data back.
+        """
         self.config = config
         self.file_path = Path(file_path)
+        self.metadata1 = metadata1
+        self.payload_size = payload_size
+        self.digest = digest
+        self.compression = compression
+        self.checksum_index = checksum_index
 
         if not self.file_path.exists():
             raise FileNotFoundError(f"{self.file_path} does not exist")
 
         self.encoding_cfg = config["encoding"]
         self.rs_params = self.encoding_cfg["reed_solomon"]
-        self.meta2_cfg = self.encoding_cfg["metadata2"]
+        if interleave_depth is None:
+            interleave_depth = self.encoding_cfg.get("interleave_depth", 0)
+        self.interleave_depth = int(interleave_depth)
 
         self.file_size = self.file_path.stat().st_size
         self.padding_config = int(self.encoding_cfg.get("padding_size", 0))
 
-        self.delimiter = self._parse_delimiter(self.meta2_cfg.get("delimiter", b""))
-
         self.padding_applied = self._calculate_applied_padding()
 
         self.encoded_suffix = self.encoding_cfg.get("encoded_file_suffix", "")
-
-    def _parse_delimiter(self, value):
-        """Parse the delimiter value for metadata."""
-        if isinstance(value, (bytes, bytearray)):
-            return bytes(value)
-
-        if isinstance(value, str):
-            text = value.strip()
-            try:
-                parsed = ast.literal_eval(text)
-                if isinstance(parsed, (bytes, bytearray)):
-                    return bytes(parsed)
-            except Exception:
-                pass
-            return text.encode("utf-8")
-
-        raise TypeError(f"Unsupported delimiter type: {type(value)}")
+        self.checksum_region = int(self.encoding_cfg.get("checksum_region", 0))
 
     def _calculate_applied_padding(self):
         """Calculate how much padding has been applied to the file."""
@@ -73,19 +89,67 @@ class Metadata2Adder:
         )
         return padding
 
+    def _build_checksum_index(self):
+        """
+        CRC32 of every ``checksum_region`` bytes of the interleaved data.
+
+        Returns the index bytes and their Metadata2 description, or
+        ``(b"", None)`` when checksums are disabled.
+        """
+        if self.checksum_region <= 0:
+            return b"", None
+
+        data_size = self.file_size - self.padding_applied
+        count = -(-data_size // self.checksum_region)
+        if self.checksum_index is not None:
+            if len(self.checksum_index) != count:
+                raise ValueError(
+                    f"Checksum index has {len(self.checksum_index)} regions, "
+                    f"expected {count} for {data_size} bytes of data"
+                )
+            index = self.checksum_index.astype(INDEX_DTYPE, copy=False).tobytes()
+        else:
+            index = compute_index(
+                self.file_path,
+                self.padding_applied,
+                data_size,
+                self.checksum_region,
+                resolve_workers(self.encoding_cfg.get("workers", 1)),
+            ).tobytes()
+        logger.info(f"Checksummed {count} regions of {self.checksum_region} bytes")
+        return index, {
+            "region": self.checksum_region,
+            "count": count,
+            "index_crc": zlib.crc32(index),
+        }
+
     def _build_metadata_bytes(self):
-        """Build the metadata bytes to be appended to the file."""
+        """
+        Build the metadata bytes to be appended to the file.
+
+        The optional checksum index comes first, then the JSON, followed by
+        a fixed-size trailer (length, checksum and magic) so recovery can
+        find it with a single read at EOF.
+        """
+        index, checksums = self._build_checksum_index()
         meta = {
             "size_before_padding": self.file_size - self.padding_applied,
             "padding": self.padding_applied,
             "rs": dict(self.rs_params),
+            "interleave_depth": self.interleave_depth,
         }
-
-        json_bytes = json.dumps(meta, separators=(",", ":")).encode("utf-8")
-        length = len(json_bytes)
-        length_bytes = length.to_bytes(4, "big")
-
-        return self.delimiter + length_bytes + json_bytes
+        if self.metadata1 is not None:
+            meta["metadata1"] = dict(self.metadata1)
+        if self.payload_size is not None:
+            meta["payload_size"] = self.payload_size
+        if self.digest is not None:
+            meta["digest"] = dict(self.digest)
+        if self.compression is not None:
+            meta["compression"] = dict(self.compression)
+        if checksums is not None:
+            meta["checksums"] = checksums
+
+        return index + build_record(meta)
 
     def add_metadata(self):
         logger.info(f"Appending metadata2 to {self.file_path} (size={self.file_size})")
@@ -118,6 +182,8 @@ class Metadata2Adder:
 
     def run(self):
         """Run the process of appending metadata and ensuring the suffix."""
-        self.add_metadata()
-        final_path = self._ensure_encoded_suffix()
+        with stage("Metadata2Adder", path=str(self.file_path)) as metrics:
+            self.add_metadata()
+            metrics.add(bytes_written=self.file_path.stat().st_size - self.file_size)
+            final_path = self._ensure_encoded_suffix()
         return final_path
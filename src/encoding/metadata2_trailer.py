@@ -0,0 +1,63 @@
+import json
+import os
+import struct
+import zlib
+
+from src.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Fixed-size trailer at the very end of an artifact:
+#   version (u16) | metadata length (u32) | CRC32 of metadata (u32) | magic
+TRAILER = struct.Struct(">HII8s")
+TRAILER_MAGIC = b"TRSENCM2"
+TRAILER_VERSION = 1
+
+
+def build_record(metadata: dict) -> bytes:
+    """Serialize Metadata2 as its JSON bytes followed by the trailer."""
+    json_bytes = json.dumps(metadata, separators=(",", ":")).encode("utf-8")
+    trailer = TRAILER.pack(
+        TRAILER_VERSION, len(json_bytes), zlib.crc32(json_bytes), TRAILER_MAGIC
+    )
+    return json_bytes + trailer
+
+
+def read_record(fd: int, file_size: int):
+    """
+    Read Metadata2 from the trailer at the end of a file.
+
+    Only the trailer and the metadata are read, with two preads.
+
+    Returns
+    -------
+    tuple[dict, int] or None
+        The metadata and the offset where the record starts, or None if the
+        file does not end with a trailer (e.g. a legacy artifact).
+
+    Raises
+    ------
+    ValueError
+        If the trailer is present but unsupported or fails its checksum.
+    """
+    if file_size < TRAILER.size:
+        return None
+
+    version, length, checksum, magic = TRAILER.unpack(
+        os.pread(fd, TRAILER.size, file_size - TRAILER.size)
+    )
+    if magic != TRAILER_MAGIC:
+        return None
+    if version > TRAILER_VERSION:
+        raise ValueError(f"Unsupported Metadata2 trailer version {version}")
+
+    start = file_size - TRAILER.size - length
+    if start < 0:
+        raise ValueError(f"Metadata2 length {length} exceeds file size {file_size}")
+
+    json_bytes = os.pread(fd, length, start)
+    if zlib.crc32(json_bytes) != checksum:
+        raise ValueError("Metadata2 checksum mismatch; trailer is corrupt")
+
+    logger.debug(f"Read Metadata2 trailer v{version} ({length} bytes)")
+    return json.loads(json_bytes.decode("utf-8")), start
@@ -1,7 +1,10 @@
 import mmap
+import os
 from pathlib import Path
 
+from src.encoding.file_ops import copy_range, insert_range, shift_up
 from src.logging.logger import get_logger
+from src.logging.metrics import stage
 
 logger = get_logger(__name__)
 
@@ -11,6 +14,7 @@ class PaddingAdder:
         self.in_path = in_path
         self.input_size = in_path.stat().st_size
         self.padding_size = min(config["encoding"]["padding_size"], self.input_size)
+        self.in_place = bool(config["encoding"].get("padding_in_place", False))
 
     def add_padding(self):
         try:
@@ -64,6 +68,49 @@ class PaddingAdder:
             logger.error(f"Error adding padding to file {self.in_path}: {str(e)}")
             raise
 
+    def add_padding_in_place(self):
+        """
+        Prepend the padding inside the same file, without a .tmp copy.
+
+        A hole is inserted at the start with FALLOC_FL_INSERT_RANGE when the
+        filesystem supports it, so the existing data is not moved at all;
+        otherwise the data is shifted back to front within the file. The
+        padding region is then filled with copy_file_range.
+        """
+        try:
+            logger.info(
+                f"Adding first {self.padding_size / (1024**3):.2f} GB in place "
+                f"to beginning of file: {self.in_path}"
+            )
+
+            fd = os.open(self.in_path, os.O_RDWR)
+            try:
+                if insert_range(fd, 0, self.padding_size):
+                    logger.info("Inserted padding range with fallocate")
+                else:
+                    logger.info("fallocate insert unavailable; shifting data")
+                    shift_up(fd, self.input_size, self.padding_size)
+
+                copy_range(fd, fd, self.padding_size, 0, self.padding_size)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+            logger.info(
+                f"Successfully added padding. New file size: {self.in_path.stat().st_size / (1024**3):.2f} GB"
+            )
+
+        except Exception as e:
+            logger.error(f"Error adding padding to file {self.in_path}: {str(e)}")
+            raise
+
     def run(self):
-        self.add_padding()
+        with stage("PaddingAdder", path=str(self.in_path)) as metrics:
+            if self.in_place and self.padding_size > 0:
+                self.add_padding_in_place()
+                metrics.add(bytes_read=self.padding_size)
+            else:
+                self.add_padding()
+                metrics.add(bytes_read=self.input_size)
+            metrics.add(bytes_written=self.in_path.stat().st_size - self.input_size)
         return self.in_path
@@ -0,0 +1,147 @@
+import os
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+from src.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Each worker task covers this many batches, large enough to amortize the
+# process hand-off and small enough to keep all workers busy until the end.
+BATCHES_PER_CHUNK = 16
+
+
+def resolve_workers(value) -> int:
+    """Turn a ``workers`` config value into a process count (0 = all cores)."""
+    workers = int(value or 0)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def block_ranges(total_blocks: int, chunk_blocks: int):
+    """Split ``range(total_blocks)`` into consecutive ``(first, last)`` pairs."""
+    return [
+        (first, min(first + chunk_blocks, total_blocks))
+        for first in range(0, total_blocks, chunk_blocks)
+    ]
+
+
+def run_ranges(
+    func,
+    total_blocks: int,
+    batch_blocks: int,
+    workers: int,
+    *args,
+    progress=None,
+    consume=None,
+):
+    """
+    Run ``func(*args, first_block, last_block)`` over the whole block range.
+
+    With a single worker the ranges are processed in this process; otherwise
+    they are spread over a process pool. Workers write their output at fixed
+    offsets themselves, so only the return values come back here.
+    ``progress(done_blocks, total_blocks)`` is called as ranges finish:
+    in-process there is no hand-off to amortize, so each range is a single
+    batch and progress is reported per batch.
+
+    ``consume(value)``, if given, is called with each range's return value
+    in block order, as soon as the ranges before it are done, and what it
+    returns is kept instead. This lets ranges hand bulky data (e.g. bytes
+    to hash) to this process in order: ranges are then single batches, and
+    at most ``2 * workers`` of them are submitted ahead of the next one to
+    consume, so the values waiting their turn stay bounded.
+
+    Returns
+    -------
+    list
+        The return value of each range (or of ``consume``), in block order.
+    """
+    chunk_blocks = batch_blocks
+    if consume is None:
+        chunk_blocks *= BATCHES_PER_CHUNK
+    ranges = block_ranges(total_blocks, chunk_blocks)
+
+    done = 0
+    if workers <= 1 or len(ranges) <= 1:
+        results = []
+        for first, last in block_ranges(total_blocks, batch_blocks):
+            result = func(*args, first, last)
+            results.append(result if consume is None else consume(result))
+            if progress is not None:
+                done += last - first
+                progress(done, total_blocks)
+        return results
+
+    workers = min(workers, len(ranges))
+    logger.info(f"Processing {len(ranges)} block ranges on {workers} processes")
+    window = len(ranges) if consume is None else 2 * workers
+    results = [None] * len(ranges)
+    ready = {}
+    submitted = consumed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        while consumed < len(ranges):
+            while submitted < len(ranges) and submitted - consumed < window:
+                first, last = ranges[submitted]
+                pending[pool.submit(func, *args, first, last)] = submitted
+                submitted += 1
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                idx = pending.pop(future)
+                ready[idx] = future.result()
+                if progress is not None:
+                    first, last = ranges[idx]
+                    done += last - first
+                    progress(done, total_blocks)
+            while consumed in ready:
+                result = ready.pop(consumed)
+                results[consumed] = result if consume is None else consume(result)
+                consumed += 1
+    return results
+
+
+def map_ordered(func, items, workers: int):
+    """
+    Yield ``func(*item)`` for each of ``items``, in order.
+
+    Calls run on a thread pool, so this only pays off for functions that
+    release the GIL (zlib, lzma, hashlib). At most two calls per worker
+    are in flight, so ``items`` may be a lazy generator over a large file
+    and memory stays bounded.
+    """
+    if workers <= 1:
+        for item in items:
+            yield func(*item)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(func, *item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def pwrite_all(fd: int, data, offset: int) -> int:
+    """
+    Write all of ``data`` at ``offset``, retrying on short writes.
+
+    Returns the number of bytes written.
+    """
+    view = memoryview(data)
+    total = 0
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
+        total += written
+    return total
@@ -0,0 +1,199 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from src.encoding.checksums import SequentialCRCs
+from src.encoding.codec_backends import get_backend, resolve_backend
+from src.encoding.compression import compression_codec
+from src.encoding.file_ops import copy_range, remove_range
+from src.encoding.integrity import digest_record, new_digest
+from src.encoding.metadata1_appender import metadata1_footer
+from src.encoding.metadata2_adder import Metadata2Adder
+from src.encoding.sparse import pwrite_sparse
+from src.logging.logger import get_logger
+from src.logging.metrics import stage
+
+logger = get_logger(__name__)
+
+# Interleave depth for streams when encoding.interleave_depth is 0: a whole
+# file matrix needs the final size up front, a fixed depth does not.
+DEFAULT_STREAM_DEPTH = 65536
+
+
+class PipeEncoder:
+    """
+    Encode a byte stream of unknown length (e.g. stdin) into an artifact.
+
+    The artifact is identical in format to the file encoders' output. The
+    stream is cut into interleave segments of ``depth`` codewords; each
+    segment is read, RS-encoded and written as its own (nsize, n) transpose
+    right after a region reserved for the padding, so memory holds at most
+    two segments (one being encoded, one being read ahead) whatever the
+    stream length.
+
+    Everything that depends on the final size is written at the end: the
+    Metadata1 footer is encoded after the last input byte, the padding is
+    filled (and the reserved region shrunk when the stream turned out
+    shorter than ``padding_size``), and Metadata2 is appended with the
+    digest of the stream, hashed as it was read, and the checksum index of
+    the segments, computed as they were written.
+    """
+
+    def __init__(self, config, stream, out_path: Path, name: str = "stdin"):
+        self.config = config
+        self.stream = stream
+        self.out_path = Path(out_path)
+        self.name = name
+
+        encoding_cfg = config["encoding"]
+        rs_params = encoding_cfg["reed_solomon"]
+        self.nsize = rs_params["nsize"]
+        self.block_size = rs_params["nsize"] - rs_params["nsym"]
+        rs_items = tuple(sorted(rs_params.items()))
+        backend = resolve_backend(rs_items, encoding_cfg.get("codec_backend", "auto"))
+        self.RS = get_backend(rs_items, backend)
+
+        self.depth = int(encoding_cfg.get("interleave_depth", 0)) or int(
+            encoding_cfg.get("stream_depth", DEFAULT_STREAM_DEPTH)
+        )
+        self.padding_config = max(0, int(encoding_cfg.get("padding_size", 0)))
+        self.digest = new_digest(encoding_cfg.get("digest"))
+        checksum_region = int(encoding_cfg.get("checksum_region", 0))
+        self.checksums = (
+            SequentialCRCs(checksum_region) if checksum_region > 0 else None
+        )
+
+        self.input_size = 0
+        self.codewords = 0
+
+    def _read_full(self, size: int) -> bytes:
+        """Read ``size`` bytes from the stream; fewer only at end of stream."""
+        chunks, remaining = [], size
+        while remaining:
+            chunk = self.stream.read(remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def _write_segment(self, fd: int, payload: bytes) -> int:
+        """
+        Encode ``payload`` (at most one segment) as the next segment.
+
+        Returns the number of bytes written.
+        """
+        k = self.block_size
+        remainder = len(payload) % k
+        if remainder:
+            payload += b"\x00" * (k - remainder)
+        blocks = np.frombuffer(payload, dtype=np.uint8).reshape(-1, k)
+
+        live = blocks.any(axis=1)
+        codewords = np.zeros((len(blocks), self.nsize), dtype=np.uint8)
+        if live.any():
+            codewords[live] = self.RS.encode_blocks(blocks[live])
+
+        # A segment of n codewords is stored as its own (nsize, n) transpose.
+        offset = self.padding_config + self.codewords * self.nsize
+        columns = np.ascontiguousarray(codewords.T)
+        written = pwrite_sparse(fd, columns, offset)
+        if self.checksums is not None:
+            self.checksums.update(columns)
+        self.codewords += len(blocks)
+        return written
+
+    def _encode_stream(self, fd: int, metrics):
+        segment_bytes = self.depth * self.block_size
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            pending = reader.submit(self._read_full, segment_bytes)
+            while True:
+                chunk = pending.result()
+                self.input_size += len(chunk)
+                if self.digest is not None:
+                    self.digest.update(chunk)
+                if len(chunk) < segment_bytes:
+                    break
+                pending = reader.submit(self._read_full, segment_bytes)
+                written = self._write_segment(fd, chunk)
+                metrics.add(
+                    bytes_read=len(chunk), bytes_written=written, blocks=self.depth
+                )
+
+        # End of stream: the size is known, so the footer can follow it.
+        rest = chunk + metadata1_footer(self.metadata1)
+        written = sum(
+            self._write_segment(fd, rest[start : start + segment_bytes])
+            for start in range(0, len(rest), segment_bytes)
+        )
+        metrics.add(
+            bytes_read=len(chunk),
+            bytes_written=written,
+            blocks=-(-len(rest) // self.block_size),
+        )
+
+    @property
+    def metadata1(self) -> dict:
+        return {"name": self.name, "path": self.name, "size": self.input_size}
+
+    def _fill_padding(self, fd: int) -> int:
+        """
+        Put the padding in front of the data and return its size.
+
+        The padding is a copy of the first ``min(padding_size, data size)``
+        bytes of the interleaved data; if that is less than the reserved
+        region, the data is first moved down to close the gap.
+        """
+        data_size = self.codewords * self.nsize
+        os.ftruncate(fd, self.padding_config + data_size)
+        padding = min(self.padding_config, data_size)
+        remove_range(fd, padding, self.padding_config - padding)
+        copy_range(fd, fd, padding, 0, padding)
+        return padding
+
+    def run(self) -> Path:
+        """Encode the whole stream and return the artifact path."""
+        logger.info(
+            f"Starting stream encode into {self.out_path} "
+            f"(interleave depth {self.depth}, padding up to {self.padding_config})"
+        )
+        if compression_codec(self.config["encoding"]) is not None:
+            # Chunk sizes must be known before a segment is encoded.
+            logger.warning("encoding.compression does not apply to streams; ignored")
+        self.out_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with stage("PipeEncoder", path=str(self.out_path)) as metrics:
+                fd = os.open(self.out_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    self._encode_stream(fd, metrics)
+                    padding = self._fill_padding(fd)
+                finally:
+                    os.close(fd)
+                metrics.add(bytes_written=padding)
+            logger.info(
+                f"Encoded {self.input_size} bytes from the stream into "
+                f"{self.codewords} codewords (padding: {padding})"
+            )
+
+            return Metadata2Adder(
+                self.config,
+                self.out_path,
+                metadata1=self.metadata1,
+                payload_size=self.input_size + len(metadata1_footer(self.metadata1)),
+                interleave_depth=self.depth,
+                digest=(
+                    digest_record(self.digest.name, self.digest.hexdigest())
+                    if self.digest is not None
+                    else None
+                ),
+                checksum_index=(
+                    self.checksums.index() if self.checksums is not None else None
+                ),
+            ).run()
+
+        except Exception as e:
+            logger.error(f"Stream encode failed for {self.out_path}: {e}")
+            self.out_path.unlink(missing_ok=True)
+            raise
@@ -2,58 +2,285 @@ import os
 from pathlib import Path
 
 import numpy as np
-from reedsolo import RSCodec
 
+from src.encoding.checksums import RegionCRCs, assemble_index
+from src.encoding.codec_backends import get_backend, resolve_backend
+from src.encoding.integrity import digest_record, new_digest, update_pieces
+from src.encoding.interleave import InterleaveLayout, write_interleaved
+from src.encoding.parallel import resolve_workers, run_ranges
+from src.encoding.sparse import data_extents, has_data, pwrite_sparse
+from src.encoding.transpose_engine import DEFAULT_MEMORY_BUDGET, TransposeEngine
 from src.logging.logger import get_logger
+from src.logging.metrics import stage
 
 logger = get_logger(__name__)
 
 
+def _read_payload(fd, offset, length, file_size, tail):
+    """
+    Read ``length`` bytes at ``offset`` of the file followed by ``tail``.
+
+    ``tail`` is a virtual extension of the input (e.g. the Metadata1 footer)
+    that never has to be written next to the source file. Returns the data
+    and the number of bytes read from the file.
+    """
+    head = max(0, min(offset + length, file_size) - offset)
+    data = os.pread(fd, head, offset) if head else b""
+    read = len(data)
+    tail_end = offset + length - file_size
+    if tail and tail_end > 0:
+        data += tail[max(0, offset - file_size) : tail_end]
+    return data, read
+
+
+def _encode_range(
+    rs_items,
+    backend,
+    in_path,
+    in_size,
+    tail,
+    out_path,
+    base,
+    layout,
+    batch_blocks,
+    checksum_region,
+    hash_bytes,
+    first,
+    last,
+):
+    """
+    Encode blocks ``[first, last)`` of ``in_path`` (+ ``tail``) into ``out_path``.
+
+    Runs in a worker process. Block ``i`` is read from offset ``i * k``.
+    With ``layout`` unset its codeword is written at ``base + i * nsize``;
+    otherwise its symbols are scattered to their interleaved positions
+    after ``base``. Either way ranges need no reassembly.
+
+    The output must read as zeros (freshly truncated). All-zero blocks,
+    whose codeword is all zeros, are not encoded, batches lying in a hole
+    of the input are not even read, and zero pages are left unwritten, so
+    zero runs stay holes in the output.
+
+    With ``layout`` set and a positive ``checksum_region``, the CRC32s of
+    the interleaved regions are accumulated from the bytes as they are
+    written (see RegionCRCs), so the index needs no second read of the
+    output.
+
+    Returns the number of blocks skipped, the RegionCRCs parts (None
+    without checksums), the bytes actually read from ``in_path`` and
+    written to ``out_path`` and, for the caller to hash in order, the part
+    of the first ``hash_bytes`` payload bytes that lies in the range, as
+    update_pieces pieces (holes as zero counts).
+    """
+    codec = get_backend(rs_items, backend)
+    k = codec.block_size
+    skipped = 0
+    bytes_read = 0
+    bytes_written = 0
+    hashed_pieces = []
+    checksums = None
+    if layout is not None and checksum_region > 0:
+        checksums = RegionCRCs(checksum_region, layout.data_size)
+    with open(in_path, "rb") as fin, open(out_path, "r+b") as fout:
+        extents = data_extents(fin.fileno(), first * k, min(last * k, in_size))
+        for start in range(first, last, batch_blocks):
+            stop = min(start + batch_blocks, last)
+            hashed = max(0, min(hash_bytes, stop * k) - start * k)
+            if stop * k <= in_size and not has_data(extents, start * k, stop * k):
+                skipped += stop - start
+                if hashed:
+                    hashed_pieces.append(hashed)
+                continue
+            chunk, read = _read_payload(
+                fin.fileno(), start * k, (stop - start) * k, in_size, tail
+            )
+            bytes_read += read
+            if hashed:
+                hashed_pieces.append(chunk if hashed == len(chunk) else chunk[:hashed])
+            remainder = len(chunk) % k
+            if remainder:
+                padding = b"\x00" * (k - remainder)
+                chunk += padding
+                logger.debug(f"Padded block with {len(padding)} zeros")
+            blocks = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, k)
+            live = blocks.any(axis=1)
+            if live.all():
+                codewords = codec.encode_blocks(blocks)
+            else:
+                codewords = np.zeros((len(blocks), codec.nsize), dtype=np.uint8)
+                if live.any():
+                    codewords[live] = codec.encode_blocks(blocks[live])
+                skipped += len(blocks) - int(np.count_nonzero(live))
+
+            if layout is None:
+                bytes_written += pwrite_sparse(
+                    fout.fileno(), codewords, base + start * codec.nsize
+                )
+            else:
+                bytes_written += write_interleaved(
+                    fout.fileno(),
+                    layout,
+                    base,
+                    start,
+                    codewords,
+                    sparse=True,
+                    checksums=checksums,
+                )
+    parts = checksums.parts if checksums is not None else None
+    return skipped, parts, bytes_read, bytes_written, hashed_pieces
+
+
 class RSEncoding:
-    def __init__(self, config, in_path: Path):
+    def __init__(
+        self,
+        config,
+        in_path: Path,
+        tail: bytes = b"",
+        dest_dir: Path | None = None,
+        data_offset: int = 0,
+        hash_bytes: int | None = None,
+        digest: dict | None = None,
+    ):
         self.rs_params = config["encoding"]["reed_solomon"]
         self.block_size = self.rs_params["nsize"] - self.rs_params["nsym"]
-        self.RS = RSCodec(**self.rs_params)
+        self.rs_items = tuple(sorted(self.rs_params.items()))
+        self.backend = resolve_backend(
+            self.rs_items, config["encoding"].get("codec_backend", "auto")
+        )
+        self.RS = get_backend(self.rs_items, self.backend)
+        self.batch_blocks = int(config["encoding"].get("batch_blocks", 65536))
+        self.workers = resolve_workers(config["encoding"].get("workers", 1))
+        self.single_pass = bool(config["encoding"].get("single_pass", False))
+        self.interleave_depth = int(config["encoding"].get("interleave_depth", 0))
+        self.digest_algorithm = config["encoding"].get("digest")
+        self.checksum_region = int(config["encoding"].get("checksum_region", 0))
+        self.transpose_engine = TransposeEngine(
+            config["encoding"].get("transpose_memory", DEFAULT_MEMORY_BUDGET),
+            config["encoding"].get("transpose_threads", 1),
+        )
 
         self.in_path = in_path
+        # Bytes encoded after the input as if they were appended to it.
+        self.tail = tail
+        # Offset of the encoded data within the output file.
+        self.data_offset = data_offset
+        # Leading input bytes covered by the digest (the original data, not
+        # a Metadata1 footer appended to it); None covers the whole input.
+        self.hash_bytes = hash_bytes
+        # Metadata2 "digest" entry: passed in when an earlier stage already
+        # hashed the original data, otherwise set by encode() when enabled.
+        self.digest = digest
+
+        dest_dir = self.in_path.parent if dest_dir is None else dest_dir
         self.encoded_path = (
-            self.in_path.parent / f"{self.in_path.stem}_encoded{self.in_path.suffix}"
+            dest_dir / f"{self.in_path.stem}_encoded{self.in_path.suffix}"
+        )
+        self.transposed_path = (
+            self.encoded_path.parent
+            / f"{self.encoded_path.stem}_T{self.encoded_path.suffix}"
         )
         self.out_path = self.encoded_path
         self.output_size = None
+        # Checksum index of the interleaved data, set by encode(transposed=True).
+        self.checksum_index = None
+
+    def encode(self, transposed: bool = False):
+        """
+        RS-encode the input file.
+
+        With ``transposed`` set, each batch of codewords is scattered straight
+        into its columns of the interleaved ``_T`` layout, so the row-major
+        ``_encoded`` intermediate is never written.
+
+        ``encoding.interleave_depth`` splits the interleaving into segments
+        of that many codewords (see InterleaveLayout); 0 interleaves the
+        whole file as one matrix. When writing the interleaved layout with
+        ``encoding.checksum_region`` set, the workers checksum the regions
+        as they write them and ``self.checksum_index`` holds the index for
+        Metadata2Adder.
 
-    def encode(self):
+        ``encoding.digest`` names a hashlib algorithm whose digest of the
+        original data is kept in ``self.digest``. Ranges hand the bytes
+        they read back to this process, which hashes them in order, so the
+        input is read only once whatever the number of workers.
+        """
         logger.info("Started Reed-Solomon encoding")
+        target = self.transposed_path if transposed else self.encoded_path
         try:
-            with open(self.in_path, "rb") as fin, open(self.encoded_path, "wb") as fout:
-                while True:
-                    block = fin.read(self.block_size)
-                    if not block:
-                        break
-                    if len(block) < self.block_size:
-                        padding = b"\x00" * (self.block_size - len(block))
-                        block += padding
-                        logger.debug(f"Padded block with {len(padding)} zeros")
-                    encoded_block = self.RS.encode(block)
-                    fout.write(encoded_block)
-
-            self.output_size = self.encoded_path.stat().st_size
-            self.out_path = self.encoded_path
-            logger.info(f"Successfully encoded {self.in_path} -> {self.encoded_path}")
+            input_size = self.in_path.stat().st_size
+            blocks = -(-(input_size + len(self.tail)) // self.block_size)
+            hash_bytes = input_size if self.hash_bytes is None else self.hash_bytes
+            digest = new_digest(self.digest_algorithm) if self.digest is None else None
+            layout = self.layout(blocks) if transposed else None
+            checksum_region = self.checksum_region if transposed else 0
+
+            def consume(result):
+                *counts, hashed_pieces = result
+                update_pieces(digest, hashed_pieces)
+                return tuple(counts)
+
+            with stage("RSEncoding.encode", path=str(self.in_path)) as metrics:
+                with open(target, "wb") as fout:
+                    fout.truncate(self.data_offset + blocks * self.rs_params["nsize"])
+
+                results = run_ranges(
+                    _encode_range,
+                    blocks,
+                    self.batch_blocks,
+                    self.workers,
+                    self.rs_items,
+                    self.backend,
+                    self.in_path,
+                    input_size,
+                    self.tail,
+                    target,
+                    self.data_offset,
+                    layout,
+                    self.batch_blocks,
+                    checksum_region,
+                    hash_bytes if digest is not None else 0,
+                    progress=metrics.progress,
+                    consume=consume if digest is not None else None,
+                )
+                if digest is not None:
+                    self.digest = digest_record(digest.name, digest.hexdigest())
+                if checksum_region > 0:
+                    self.checksum_index = assemble_index(
+                        (result[1] for result in results),
+                        layout.data_size,
+                        checksum_region,
+                    )
+                metrics.add(
+                    bytes_read=sum(result[2] for result in results),
+                    bytes_written=sum(result[3] for result in results),
+                    blocks=blocks,
+                )
+            skipped = sum(result[0] for result in results)
+            logger.info(f"All-zero blocks skipped: {skipped} of {blocks}")
+
+            self.output_size = target.stat().st_size
+            self.out_path = target
+            logger.info(f"Successfully encoded {self.in_path} -> {target}")
             logger.info(f"Encoded output size: {self.output_size} bytes")
+            return target
 
         except Exception as e:
             logger.error(f"Encoding failed: {e}")
             try:
-                if self.encoded_path.exists():
-                    os.remove(self.encoded_path)
+                if target.exists():
+                    os.remove(target)
             except Exception as cleanup_err:
                 logger.error(
-                    f"Failed to remove partial encoded file {self.encoded_path}: "
-                    f"{cleanup_err}"
+                    f"Failed to remove partial encoded file {target}: {cleanup_err}"
                 )
             raise RuntimeError(f"Encoding failed for {self.in_path}") from e
 
+    def layout(self, codewords: int) -> InterleaveLayout:
+        """Interleave layout of ``codewords`` encoded blocks."""
+        return InterleaveLayout(
+            self.rs_params["nsize"], codewords, self.interleave_depth
+        )
+
     def transpose(self):
         try:
             src_path = self.encoded_path
@@ -66,23 +293,34 @@ class RSEncoding:
                 )
 
             rows = file_size // cols
-            out_path = src_path.parent / f"{src_path.stem}_T{src_path.suffix}"
-
-            src = np.memmap(src_path, dtype=np.uint8, mode="r", shape=(rows, cols))
-            dst = np.memmap(out_path, dtype=np.uint8, mode="w+", shape=(cols, rows))
+            out_path = self.transposed_path
 
-            try:
-                block = 1024
-                for i in range(0, rows, block):
-                    for j in range(0, cols, block):
-                        sub = src[i : i + block, j : j + block]
-                        dst[j : j + block, i : i + block] = sub.T
-                dst.flush()
-                logger.info(f"Transposed file written to {out_path}")
-                logger.info(f"Input: {rows}x{cols}, Output: {cols}x{rows}")
-            finally:
-                del src
-                del dst
+            with stage("RSEncoding.transpose", path=str(src_path)) as metrics:
+                with open(out_path, "wb") as fout:
+                    fout.truncate(file_size)
+                layout = self.layout(rows)
+                for first, last in layout.segments():
+                    offset = first * cols
+                    read, written = self.transpose_engine.transpose(
+                        src_path,
+                        out_path,
+                        last - first,
+                        cols,
+                        offset,
+                        offset,
+                        dst_zeroed=True,
+                    )
+                    metrics.add(
+                        bytes_read=read,
+                        bytes_written=written,
+                        blocks=last - first,
+                    )
+                    metrics.progress(last, rows)
+            logger.info(f"Transposed file written to {out_path}")
+            logger.info(
+                f"Input: {rows}x{cols}, Output: {cols}x{rows} "
+                f"in segments of {layout.depth} rows"
+            )
 
             self.out_path = out_path
             self.output_size = out_path.stat().st_size
@@ -104,7 +342,10 @@ class RSEncoding:
                 logger.error(f"Failed to delete file {target}: {e}")
 
     def run(self):
-        self.encode()
-        result = self.transpose()
+        if self.single_pass:
+            result = self.encode(transposed=True)
+        else:
+            self.encode()
+            result = self.transpose()
         self.cleanup_intermediate_files()
         return result
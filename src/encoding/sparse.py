@@ -0,0 +1,86 @@
+import errno
+import os
+
+import numpy as np
+
+from src.encoding.parallel import pwrite_all
+from src.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Granularity of the holes left in sparse outputs: one filesystem block on
+# most filesystems. Zero runs shorter than this are written as data.
+HOLE_BYTES = 4096
+
+
+def data_extents(fd: int, start: int, end: int) -> list[tuple[int, int]]:
+    """
+    Byte ranges of ``[start, end)`` that may hold data, skipping holes.
+
+    Uses ``SEEK_DATA`` / ``SEEK_HOLE``; where they are unsupported the whole
+    range is returned, so callers only ever lose the shortcut.
+    """
+    if not hasattr(os, "SEEK_DATA"):
+        return [(start, end)] if start < end else []
+
+    extents = []
+    offset = start
+    try:
+        while offset < end:
+            try:
+                lo = os.lseek(fd, offset, os.SEEK_DATA)
+            except OSError as e:
+                if e.errno == errno.ENXIO:  # only a hole is left
+                    break
+                raise
+            if lo >= end:
+                break
+            hi = min(os.lseek(fd, lo, os.SEEK_HOLE), end)
+            extents.append((lo, hi))
+            offset = hi
+    except OSError as e:
+        logger.debug(f"SEEK_DATA unavailable ({e}); treating range as data")
+        return [(start, end)] if start < end else []
+    return extents
+
+
+def has_data(extents, lo: int, hi: int) -> bool:
+    """True if ``[lo, hi)`` overlaps any of the ``extents``."""
+    return any(a < hi and lo < b for a, b in extents)
+
+
+def page_runs(data):
+    """
+    Split ``data`` into alternating runs of non-zero and all-zero pages.
+
+    Returns the data as a flat uint8 array and a list of ``(lo, hi, live)``
+    byte ranges covering it, where ``live`` is False for runs made only of
+    all-zero HOLE_BYTES pages.
+    """
+    buf = np.frombuffer(memoryview(data).cast("B"), dtype=np.uint8)
+    full = len(buf) - len(buf) % HOLE_BYTES
+    live = buf[:full].reshape(-1, HOLE_BYTES).any(axis=1)
+    if full < len(buf):
+        live = np.append(live, buf[full:].any())
+    if live.all():
+        return buf, [(0, len(buf), True)]
+
+    edges = np.flatnonzero(np.diff(live)) + 1
+    bounds = np.concatenate(([0], edges, [len(live)])).tolist()
+    runs = [
+        (a * HOLE_BYTES, min(b * HOLE_BYTES, len(buf)), bool(live[a]))
+        for a, b in zip(bounds[:-1], bounds[1:])
+    ]
+    return buf, runs
+
+
+def pwrite_sparse(fd: int, data, offset: int) -> int:
+    """
+    Write ``data`` at ``offset`` of a file whose target range reads as zeros.
+
+    All-zero HOLE_BYTES pages of ``data`` are not written, so they stay
+    holes in a freshly truncated file. Returns the number of bytes actually
+    written.
+    """
+    buf, runs = page_runs(data)
+    return sum(pwrite_all(fd, buf[lo:hi], offset + lo) for lo, hi, live in runs if live)
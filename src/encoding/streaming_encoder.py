@@ -0,0 +1,117 @@
+import os
+import tempfile
+from pathlib import Path
+
+from src.encoding.compression import (
+    ChunkCompressor,
+    compressed_size,
+    compression_codec,
+)
+from src.encoding.file_ops import copy_range
+from src.encoding.metadata1_appender import Metadata1Appender
+from src.encoding.metadata2_adder import Metadata2Adder
+from src.encoding.rs_encoding import RSEncoding
+from src.logging.logger import get_logger
+from src.logging.metrics import stage
+
+logger = get_logger(__name__)
+
+
+class StreamingEncoder:
+    """
+    Run the whole encode pipeline without intermediate files.
+
+    Produces the same artifact as running Metadata1Appender, RSEncoding,
+    PaddingAdder and Metadata2Adder one after another, but only the final
+    file is ever written:
+
+    - the source is never copied; the Metadata1 footer is encoded as a
+      virtual tail of the input
+    - codewords are written in batches straight into their transposed
+      positions, leaving room for the padding at the start of the file
+    - the padding (a copy of the first bytes of the encoded data) is then
+      filled in place, and Metadata2 is appended
+
+    With ``encoding.compression`` set, the input is first compressed into
+    a temporary chunk container next to the artifact, which is encoded in
+    its place and removed afterwards.
+    """
+
+    def __init__(self, config, file_path: Path):
+        self.config = config
+        self.file_path = Path(file_path)
+        self.dest_dir = Path(config["encoding"]["destination_directory"])
+
+        self.metadata1 = Metadata1Appender(config, self.file_path)
+
+        rs_params = config["encoding"]["reed_solomon"]
+        self.nsize = rs_params["nsize"]
+        self.block_size = rs_params["nsize"] - rs_params["nsym"]
+        self.padding_config = int(config["encoding"].get("padding_size", 0))
+
+    def run(self) -> Path:
+        """Encode the input into its final artifact and return its path."""
+        if compression_codec(self.config["encoding"]) is None:
+            return self._encode(self.file_path, None, None)
+
+        self.dest_dir.mkdir(exist_ok=True, parents=True)
+        # Same file name as the input, so the artifact is named as without
+        # compression.
+        with tempfile.TemporaryDirectory(dir=self.dest_dir) as tmp:
+            compressor = ChunkCompressor(
+                self.config, self.file_path, Path(tmp) / self.file_path.name
+            )
+            compression = compressor.run()
+            source = compressor.out_path if compression else self.file_path
+            return self._encode(source, compression, compressor.digest)
+
+    def _encode(self, source: Path, compression: dict | None, digest: dict | None):
+        """Encode ``source`` (the input or its compressed chunks)."""
+        footer = self.metadata1.footer()
+        size = self.metadata1.file_size
+        if compression is not None:
+            size = compressed_size(compression)
+        payload_size = size + len(footer)
+        blocks = -(-payload_size // self.block_size)
+        padding = max(0, min(self.padding_config, blocks * self.nsize))
+
+        logger.info(
+            f"Starting streaming encode of {source} "
+            f"(size: {size}, padding: {padding})"
+        )
+        self.dest_dir.mkdir(exist_ok=True, parents=True)
+
+        rs_encode = RSEncoding(
+            self.config,
+            source,
+            tail=footer,
+            dest_dir=self.dest_dir,
+            data_offset=padding,
+            digest=digest,
+        )
+        encoded_path = rs_encode.encode(transposed=True)
+
+        try:
+            with stage("StreamingEncoder.padding", path=str(encoded_path)) as metrics:
+                fd = os.open(encoded_path, os.O_RDWR)
+                try:
+                    copy_range(fd, fd, padding, 0, padding)
+                finally:
+                    os.close(fd)
+                metrics.add(bytes_read=padding, bytes_written=padding)
+            logger.info(f"Padding of {padding} bytes written in place")
+
+            return Metadata2Adder(
+                self.config,
+                encoded_path,
+                metadata1=self.metadata1.metadata,
+                payload_size=payload_size,
+                digest=rs_encode.digest,
+                compression=compression,
+                checksum_index=rs_encode.checksum_index,
+            ).run()
+
+        except Exception as e:
+            logger.error(f"Streaming encode failed for {self.file_path}: {e}")
+            encoded_path.unlink(missing_ok=True)
+            raise
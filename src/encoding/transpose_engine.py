@@ -0,0 +1,156 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from src.encoding.parallel import pwrite_all
+from src.encoding.sparse import pwrite_sparse
+from src.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024  # 256 MB
+
+
+def _fadvise(fd: int, offset: int, length: int, advice_name: str):
+    """Best-effort posix_fadvise; silently skipped where unsupported."""
+    advice = getattr(os, advice_name, None)
+    if advice is None or not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(fd, offset, length, advice)
+    except OSError:
+        pass
+
+
+def tile_shape(rows: int, cols: int, tile_bytes: int) -> tuple[int, int]:
+    """
+    Pick a (tile_rows, tile_cols) tile of the source fitting ``tile_bytes``.
+
+    A tile and its transposed copy are both held in memory. The smaller
+    dimension is kept whole whenever possible: a full source width makes
+    every read one sequential run, a full source height makes every write
+    one sequential run, and the other side becomes as long as the budget
+    allows.
+    """
+    cells = max(1, tile_bytes // 2)
+    if rows * cols <= cells:
+        return rows, cols
+    if cols <= rows and cols <= cells:
+        return cells // cols, cols
+    if rows < cols and rows <= cells:
+        return rows, cells // rows
+    side = max(1, math.isqrt(cells))
+    return min(rows, side), min(cols, side)
+
+
+class TransposeEngine:
+    """
+    Out-of-core transpose of a (rows, cols) uint8 matrix stored in a file.
+
+    Tiles are gathered in RAM within an explicit memory budget and written
+    back as long sequential runs with pread/pwrite, so the page cache never
+    has to hold scattered pages of a file larger than RAM. Source pages are
+    dropped with posix_fadvise once a tile has been read. Tiles can be
+    processed on several threads; reads, writes and the numpy copy all
+    release the GIL.
+
+    The same engine serves RSEncoding.transpose (rows >> cols = nsize) and
+    RSDecoder.untranspose (rows = nsize << cols).
+    """
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET, threads: int = 1):
+        self.memory_budget = int(memory_budget)
+        self.threads = max(1, int(threads))
+
+    def transpose(
+        self,
+        src_path: Path,
+        dst_path: Path,
+        rows: int,
+        cols: int,
+        src_offset: int = 0,
+        dst_offset: int = 0,
+        dst_zeroed: bool = False,
+    ):
+        """
+        Write the transpose of ``src_path`` (rows, cols) to ``dst_path``.
+
+        ``dst_path`` is created (or extended) to hold ``cols * rows`` bytes
+        after ``dst_offset``; other bytes of it are left untouched. With
+        ``dst_zeroed`` the destination range is known to read as zeros
+        (freshly truncated), so all-zero pages are skipped and stay holes.
+        Returns the number of bytes read and written.
+        """
+        tile_rows, tile_cols = tile_shape(
+            rows, cols, self.memory_budget // self.threads
+        )
+        tiles = [
+            (r0, min(r0 + tile_rows, rows), c0, min(c0 + tile_cols, cols))
+            for r0 in range(0, rows, tile_rows)
+            for c0 in range(0, cols, tile_cols)
+        ]
+        logger.info(
+            f"Transposing {rows}x{cols} in {len(tiles)} tiles of "
+            f"{tile_rows}x{tile_cols} on {self.threads} thread(s)"
+        )
+
+        mode = "r+b" if Path(dst_path).exists() else "w+b"
+        with open(src_path, "rb") as src, open(dst_path, mode) as dst:
+            if os.fstat(dst.fileno()).st_size < dst_offset + rows * cols:
+                dst.truncate(dst_offset + rows * cols)
+            src_fd, dst_fd = src.fileno(), dst.fileno()
+            _fadvise(src_fd, src_offset, rows * cols, "POSIX_FADV_SEQUENTIAL")
+
+            def work(tile):
+                return self._copy_tile(
+                    src_fd,
+                    dst_fd,
+                    rows,
+                    cols,
+                    src_offset,
+                    dst_offset,
+                    dst_zeroed,
+                    *tile,
+                )
+
+            if self.threads == 1:
+                counts = [work(tile) for tile in tiles]
+            else:
+                with ThreadPoolExecutor(max_workers=self.threads) as pool:
+                    counts = list(pool.map(work, tiles))
+        return sum(r for r, _ in counts), sum(w for _, w in counts)
+
+    @staticmethod
+    def _copy_tile(
+        src_fd, dst_fd, rows, cols, src_offset, dst_offset, dst_zeroed, r0, r1, c0, c1
+    ):
+        tile_rows, tile_cols = r1 - r0, c1 - c0
+
+        if tile_cols == cols:
+            start = src_offset + r0 * cols
+            chunk = os.pread(src_fd, tile_rows * cols, start)
+            tile = np.frombuffer(chunk, dtype=np.uint8).reshape(tile_rows, cols)
+            _fadvise(src_fd, start, len(chunk), "POSIX_FADV_DONTNEED")
+            read = len(chunk)
+        else:
+            tile = np.empty((tile_rows, tile_cols), dtype=np.uint8)
+            for i in range(tile_rows):
+                start = src_offset + (r0 + i) * cols + c0
+                tile[i] = np.frombuffer(os.pread(src_fd, tile_cols, start), np.uint8)
+                _fadvise(src_fd, start, tile_cols, "POSIX_FADV_DONTNEED")
+            read = tile.nbytes
+
+        out = np.ascontiguousarray(tile.T)
+
+        write = pwrite_sparse if dst_zeroed else pwrite_all
+        if tile_rows == rows:
+            written = write(dst_fd, out, dst_offset + c0 * rows)
+        else:
+            written = sum(
+                write(dst_fd, out[j], dst_offset + (c0 + j) * rows + r0)
+                for j in range(tile_cols)
+            )
+        return read, written
@@ -0,0 +1,263 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from src.logging.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CallbackSink:
+    """Hand every stage record to ``callback(record)``."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def emit(self, record: dict):
+        self.callback(record)
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """Append every stage record to a JSON-lines file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock, open(self.path, "a") as f:
+            f.write(line)
+
+    def close(self):
+        pass
+
+
+class PrometheusTextSink:
+    """
+    Keep per-stage totals in a Prometheus text-format file.
+
+    The file is rewritten atomically after each stage, so it can be picked
+    up by the node_exporter textfile collector at any time.
+    """
+
+    COUNTERS = (
+        ("wall_seconds", "Wall-clock seconds spent in the stage"),
+        ("cpu_seconds", "CPU seconds spent in the stage, worker processes included"),
+        ("bytes_read", "Bytes read by the stage"),
+        ("bytes_written", "Bytes written by the stage"),
+        ("blocks", "RS blocks processed by the stage"),
+    )
+
+    def __init__(self, path, prefix: str = "trsenc_stage"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.totals: dict[str, dict[str, float]] = {}
+        self.runs: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict):
+        with self._lock:
+            totals = self.totals.setdefault(record["stage"], {})
+            for key, _ in self.COUNTERS:
+                totals[key] = totals.get(key, 0) + record.get(key, 0)
+            run_key = (record["stage"], record["status"])
+            self.runs[run_key] = self.runs.get(run_key, 0) + 1
+            self._write()
+
+    def _write(self):
+        lines = []
+        for key, help_text in self.COUNTERS:
+            name = f"{self.prefix}_{key}_total"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for stage, totals in sorted(self.totals.items()):
+                lines.append(f'{name}{{stage="{stage}"}} {totals[key]}')
+        name = f"{self.prefix}_runs_total"
+        lines += [f"# HELP {name} Stage runs by status", f"# TYPE {name} counter"]
+        for (stage, status), count in sorted(self.runs.items()):
+            lines.append(f'{name}{{stage="{stage}",status="{status}"}} {count}')
+
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text("\n".join(lines) + "\n")
+        tmp_path.replace(self.path)
+
+    def close(self):
+        pass
+
+
+class StageRecorder:
+    """
+    Measure one run of a pipeline stage.
+
+    Used as a context manager: wall and CPU time are taken on entry and
+    exit, the stage adds its byte and block counts with ``add``, and the
+    record is emitted to every sink on exit (with ``status`` "error" if the
+    stage raised). CPU time includes finished child processes, so worker
+    pools are accounted for.
+    """
+
+    def __init__(self, metrics, name: str, labels: dict):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.blocks = 0
+        self._last_progress = 0.0
+
+    @staticmethod
+    def _cpu():
+        t = os.times()
+        return t.user + t.system + t.children_user + t.children_system
+
+    def __enter__(self):
+        self._wall = time.perf_counter()
+        self._cpu_start = self._cpu()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record = {
+            "stage": self.name,
+            "status": "ok" if exc_type is None else "error",
+            "timestamp": time.time(),
+            "wall_seconds": time.perf_counter() - self._wall,
+            "cpu_seconds": self._cpu() - self._cpu_start,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "blocks": self.blocks,
+            **self.labels,
+        }
+        self.metrics.emit(record)
+        return False
+
+    def add(self, bytes_read: int = 0, bytes_written: int = 0, blocks: int = 0):
+        self.bytes_read += bytes_read
+        self.bytes_written += bytes_written
+        self.blocks += blocks
+
+    def progress(self, done: int, total: int):
+        """
+        Report progress; calls faster than ``progress_interval`` are dropped.
+
+        The final call (``done >= total``) is always delivered.
+        """
+        now = time.monotonic()
+        if done < total and now - self._last_progress < self.metrics.progress_interval:
+            return
+        self._last_progress = now
+        self.metrics.report_progress(
+            self.name, done, total, time.perf_counter() - self._wall
+        )
+
+
+class _NullStage:
+    """Stand-in recorder used while metrics are off; every call is a no-op."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add(self, bytes_read: int = 0, bytes_written: int = 0, blocks: int = 0):
+        pass
+
+    def progress(self, done: int, total: int):
+        pass
+
+
+NULL_STAGE = _NullStage()
+
+
+class Metrics:
+    """
+    Fan stage records out to sinks and progress updates to a callback.
+
+    With no sinks and no progress callback the metrics are disabled:
+    ``stage`` returns a shared no-op recorder whose hooks do nothing, so
+    the pipelines pay next to nothing.
+    """
+
+    def __init__(self, sinks=(), progress_callback=None, progress_interval=5.0):
+        self.sinks = list(sinks)
+        self.progress_callback = progress_callback
+        self.progress_interval = float(progress_interval)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks or self.progress_callback)
+
+    def stage(self, name: str, **labels):
+        """Return a recorder for one run of stage ``name``."""
+        if not self.enabled:
+            return NULL_STAGE
+        return StageRecorder(self, name, labels)
+
+    def emit(self, record: dict):
+        for sink in self.sinks:
+            try:
+                sink.emit(record)
+            except Exception as e:
+                logger.error(f"Metrics sink {type(sink).__name__} failed: {e}")
+
+    def report_progress(self, stage: str, done: int, total: int, elapsed: float):
+        if self.progress_callback is not None:
+            self.progress_callback(stage, done, total, elapsed)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def log_progress(stage: str, done: int, total: int, elapsed: float):
+    """Progress callback that writes a line to the application log."""
+    percent = 100.0 * done / total if total else 100.0
+    logger.info(f"{stage}: {done}/{total} ({percent:.1f}%) after {elapsed:.1f} s")
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Return the process-wide metrics registry (disabled by default)."""
+    return _metrics
+
+
+def set_metrics(metrics: Metrics) -> Metrics:
+    """Install ``metrics`` as the process-wide registry and return it."""
+    global _metrics
+    _metrics = metrics
+    return metrics
+
+
+def configure_metrics(config) -> Metrics:
+    """
+    Install metrics described by the ``metrics`` section of the config.
+
+    Recognised keys: ``enabled``, ``jsonl_path``, ``prometheus_path``,
+    ``log_progress`` and ``progress_interval`` (seconds). Callers that want
+    a callback sink can add a CallbackSink to the returned registry.
+    """
+    cfg = config.get("metrics") or {}
+    if not cfg.get("enabled", False):
+        return set_metrics(Metrics())
+
+    sinks = []
+    if cfg.get("jsonl_path"):
+        sinks.append(JsonLinesSink(cfg["jsonl_path"]))
+    if cfg.get("prometheus_path"):
+        sinks.append(PrometheusTextSink(cfg["prometheus_path"]))
+    progress = log_progress if cfg.get("log_progress", False) else None
+    return set_metrics(Metrics(sinks, progress, cfg.get("progress_interval", 5.0)))
+
+
+def stage(name: str, **labels):
+    """Shorthand for ``get_metrics().stage(name, **labels)``."""
+    return _metrics.stage(name, **labels)
@@ -0,0 +1,87 @@
+import os
+from pathlib import Path
+
+from src.encoding.compression import chunk_spans, decompress_chunk
+from src.encoding.integrity import check_digest, new_digest
+from src.encoding.parallel import map_ordered, resolve_workers
+from src.encoding.sparse import pwrite_sparse
+from src.logging.logger import get_logger
+from src.logging.metrics import stage
+
+logger = get_logger(__name__)
+
+
+class ChunkDecompressor:
+    """
+    Reverse of ChunkCompressor: expand a decoded chunk container in place.
+
+    Chunks are independent, so they are decompressed on
+    ``decoding.workers`` threads while this thread reads the next stored
+    chunks and writes the finished ones in order. All-zero pages are left
+    as holes. The digest recorded at encode time covers the decompressed
+    data and is checked here, as the chunks are written.
+    """
+
+    def __init__(
+        self, metadata: dict, file_path: Path, decoding_cfg: dict | None = None
+    ):
+        self.record = metadata["compression"]
+        self.codec = self.record["codec"]
+        self.size = int(self.record["size"])
+        self.expected_digest = metadata.get("digest")
+
+        decoding_cfg = decoding_cfg or {}
+        self.workers = resolve_workers(decoding_cfg.get("workers", 1))
+
+        self.file_path = Path(file_path)
+        if not self.file_path.exists():
+            raise FileNotFoundError(f"{self.file_path} does not exist")
+        self.out_path = self.file_path.with_name(self.file_path.name + ".raw")
+
+    def _read_chunks(self, f, spans):
+        """Yield decompress_chunk arguments for each stored chunk."""
+        for offset, size, stored_offset, stored_size in spans:
+            stored = os.pread(f.fileno(), stored_size, stored_offset)
+            if len(stored) != stored_size:
+                raise EOFError(
+                    f"Unexpected end of {self.file_path} at offset {stored_offset}"
+                )
+            yield self.codec, stored, size
+
+    def run(self) -> Path:
+        """Replace the container with the original data and return its path."""
+        spans = chunk_spans(self.record)
+        logger.info(
+            f"Decompressing {len(spans)} {self.codec} chunks of {self.file_path} "
+            f"({self.size} bytes)"
+        )
+        digest = None
+        if self.expected_digest is not None:
+            digest = new_digest(self.expected_digest["algorithm"])
+        try:
+            with (
+                stage("ChunkDecompressor", path=str(self.file_path)) as metrics,
+                open(self.file_path, "rb") as fin,
+                open(self.out_path, "wb") as fout,
+            ):
+                fout.truncate(self.size)
+                chunks = map_ordered(
+                    decompress_chunk, self._read_chunks(fin, spans), self.workers
+                )
+                for (offset, size, _, stored_size), data in zip(spans, chunks):
+                    written = pwrite_sparse(fout.fileno(), data, offset)
+                    if digest is not None:
+                        digest.update(data)
+                    metrics.add(bytes_read=stored_size, bytes_written=written)
+                    metrics.progress(offset + size, self.size)
+
+            if digest is not None:
+                check_digest(self.expected_digest, digest.hexdigest(), self.file_path)
+        except Exception as e:
+            logger.error(f"Decompression failed for {self.file_path}: {e}")
+            self.out_path.unlink(missing_ok=True)
+            raise
+
+        os.replace(self.out_path, self.file_path)
+        logger.info(f"Decompressed {self.file_path} to {self.size} bytes")
+        return self.file_path
@@ -3,6 +3,7 @@ import mmap
 from pathlib import Path
 
 from src.logging.logger import get_logger
+from src.logging.metrics import stage
 
 logger = get_logger(__name__)
 
@@ -15,17 +16,24 @@ class Metadata1Remover:
     - Find and parse Metadata1 at the end of the file
     - Truncate the file back to the original size
     - Print/log the original path (but DO NOT move the file)
+
+    When the artifact carried Metadata1 in its Metadata2 record, pass it as
+    ``metadata``: the decoder has then already written exactly the original
+    bytes and no scan of the decoded file is needed.
     """
 
     MARKER = b"Metadata1 for : "
 
-    def __init__(self, file_path: Path):
+    def __init__(self, file_path: Path, metadata: dict | None = None):
         self.file_path = Path(file_path)
-        self.metadata: dict = self.find_metadata()
 
         if not self.file_path.exists():
             raise FileNotFoundError(f"{self.file_path} does not exist")
 
+        if metadata is None:
+            metadata = self.find_metadata()
+        self.metadata: dict = metadata
+
     def find_metadata(self) -> dict:
         """
         Search from the end of the file for the MARKER and parse the JSON
@@ -65,12 +73,13 @@ class Metadata1Remover:
         original_name = self.metadata.get("name")
 
         # 1) Truncate to original size
-        with open(self.file_path, "r+b") as f:
-            f.truncate(original_size)
+        if self.file_path.stat().st_size != original_size:
+            with open(self.file_path, "r+b") as f:
+                f.truncate(original_size)
 
-        logger.info(
-            f"Truncated {self.file_path} to original size {original_size} bytes"
-        )
+            logger.info(
+                f"Truncated {self.file_path} to original size {original_size} bytes"
+            )
 
         # 2) Print/log original path if present
         if original_path:
@@ -107,6 +116,6 @@ class Metadata1Remover:
             remover = Metadata1Remover(decoded_file)
             remover.run()
         """
-        self.find_metadata()
-        self.remove_redundancy()
+        with stage("Metadata1Remover", path=str(self.file_path)):
+            self.remove_redundancy()
         return self.file_path
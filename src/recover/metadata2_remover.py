@@ -1,8 +1,18 @@
 import ast
 import json
 import mmap
+import os
+import zlib
 from pathlib import Path
 
+from src.encoding.checksums import index_size
+from src.encoding.file_ops import break_link
+from src.encoding.metadata2_trailer import read_record
+from src.logging.logger import get_logger
+from src.logging.metrics import stage
+
+logger = get_logger(__name__)
+
 
 class Metadata2Remover:
     def __init__(self, config, file_path: Path):
@@ -53,25 +63,83 @@ class Metadata2Remover:
 
         return metadata
 
-    def remove_metadata2(self):
-        """Remove metadata2 and any bytes after the delimiter."""
-        with open(self.file_path, "r+b") as file:
-            mmapped_file = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
-
+    def find_legacy_metadata(self, file):
+        """Locate metadata2 in artifacts written before the fixed trailer."""
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mmapped_file:
             # Search backward for the delimiter
             first_delim_pos = mmapped_file.rfind(self.delimiter)
             if first_delim_pos == -1:
                 raise ValueError("Delimiter not found in the file.")
 
             metadata = self.extract_metadata(mmapped_file, first_delim_pos)
+        return metadata, first_delim_pos
+
+    def read_metadata(self):
+        """
+        Read metadata2 without modifying the file.
+
+        The fixed-size trailer at EOF is read first; artifacts without one
+        fall back to the legacy delimiter scan.
+
+        Returns
+        -------
+        tuple[dict, int]
+            The metadata and the offset where the metadata2 record starts,
+            including the checksum index stored in front of the JSON.
+        """
+        with open(self.file_path, "rb") as file:
+            file_size = os.fstat(file.fileno()).st_size
+            record = read_record(file.fileno(), file_size)
+            if record is not None:
+                metadata, start = record
+                return metadata, start - index_size(metadata)
 
-            mmapped_file.close()
+            logger.info(
+                f"No Metadata2 trailer in {self.file_path}; "
+                "scanning for the legacy delimiter"
+            )
+            return self.find_legacy_metadata(file)
 
-            with open(self.file_path, "r+b") as file:
-                file.truncate(first_delim_pos)
+    def _save_checksum_index(self, file, metadata, record_start):
+        """
+        Move the checksum index to a ``.checksums`` sidecar file.
+
+        The sidecar path is recorded in ``metadata["checksums"]`` for
+        RSDecoder. A damaged index is dropped, and decoding then runs
+        without erasure hints.
+        """
+        checksums = metadata["checksums"]
+        index = os.pread(file.fileno(), index_size(metadata), record_start)
+        if zlib.crc32(index) != checksums["index_crc"]:
+            logger.warning(f"Checksum index of {self.file_path} is damaged; ignoring")
+            del metadata["checksums"]
+            return
+
+        sidecar = self.file_path.with_name(self.file_path.name + ".checksums")
+        sidecar.write_bytes(index)
+        checksums["path"] = str(sidecar)
+
+    def remove_metadata2(self):
+        """
+        Remove metadata2 and any bytes after it.
+
+        This is the first step of recovery to change the artifact, so a
+        hard-linked artifact (e.g. from the EncodeCache) is first given its
+        own copy; later steps then work on that copy.
+        """
+        metadata, record_start = self.read_metadata()
+
+        break_link(self.file_path)
+        with open(self.file_path, "r+b") as file:
+            if metadata.get("checksums"):
+                self._save_checksum_index(file, metadata, record_start)
+            file.truncate(record_start)
         return metadata
 
     def run(self):
         """Execute the metadata removal process and return the metadata."""
-        metadata = self.remove_metadata2()
+        with stage("Metadata2Remover", path=str(self.file_path)) as metrics:
+            size = self.file_path.stat().st_size
+            metadata = self.remove_metadata2()
+            metrics.add(bytes_read=size - self.file_path.stat().st_size)
         return metadata, self.file_path
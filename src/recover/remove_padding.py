@@ -1,55 +1,57 @@
-import mmap
 import os
 from pathlib import Path
 
+from src.encoding.file_ops import collapse_range, copy_range, shift_down
 from src.logging.logger import get_logger
+from src.logging.metrics import stage
 
 logger = get_logger(__name__)
 
 
 class PaddingRemover:
-    def __init__(self, padding_size: int, file_path: Path):
+    def __init__(self, padding_size: int, file_path: Path, save_padding: bool = True):
         self.file_path = file_path
         self.padding_size = padding_size
         self.input_size = self.file_path.stat().st_size
+        self.save_padding = save_padding
 
     def remove_padding(self):
+        """
+        Drop the leading padding in place with constant memory.
+
+        FALLOC_FL_COLLAPSE_RANGE removes the range without moving data when
+        the filesystem supports it; otherwise the data is shifted down in
+        bounded chunks. The padding is only copied to ``.removed_padding``
+        when ``save_padding`` is set.
+        """
         try:
             logger.info(
                 f"Removing first {self.padding_size / (1024**3):.2f} GB of padding from file: {self.file_path}"
             )
 
-            new_size = self.input_size - self.padding_size
-
-            temp_path = self.file_path.with_suffix(".tmp")
-            removed_padding_path = self.file_path.with_suffix(
-                ".removed_padding"
-            )  # File to store removed padding
-
-            with open(removed_padding_path, "wb") as padding_file:
-                with open(self.file_path, "rb") as original_file:
-                    padding_file.write(original_file.read(self.padding_size))
-
-            with open(temp_path, "wb") as temp_file:
-                temp_file.truncate(new_size)
-
-            with (
-                open(self.file_path, "rb") as original_file,
-                open(temp_path, "r+b") as temp_file,
-            ):
-                with mmap.mmap(
-                    original_file.fileno(), 0, access=mmap.ACCESS_READ
-                ) as original_mmap:
-                    with mmap.mmap(
-                        temp_file.fileno(), 0, access=mmap.ACCESS_WRITE
-                    ) as temp_mmap:
-                        temp_mmap[:new_size] = original_mmap[self.padding_size :]
-
-            os.replace(temp_path, self.file_path)
+            removed_padding_path = None
+            fd = os.open(self.file_path, os.O_RDWR)
+            try:
+                if self.save_padding:
+                    removed_padding_path = self.file_path.with_suffix(
+                        ".removed_padding"
+                    )  # File to store removed padding
+                    with open(removed_padding_path, "wb") as padding_file:
+                        copy_range(fd, padding_file.fileno(), 0, 0, self.padding_size)
+
+                if self.padding_size > 0:
+                    if collapse_range(fd, 0, self.padding_size):
+                        logger.info("Collapsed padding range with fallocate")
+                    else:
+                        shift_down(fd, self.input_size, self.padding_size)
+            finally:
+                os.close(fd)
+
             logger.info(
                 f"Successfully removed padding. New file size: {self.file_path.stat().st_size / (1024**3):.2f} GB"
             )
-            logger.info(f"Removed padding saved to: {removed_padding_path}")
+            if removed_padding_path:
+                logger.info(f"Removed padding saved to: {removed_padding_path}")
 
             return removed_padding_path, self.file_path
 
@@ -58,5 +60,11 @@ class PaddingRemover:
             raise
 
     def run(self):
-        """Run the padding removal process and save the removed padding."""
-        return self.remove_padding()
+        """Run the padding removal process, optionally saving the removed padding."""
+        with stage("PaddingRemover", path=str(self.file_path)) as metrics:
+            result = self.remove_padding()
+            if self.save_padding:
+                metrics.add(
+                    bytes_read=self.padding_size, bytes_written=self.padding_size
+                )
+        return result
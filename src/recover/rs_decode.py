@@ -2,13 +2,190 @@ import os
 from pathlib import Path
 
 import numpy as np
-from reedsolo import RSCodec
-
+from reedsolo import ReedSolomonError
+
+from src.encoding.checksums import RegionChecker
+from src.encoding.codec_backends import get_backend, resolve_backend
+from src.encoding.compression import compressed_size
+from src.encoding.integrity import IntegrityError, check_digest, new_digest
+from src.encoding.interleave import InterleaveLayout, read_interleaved
+from src.encoding.parallel import resolve_workers, run_ranges
+from src.encoding.sparse import pwrite_sparse
+from src.encoding.transpose_engine import DEFAULT_MEMORY_BUDGET, TransposeEngine
 from src.logging.logger import get_logger
+from src.logging.metrics import stage
 
 logger = get_logger(__name__)
 
 
+def data_codewords(metadata: dict) -> int:
+    """
+    Number of codewords in the interleaved data described by Metadata2.
+
+    ``size_before_padding`` gives the count. Artifacts that record
+    ``payload_size`` (the bytes fed to the RS encoder) must hold exactly
+    enough codewords for it; a mismatch means the padding was detected
+    wrongly or Metadata2 is damaged, and raises ValueError.
+    """
+    nsize = metadata["rs"]["nsize"]
+    codewords = metadata["size_before_padding"] // nsize
+    payload_size = metadata.get("payload_size")
+    if payload_size is not None:
+        expected = -(-int(payload_size) // (nsize - metadata["rs"]["nsym"]))
+        if codewords != expected:
+            raise ValueError(
+                f"Metadata2 describes {codewords} codewords, but a payload of "
+                f"{payload_size} bytes takes {expected}"
+            )
+    return codewords
+
+
+def correct_codeword(codec, codeword: bytes, erase_pos=None):
+    """
+    Correct one codeword and return the ``codec.correct`` result.
+
+    Symbols in ``erase_pos`` are known to be suspect. Up to nsym of them
+    are first corrected as pure erasures, which skips the error-location
+    search; if that fails (errors outside the flagged symbols) they are
+    combined with an error search. Without usable erasures the codeword is
+    corrected on its own, up to nsym / 2 errors.
+    """
+    if not erase_pos or len(erase_pos) > codec.nsym:
+        return codec.correct(codeword)
+    try:
+        return codec.correct(codeword, erase_pos, only_erasures=True)
+    except ReedSolomonError:
+        return codec.correct(codeword, erase_pos)
+
+
+def correct_batch(codec, codewords: np.ndarray, dirty, regions=None, first: int = 0):
+    """
+    Correct the ``dirty`` rows of a batch of codewords shaped (n, nsize).
+
+    Each row is first corrected on its own. With a RegionChecker, the
+    regions holding the symbols of the rows that fail are then checksummed
+    and those rows retried with their symbols in bad regions as erasures;
+    row ``i`` is codeword ``first + i``. Returns the ``codec.correct``
+    results of the corrected rows and the ReedSolomonError of the rows
+    left uncorrectable, both keyed by row.
+    """
+    results, failed = {}, {}
+    for idx in dirty:
+        try:
+            results[int(idx)] = codec.correct(codewords[idx].tobytes())
+        except ReedSolomonError as e:
+            failed[int(idx)] = e
+    if not failed or regions is None:
+        return results, failed
+
+    erasures = regions.erasures([first + idx for idx in failed])
+    for idx in list(failed):
+        erase_pos = erasures.positions(first + idx)
+        if not erase_pos or len(erase_pos) > codec.nsym:
+            continue  # the retry would be the plain correction again
+        try:
+            results[idx] = correct_codeword(codec, codewords[idx].tobytes(), erase_pos)
+        except ReedSolomonError as e:
+            failed[idx] = e
+        else:
+            del failed[idx]
+    return results, failed
+
+
+def decode_codewords(
+    codec, codewords: np.ndarray, regions=None, first: int = 0
+) -> tuple[np.ndarray, int]:
+    """
+    Decode a batch of codewords shaped (n_blocks, nsize).
+
+    All-zero codewords (valid, with an all-zero message) are not checked;
+    clean blocks (all-zero syndromes) have their data bytes copied out
+    directly; the rest are corrected one by one (see correct_batch, which
+    uses ``regions``, a RegionChecker or None, for erasure hints). Row
+    ``i`` is codeword ``first + i``. Returns the messages and the number of
+    blocks that needed correcting; raises ReedSolomonError naming the
+    first codeword that cannot be corrected.
+    """
+    messages = codewords[:, : codec.block_size].copy()
+    live = np.flatnonzero(codewords.any(axis=1))
+    if len(live) == len(codewords):
+        dirty = np.flatnonzero(codec.dirty_mask(codewords))
+    else:
+        dirty = live[codec.dirty_mask(codewords[live])] if len(live) else live
+    results, failed = correct_batch(codec, codewords, dirty, regions, first)
+    if failed:
+        codeword = first + min(failed)
+        k = codec.block_size
+        raise ReedSolomonError(
+            f"Codeword {codeword} (payload bytes [{codeword * k}, "
+            f"{(codeword + 1) * k})) is uncorrectable; {len(failed)} of "
+            f"codewords [{first}, {first + len(codewords)}) are: "
+            f"{failed[min(failed)]}"
+        )
+    for idx, (message, _, _) in results.items():
+        messages[idx] = np.frombuffer(message, dtype=np.uint8)
+
+    return messages, len(dirty)
+
+
+def _read_codewords(fd, nsize, layout, start, stop):
+    """
+    Read codewords ``[start, stop)`` as a (stop - start, nsize) array.
+
+    With ``layout`` unset the source is row-major; otherwise it has the
+    interleaved layout and each codeword symbol is gathered from its own
+    row-stripe of the segment holding it.
+    """
+    if layout is None:
+        chunk = os.pread(fd, (stop - start) * nsize, start * nsize)
+        return np.frombuffer(chunk, dtype=np.uint8).reshape(-1, nsize)
+    return read_interleaved(fd, layout, 0, start, stop)
+
+
+def _decode_range(
+    rs_items,
+    backend,
+    in_path,
+    out_path,
+    limit,
+    batch_blocks,
+    layout,
+    regions,
+    hash_output,
+    first,
+    last,
+):
+    """
+    Decode codewords ``[first, last)`` of ``in_path`` into ``out_path``.
+
+    Runs in a worker process and writes each message at its final offset;
+    nothing is written at or past ``limit``. ``out_path`` must read as
+    zeros, so all-zero pages of messages are left unwritten (holes).
+    ``regions`` is a RegionChecker or None. Returns the number of blocks
+    that needed error correction, the bytes actually read from ``in_path``
+    and written to ``out_path`` and, with ``hash_output``, the decoded
+    data, for the caller to hash in order (an empty list otherwise).
+    """
+    codec = get_backend(rs_items, backend)
+    corrected = 0
+    bytes_read = 0
+    bytes_written = 0
+    decoded = []
+    with open(in_path, "rb") as fin, open(out_path, "r+b") as fout:
+        for start in range(first, last, batch_blocks):
+            stop = min(start + batch_blocks, last)
+            codewords = _read_codewords(fin.fileno(), codec.nsize, layout, start, stop)
+            bytes_read += codewords.nbytes
+            messages, dirty = decode_codewords(codec, codewords, regions, start)
+            offset = start * codec.block_size
+            data = messages.reshape(-1)[: max(0, limit - offset)]
+            bytes_written += pwrite_sparse(fout.fileno(), data, offset)
+            if hash_output:
+                decoded.append(data)
+            corrected += dirty
+    return corrected, bytes_read, bytes_written, decoded
+
+
 class RSDecoder:
     """
     Reverse of RSEncoding.run():
@@ -16,13 +193,32 @@ class RSDecoder:
         original -> RS encode -> encoded -> transpose -> encoded_T
 
     This class takes the transposed file (encoded_T), un-transposes it back
-    to the original encoded layout, then RS-decodes each block.
+    to the original encoded layout, then RS-decodes each block. In single-pass
+    mode the codewords are gathered straight from row-stripes of encoded_T
+    instead, and no un-transposed copy is written. Syndromes are checked for
+    whole batches first; only blocks with nonzero syndromes go through the
+    full error-correcting decoder, and only those it cannot correct have
+    their regions checked against the checksum index to be retried with
+    erasure hints (see RegionChecker).
     """
 
-    def __init__(self, config, in_path: Path):
+    def __init__(self, config, in_path: Path, decoding_cfg: dict | None = None):
         self.rs_params = config["rs"]
         self.block_size = self.rs_params["nsize"] - self.rs_params["nsym"]
-        self.RS = RSCodec(**self.rs_params)
+        self.rs_items = tuple(sorted(self.rs_params.items()))
+
+        decoding_cfg = decoding_cfg or {}
+        self.backend = resolve_backend(
+            self.rs_items, decoding_cfg.get("codec_backend", "auto")
+        )
+        self.RS = get_backend(self.rs_items, self.backend)
+        self.batch_blocks = int(decoding_cfg.get("batch_blocks", 65536))
+        self.workers = resolve_workers(decoding_cfg.get("workers", 1))
+        self.single_pass = bool(decoding_cfg.get("single_pass", False))
+        self.transpose_engine = TransposeEngine(
+            decoding_cfg.get("transpose_memory", DEFAULT_MEMORY_BUDGET),
+            decoding_cfg.get("transpose_threads", 1),
+        )
 
         self.in_path = in_path
 
@@ -35,12 +231,37 @@ class RSDecoder:
 
         self.out_path = self.decoded_path
 
-        nsize = self.rs_params["nsize"]
-        nsym = self.rs_params["nsym"]
-        block_size = nsize - nsym
-        blocks = config["size_before_padding"] // nsize
-        self.original_size = blocks * block_size
+        self.codewords = data_codewords(config)
+        self.original_size = self.codewords * self.block_size
+        # Bytes fed to the RS encoder (Metadata1 footer included), if known.
+        if config.get("payload_size") is not None:
+            self.original_size = int(config["payload_size"])
         self.output_size: int | None = None
+        # Artifacts without a recorded depth were interleaved as one matrix.
+        self.interleave_depth = int(config.get("interleave_depth", 0))
+
+        # Artifacts that record Metadata1 let us write exactly the original
+        # bytes, leaving out the footer and the zero fill of the last block.
+        self.metadata1 = config.get("metadata1")
+        if self.metadata1 is not None:
+            self.original_size = int(self.metadata1["size"])
+
+        # Compressed payloads decode to the chunk container; its length is
+        # recorded, and the digest (of the decompressed data) is checked by
+        # ChunkDecompressor instead.
+        self.compression = config.get("compression")
+        if self.compression is not None:
+            self.original_size = compressed_size(self.compression)
+
+        # Per-region CRC32s of the interleaved data, moved to a sidecar file
+        # by Metadata2Remover. The regions of codewords that fail to decode
+        # are checked against it and the bad ones become erasure hints.
+        self.checksums = config.get("checksums")
+
+        # Digest of the original data recorded at encode time, if any.
+        self.expected_digest = (
+            config.get("digest") if self.compression is None else None
+        )
 
     def untranspose(self) -> Path:
         """
@@ -75,28 +296,28 @@ class RSDecoder:
                 f"dst shape=({cols_T}, {rows_T})"
             )
 
-            src = np.memmap(src_path, dtype=np.uint8, mode="r", shape=(rows_T, cols_T))
-            dst = np.memmap(
-                self.encoded_path,
-                dtype=np.uint8,
-                mode="w+",
-                shape=(cols_T, rows_T),
-            )
-
-            try:
-                block = 1024
-                for i in range(0, rows_T, block):
-                    i_end = min(i + block, rows_T)
-                    for j in range(0, cols_T, block):
-                        j_end = min(j + block, cols_T)
-                        sub = src[i:i_end, j:j_end]
-                        dst[j:j_end, i:i_end] = sub.T
-
-                dst.flush()
-                logger.info(f"Un-transposed file written to {self.encoded_path}")
-            finally:
-                del src
-                del dst
+            with stage("RSDecoder.untranspose", path=str(src_path)) as metrics:
+                with open(self.encoded_path, "wb") as fout:
+                    fout.truncate(file_size)
+                layout = InterleaveLayout(nsize, cols_T, self.interleave_depth)
+                for first, last in layout.segments():
+                    offset = first * nsize
+                    read, written = self.transpose_engine.transpose(
+                        src_path,
+                        self.encoded_path,
+                        rows_T,
+                        last - first,
+                        offset,
+                        offset,
+                        dst_zeroed=True,
+                    )
+                    metrics.add(
+                        bytes_read=read,
+                        bytes_written=written,
+                        blocks=last - first,
+                    )
+                    metrics.progress(last, cols_T)
+            logger.info(f"Un-transposed file written to {self.encoded_path}")
 
             return self.encoded_path
 
@@ -104,64 +325,99 @@ class RSDecoder:
             logger.error(f"Un-transpose failed: {e}")
             raise RuntimeError(f"Un-transpose failed for {self.in_path}") from e
 
-    def decode(self) -> Path:
+    def decode(self, transposed: bool = False) -> Path:
         """
         RS-decode the un-transposed encoded file into the original data.
+
+        With ``transposed`` set, the transposed input is decoded directly by
+        reading row-stripes and rebuilding codewords in memory.
+
+        When Metadata2 records a digest, ranges hand the decoded bytes back
+        to this process, which hashes them in order without reading the
+        output back; a mismatch raises IntegrityError and removes the
+        output.
         """
         logger.info("Started Reed-Solomon decoding")
 
         nsize = self.rs_params["nsize"]
+        source = self.in_path if transposed else self.encoded_path
 
         try:
-            with (
-                open(self.encoded_path, "rb") as fin,
-                open(self.decoded_path, "wb") as fout,
-            ):
-                while True:
-                    block = fin.read(nsize)
-                    if not block:
-                        break
-
-                    if len(block) == 0:
-                        break
-
-                    if len(block) != nsize:
-                        raise ValueError(
-                            "Encoded file size is not a multiple of nsize "
-                            f"({nsize}); file may be truncated"
-                        )
-
-                    decoded = self.RS.decode(block)
-
-                    if isinstance(decoded, tuple):
-                        msg = decoded[0]
-                    else:
-                        msg = decoded
+            encoded_size = source.stat().st_size
+            if encoded_size % nsize != 0:
+                raise ValueError(
+                    "Encoded file size is not a multiple of nsize "
+                    f"({nsize}); file may be truncated"
+                )
 
-                    fout.write(bytes(msg))
+            blocks = encoded_size // nsize
+            if blocks != self.codewords:
+                raise ValueError(
+                    f"{source} holds {blocks} codewords, Metadata2 describes "
+                    f"{self.codewords}; file may be truncated"
+                )
+            decoded_size = min(blocks * self.block_size, self.original_size)
+            layout = InterleaveLayout(nsize, blocks, self.interleave_depth)
+            regions = None
+            if self.checksums and "path" in self.checksums:
+                regions = RegionChecker(
+                    layout,
+                    self.in_path,
+                    0,
+                    int(self.checksums["region"]),
+                    Path(self.checksums["path"]),
+                )
+            digest = None
+            if self.expected_digest is not None:
+                digest = new_digest(self.expected_digest["algorithm"])
+
+            def consume(result):
+                *counts, decoded = result
+                for data in decoded:
+                    digest.update(data)
+                return tuple(counts)
+
+            with stage("RSDecoder.decode", path=str(source)) as metrics:
+                with open(self.decoded_path, "wb") as fout:
+                    fout.truncate(decoded_size)
+
+                results = run_ranges(
+                    _decode_range,
+                    blocks,
+                    self.batch_blocks,
+                    self.workers,
+                    self.rs_items,
+                    self.backend,
+                    source,
+                    self.decoded_path,
+                    decoded_size,
+                    self.batch_blocks,
+                    layout if transposed else None,
+                    regions,
+                    digest is not None,
+                    progress=metrics.progress,
+                    consume=consume if digest is not None else None,
+                )
+                metrics.add(
+                    bytes_read=sum(result[1] for result in results),
+                    bytes_written=sum(result[2] for result in results),
+                    blocks=blocks,
+                )
+            corrected = sum(result[0] for result in results)
+            logger.info(f"Blocks sent to full RS decoding: {corrected}")
 
             self.output_size = self.decoded_path.stat().st_size
-            logger.info(f"Decoded raw size before trimming: {self.output_size} bytes")
 
-            if self.original_size is not None:
-                if self.original_size > self.output_size:
-                    raise ValueError(
-                        f"original_size ({self.original_size}) is larger than "
-                        f"the decoded file size ({self.output_size})"
-                    )
+            if self.original_size > self.output_size:
+                raise ValueError(
+                    f"original_size ({self.original_size}) is larger than "
+                    f"the decoded file size ({self.output_size})"
+                )
 
-                if self.original_size < self.output_size:
-                    with open(self.decoded_path, "rb+") as f:
-                        f.truncate(self.original_size)
-                    self.output_size = self.original_size
-                    logger.info(
-                        f"Truncated decoded file to original size "
-                        f"{self.original_size} bytes"
-                    )
+            if digest is not None:
+                check_digest(self.expected_digest, digest.hexdigest(), source)
 
-            logger.info(
-                f"Successfully decoded {self.encoded_path} -> {self.decoded_path}"
-            )
+            logger.info(f"Successfully decoded {source} -> {self.decoded_path}")
             logger.info(f"Final decoded size: {self.output_size} bytes")
 
             self.out_path = self.decoded_path
@@ -177,13 +433,19 @@ class RSDecoder:
                     f"Failed to remove partial decoded file "
                     f"{self.decoded_path}: {cleanup_err}"
                 )
-            raise RuntimeError(f"Decoding failed for {self.encoded_path}") from e
+            if isinstance(e, IntegrityError):
+                raise
+            raise RuntimeError(f"Decoding failed for {source}") from e
 
     def cleanup_intermediate_files(self):
         """
-        Delete the transposed input and the un-transposed intermediate.
+        Delete the transposed input, the un-transposed intermediate and the
+        checksum index sidecar.
         """
-        for target in (self.in_path, self.encoded_path):
+        targets = [self.in_path, self.encoded_path]
+        if self.checksums and "path" in self.checksums:
+            targets.append(Path(self.checksums["path"]))
+        for target in targets:
             try:
                 if target.exists():
                     target.unlink()
@@ -193,7 +455,10 @@ class RSDecoder:
 
     def run(self) -> Path:
 
-        self.untranspose()
-        result = self.decode()
+        if self.single_pass:
+            result = self.decode(transposed=True)
+        else:
+            self.untranspose()
+            result = self.decode()
         self.cleanup_intermediate_files()
         return result
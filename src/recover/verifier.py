@@ -0,0 +1,240 @@
+import os
+from pathlib import Path
+
+import numpy as np
+
+from src.encoding.checksums import artifact_regions
+from src.encoding.codec_backends import get_backend, resolve_backend
+from src.encoding.file_ops import break_link
+from src.encoding.interleave import InterleaveLayout, read_interleaved
+from src.encoding.parallel import pwrite_all, resolve_workers, run_ranges
+from src.logging.logger import get_logger
+from src.logging.metrics import stage
+from src.recover.metadata2_remover import Metadata2Remover
+from src.recover.rs_decode import correct_batch, data_codewords
+
+logger = get_logger(__name__)
+
+# Uncorrectable codeword indices kept in a report; the count is always exact.
+MAX_REPORTED_CODEWORDS = 1000
+
+
+def _write_symbols(fd, layout, base, mirror, codeword, old, new):
+    """
+    Write the symbols of ``codeword`` that differ between ``old`` and ``new``.
+
+    Each symbol goes back to its interleaved position; symbols within the
+    first ``mirror`` bytes of the data are also copied into the padding,
+    which duplicates them at the start of the file. Returns the number of
+    symbols repaired and of bytes written.
+    """
+    changed = np.flatnonzero(old != new)
+    written = 0
+    for symbol in changed:
+        offset = layout.symbol_offset(codeword, int(symbol))
+        value = new[symbol : symbol + 1].tobytes()
+        written += pwrite_all(fd, value, base + offset)
+        if offset < mirror:
+            written += pwrite_all(fd, value, offset)
+    return len(changed), written
+
+
+def _scrub_range(
+    rs_items, backend, path, layout, base, regions, repair, batch_blocks, first, last
+):
+    """
+    Check codewords ``[first, last)`` of an artifact.
+
+    Runs in a worker process. Syndromes are computed for whole batches;
+    only codewords with nonzero syndromes are run through the corrector to
+    count their symbol errors, and those it cannot correct are retried
+    with erasure hints from ``regions`` (a RegionChecker or None; see
+    correct_batch). With ``repair`` set the corrected symbols are written
+    back in place; otherwise the artifact is opened read-only.
+    """
+    codec = get_backend(rs_items, backend)
+    stats = {
+        "clean": 0,
+        "correctable": 0,
+        "uncorrectable": 0,
+        "worst_errors": 0,
+        "symbols_repaired": 0,
+        "bytes_read": 0,
+        "bytes_written": 0,
+    }
+    histogram = np.zeros(codec.nsym + 1, dtype=np.int64)
+    bad = []
+    with open(path, "r+b" if repair else "rb") as f:
+        for start in range(first, last, batch_blocks):
+            stop = min(start + batch_blocks, last)
+            codewords = read_interleaved(f.fileno(), layout, base, start, stop)
+            stats["bytes_read"] += codewords.nbytes
+            dirty = np.flatnonzero(codec.dirty_mask(codewords))
+            stats["clean"] += (stop - start) - len(dirty)
+            results, failed = correct_batch(codec, codewords, dirty, regions, start)
+            stats["uncorrectable"] += len(failed)
+            bad.extend(start + idx for idx in sorted(failed))
+            del bad[MAX_REPORTED_CODEWORDS:]
+            for idx, (_, corrected, _) in sorted(results.items()):
+                corrected = np.frombuffer(corrected, dtype=np.uint8)
+                # Erasures are counted only where the symbol actually changed.
+                errors = int(np.count_nonzero(codewords[idx] != corrected))
+                stats["correctable"] += 1
+                histogram[errors] += 1
+                stats["worst_errors"] = max(stats["worst_errors"], errors)
+                if repair:
+                    symbols, written = _write_symbols(
+                        f.fileno(),
+                        layout,
+                        base,
+                        base,  # the padding mirrors the first `base` bytes
+                        start + idx,
+                        codewords[idx],
+                        corrected,
+                    )
+                    stats["symbols_repaired"] += symbols
+                    stats["bytes_written"] += written
+        if repair and stats["symbols_repaired"]:
+            os.fsync(f.fileno())
+    stats["histogram"] = histogram
+    stats["uncorrectable_codewords"] = bad
+    return stats
+
+
+class ArtifactVerifier:
+    """
+    Scrub an encoded artifact in place and report its health.
+
+    Metadata2 is read from the trailer and the padding is skipped by
+    offset, so nothing is copied or written. Codewords are gathered from
+    the interleaved data in vectorized batches and their syndromes checked;
+    codewords with errors are test-corrected to count how many symbols are
+    damaged. Codewords beyond the plain corrector have the regions holding
+    their symbols checked against the artifact's checksum index, and the
+    symbols in bad regions are retried as erasures, which doubles the
+    correction capacity. The report holds the number of clean, correctable and
+    uncorrectable codewords, the worst symbol-error count seen in a
+    correctable codeword and a histogram of those counts.
+    """
+
+    repair = False
+    stage_name = "ArtifactVerifier"
+
+    def __init__(self, config, artifact_path: Path):
+        self.artifact_path = Path(artifact_path)
+        if not self.artifact_path.exists():
+            raise FileNotFoundError(f"{self.artifact_path} does not exist")
+
+        self.metadata, self.record_start = Metadata2Remover(
+            config, self.artifact_path
+        ).read_metadata()
+        rs_params = self.metadata["rs"]
+        self.rs_items = tuple(sorted(rs_params.items()))
+        self.nsize = rs_params["nsize"]
+        self.nsym = rs_params["nsym"]
+
+        decoding_cfg = config.get("decoding") or {}
+        self.batch_blocks = int(decoding_cfg.get("batch_blocks", 65536))
+        self.workers = resolve_workers(decoding_cfg.get("workers", 1))
+        self.backend = resolve_backend(
+            self.rs_items, decoding_cfg.get("codec_backend", "auto")
+        )
+
+        self.data_offset = int(self.metadata["padding"])
+        self.codewords = data_codewords(self.metadata)
+        self.layout = InterleaveLayout(
+            self.nsize, self.codewords, self.metadata.get("interleave_depth", 0)
+        )
+
+        self.regions = artifact_regions(
+            self.layout, self.artifact_path, self.metadata, self.record_start
+        )
+
+    def run(self) -> dict:
+        """Verify every codeword and return the report."""
+        data_end = self.data_offset + self.codewords * self.nsize
+        if data_end > self.record_start:
+            raise ValueError(
+                f"{self.artifact_path} is truncated: data ends at {data_end}, "
+                f"Metadata2 starts at {self.record_start}"
+            )
+
+        action = "Repairing" if self.repair else "Verifying"
+        logger.info(f"{action} {self.codewords} codewords of {self.artifact_path}")
+        with stage(self.stage_name, path=str(self.artifact_path)) as metrics:
+            results = run_ranges(
+                _scrub_range,
+                self.codewords,
+                self.batch_blocks,
+                self.workers,
+                self.rs_items,
+                self.backend,
+                self.artifact_path,
+                self.layout,
+                self.data_offset,
+                self.regions,
+                self.repair,
+                self.batch_blocks,
+                progress=metrics.progress,
+            )
+            metrics.add(
+                bytes_read=sum(r["bytes_read"] for r in results),
+                bytes_written=sum(r["bytes_written"] for r in results),
+                blocks=self.codewords,
+            )
+
+        report = {
+            "artifact": str(self.artifact_path),
+            "codewords": self.codewords,
+            "clean": sum(r["clean"] for r in results),
+            "correctable": sum(r["correctable"] for r in results),
+            "uncorrectable": sum(r["uncorrectable"] for r in results),
+            "worst_errors": max((r["worst_errors"] for r in results), default=0),
+            # Symbols per codeword: nsym as erasures, nsym / 2 as errors.
+            "correction_capacity": (
+                self.nsym if self.regions is not None else self.nsym // 2
+            ),
+        }
+        histogram = np.zeros(self.nsym + 1, dtype=np.int64)
+        for r in results:
+            histogram += r["histogram"]
+        report["error_histogram"] = {
+            str(count): int(n) for count, n in enumerate(histogram) if n and count
+        }
+        bad = [idx for r in results for idx in r["uncorrectable_codewords"]]
+        report["uncorrectable_codewords"] = bad[:MAX_REPORTED_CODEWORDS]
+        report["healthy"] = report["uncorrectable"] == 0
+        if self.repair:
+            report["symbols_repaired"] = sum(r["symbols_repaired"] for r in results)
+
+        logger.info(
+            f"{'Repaired' if self.repair else 'Verified'} {self.artifact_path}: "
+            f"{report['clean']} clean, "
+            f"{report['correctable']} correctable, "
+            f"{report['uncorrectable']} uncorrectable "
+            f"(worst {report['worst_errors']} symbol errors)"
+        )
+        return report
+
+
+class ArtifactRepairer(ArtifactVerifier):
+    """
+    Repair the damaged codewords of an artifact in place.
+
+    One streaming syndrome pass finds the codewords with errors; each is
+    corrected and only its changed symbols are written back to their
+    interleaved positions (and to the padding copy when they fall in the
+    mirrored range). Clean data is never rewritten, so the cost beyond the
+    scan is proportional to the damage. Uncorrectable codewords are left
+    as they are and listed in the report.
+    """
+
+    repair = True
+    stage_name = "ArtifactRepairer"
+
+    def run(self) -> dict:
+        """Repair every damaged codeword and return the report."""
+        # Repairs write in place: keep other hard links (e.g. an
+        # EncodeCache entry) as they are.
+        break_link(self.artifact_path)
+        return super().run()
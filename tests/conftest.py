@@ -0,0 +1,20 @@
+from pathlib import Path
+
+import pytest
+
+from src.encoding.config_reader import read_config
+
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "configs" / "configs.yaml"
+
+
+@pytest.fixture
+def config(tmp_path):
+    """The shipped configuration, scaled down for small inputs in ``tmp_path``."""
+    config = read_config(CONFIG_PATH)
+    encoding = config["encoding"]
+    encoding["padding_size"] = 5000
+    encoding["batch_blocks"] = 64
+    encoding["checksum_region"] = 1024
+    encoding["destination_directory"] = str(tmp_path / "artifacts")
+    config["decoding"]["batch_blocks"] = 64
+    return config
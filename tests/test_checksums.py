@@ -0,0 +1,273 @@
+import io
+import os
+import random
+import zlib
+
+import numpy as np
+import pytest
+from reedsolo import ReedSolomonError
+
+from pipeline.encode import encode_file
+from pipeline.recover import recover_file
+from pipeline.stream import encode_stream, recover_stream
+from pipeline.verify import repair_file, verify_file
+from src.encoding import checksums, metadata2_adder
+from src.encoding.checksums import (
+    INDEX_DTYPE,
+    ErasureMap,
+    RegionChecker,
+    RegionCRCs,
+    SequentialCRCs,
+    assemble_index,
+    compute_index,
+    index_size,
+)
+from src.encoding.interleave import InterleaveLayout
+from src.recover.metadata2_remover import Metadata2Remover
+from src.recover.range_reader import RangeRecovery
+
+
+def _data(size, seed=0):
+    rng = random.Random(seed)
+    # Random bytes with a zero run in the middle.
+    return (
+        rng.randbytes(size // 3)
+        + bytes(size // 3)
+        + rng.randbytes(size - size // 3 * 2)
+    )
+
+
+def _expected(data, region):
+    return [zlib.crc32(data[i : i + region]) for i in range(0, len(data), region)]
+
+
+@pytest.mark.parametrize("length, region", [(100_000, 16384), (16384, 16384), (5, 7)])
+def test_region_crcs_combine_pieces_in_any_order(length, region):
+    data = _data(length)
+    rng = random.Random(length)
+    cuts = sorted({0, length, *(rng.randrange(length) for _ in range(40))})
+    pieces = list(zip(cuts[:-1], cuts[1:]))
+    rng.shuffle(pieces)
+
+    writers = [RegionCRCs(region, length) for _ in range(3)]
+    for i, (lo, hi) in enumerate(pieces):
+        # All-zero pieces contribute nothing, like holes left in the output.
+        if any(data[lo:hi]):
+            writers[i % 3].update(lo, data[lo:hi])
+    index = assemble_index([w.parts for w in writers], length, region)
+
+    assert index.dtype == INDEX_DTYPE
+    assert index.tolist() == _expected(data, region)
+
+
+def test_assemble_index_of_nothing_written_is_all_zero_regions():
+    index = assemble_index([], 2500, 1000)
+
+    assert index.tolist() == _expected(bytes(2500), 1000)
+
+
+def test_sequential_crcs():
+    data = _data(50_000)
+    crcs = SequentialCRCs(4096)
+    for lo in range(0, len(data), 3000):
+        crcs.update(data[lo : lo + 3000])
+
+    assert crcs.index().tolist() == _expected(data, 4096)
+
+
+def _stored_index(config, artifact):
+    """The index in ``artifact`` and the index computed from its data."""
+    metadata, record_start = Metadata2Remover(config, artifact).read_metadata()
+    with open(artifact, "rb") as f:
+        stored = os.pread(f.fileno(), index_size(metadata), record_start)
+    region = metadata["checksums"]["region"]
+    actual = compute_index(
+        artifact, metadata["padding"], metadata["size_before_padding"], region
+    )
+    assert zlib.crc32(stored) == metadata["checksums"]["index_crc"]
+    return np.frombuffer(stored, dtype=INDEX_DTYPE), actual
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("streaming", [True, False])
+@pytest.mark.parametrize("depth", [0, 7])
+def test_encoders_checksum_while_writing(
+    config, tmp_path, monkeypatch, workers, streaming, depth
+):
+    config["encoding"].update(
+        workers=workers, streaming=streaming, single_pass=True, interleave_depth=depth
+    )
+    data = _data(200_000)
+    source = tmp_path / "in.bin"
+    source.write_bytes(data)
+
+    def no_read_back(*args, **kwargs):
+        raise AssertionError("the index was computed by reading the artifact")
+
+    monkeypatch.setattr(metadata2_adder, "compute_index", no_read_back)
+    artifact = encode_file(config, source)
+    stored, actual = _stored_index(config, artifact)
+
+    assert np.array_equal(stored, actual)
+    assert recover_file(config, artifact).read_bytes() == data
+
+
+def test_two_pass_transpose_falls_back_to_reading_the_index(config, tmp_path):
+    config["encoding"].update(streaming=False, single_pass=False)
+    source = tmp_path / "in.bin"
+    source.write_bytes(_data(50_000))
+
+    stored, actual = _stored_index(config, encode_file(config, source))
+
+    assert np.array_equal(stored, actual)
+
+
+@pytest.mark.parametrize("size", [0, 1000, 100_000])
+def test_pipe_encoder_checksums_segments(config, tmp_path, monkeypatch, size):
+    config["encoding"]["stream_depth"] = 100
+    monkeypatch.setattr(metadata2_adder, "compute_index", None)
+
+    artifact = encode_stream(config, io.BytesIO(_data(size)), tmp_path / "out.bin")
+    stored, actual = _stored_index(config, artifact)
+
+    assert np.array_equal(stored, actual)
+
+
+def test_erasure_map_positions_follow_the_segments():
+    layout = InterleaveLayout(255, 50, 20)
+    bad = np.array([3, 40, 41, 90])
+    erasures = ErasureMap(layout, 64, bad)
+
+    assert erasures
+    assert not ErasureMap(layout, 64, [])
+    for codeword in (0, 19, 20, 45, 49):
+        expected = [
+            symbol
+            for symbol in range(255)
+            if layout.symbol_offset(codeword, symbol) // 64 in bad
+        ]
+        assert erasures.positions(codeword) == expected
+
+
+def test_region_checker_reads_only_the_regions_it_needs(tmp_path, monkeypatch):
+    layout = InterleaveLayout(255, 40)
+    region = 100
+    data = bytearray(_data(layout.data_size))
+    index = np.array(_expected(bytes(data), region), dtype=INDEX_DTYPE).tobytes()
+    data[250] ^= 0xFF  # region 2
+    data[5000] ^= 0xFF  # region 50
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"p" * 7 + data + b"x" * 3 + index)
+    index_offset = 7 + len(data) + 3
+
+    checked = []
+    find = checksums.find_bad_regions
+    monkeypatch.setattr(
+        checksums,
+        "find_bad_regions",
+        lambda *a, **kw: checked.append(kw["regions"].tolist()) or find(*a, **kw),
+    )
+    checker = RegionChecker(
+        layout, path, 7, region, path, index_offset, zlib.crc32(index)
+    )
+    # Codeword 10 has a symbol every 40 bytes, so touches all 102 regions;
+    # codeword 11 then needs none checked again.
+    assert checker.erasures([10]).bad_regions.tolist() == [2, 50]
+    assert checker.erasures([11]).positions(11) == [5, 6, 7, 125, 126, 127]
+    assert len(checked) == 1
+
+    damaged = RegionChecker(layout, path, 7, region, path, index_offset, 0)
+    assert not damaged.erasures([10])
+
+
+def _overwrite_regions(config, artifact, symbols):
+    """
+    Overwrite whole regions at the start of the interleaved data (one
+    segment) so each codeword gets about ``symbols`` bad symbols. Returns
+    the number of bad symbols of each codeword.
+    """
+    metadata, _ = Metadata2Remover(config, artifact).read_metadata()
+    region = metadata["checksums"]["region"]
+    nsize = metadata["rs"]["nsize"]
+    size = metadata["size_before_padding"]
+    damaged = -(-symbols * (size // nsize) // region) * region
+
+    before = artifact.read_bytes()
+    with open(artifact, "r+b") as f:
+        os.pwrite(f.fileno(), os.urandom(damaged), metadata["padding"])
+    after = artifact.read_bytes()
+    data = slice(metadata["padding"], metadata["padding"] + size)
+    diff = np.frombuffer(before[data], np.uint8) != np.frombuffer(after[data], np.uint8)
+    return diff.reshape(nsize, -1).sum(axis=0)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_recovery_corrects_overwritten_regions_as_erasures(config, tmp_path, workers):
+    config["decoding"]["workers"] = workers
+    data = _data(60_000)
+    source = tmp_path / "in.bin"
+    source.write_bytes(data)
+    artifact = encode_file(config, source)
+
+    bad = _overwrite_regions(config, artifact, 24)
+    assert 16 < bad.min() and bad.max() <= 32
+
+    assert recover_file(config, artifact).read_bytes() == data
+
+
+def test_verify_and_repair_use_erasures(config, tmp_path):
+    source = tmp_path / "in.bin"
+    source.write_bytes(_data(60_000))
+    artifact = encode_file(config, source)
+    original = artifact.read_bytes()
+
+    bad = _overwrite_regions(config, artifact, 24)
+    report = verify_file(config, artifact)
+
+    assert report["correctable"] == report["codewords"] == len(bad)
+    assert report["uncorrectable"] == 0
+    assert report["worst_errors"] == bad.max()
+    assert report["correction_capacity"] == 32
+    assert report["healthy"]
+
+    assert repair_file(config, artifact)["symbols_repaired"] == bad.sum()
+    assert artifact.read_bytes() == original
+
+
+def test_stream_and_range_recovery_use_erasures(config, tmp_path):
+    data = _data(60_000)
+    source = tmp_path / "in.bin"
+    source.write_bytes(data)
+    artifact = encode_file(config, source)
+    _overwrite_regions(config, artifact, 24)
+
+    out = io.BytesIO()
+    assert recover_stream(config, artifact, out) == len(data)
+    assert out.getvalue() == data
+    assert RangeRecovery(config, artifact).read(12_345, 20_000) == data[12_345:32_345]
+
+
+def test_range_recovery_names_the_uncorrectable_codeword(config, tmp_path):
+    source = tmp_path / "in.bin"
+    source.write_bytes(_data(60_000))
+    artifact = encode_file(config, source)
+    _overwrite_regions(config, artifact, 40)
+
+    with pytest.raises(
+        ReedSolomonError, match=r"Codeword 0 \(payload bytes \[0, 223\)"
+    ):
+        RangeRecovery(config, artifact).read(0, 100)
+
+
+def test_clean_recovery_checks_no_regions(config, tmp_path, monkeypatch):
+    data = _data(200_000)
+    source = tmp_path / "in.bin"
+    source.write_bytes(data)
+    artifact = encode_file(config, source)
+
+    def no_check(*args, **kwargs):
+        raise AssertionError("regions were checked for a clean artifact")
+
+    monkeypatch.setattr(checksums, "find_bad_regions", no_check)
+
+    assert recover_file(config, artifact).read_bytes() == data
@@ -0,0 +1,29 @@
+import pytest
+
+from src.encoding.codec_backends import (
+    BACKENDS,
+    CodecBackend,
+    available_backends,
+    self_test,
+)
+
+RS_PARAMS = {"nsym": 32, "nsize": 255}
+
+
+def test_codec_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CodecBackend(RS_PARAMS)
+
+
+def test_incomplete_backend_cannot_be_instantiated():
+    class EncodeOnly(CodecBackend):
+        def encode_blocks(self, blocks):
+            return blocks
+
+    with pytest.raises(TypeError, match="correct|dirty_mask"):
+        EncodeOnly(RS_PARAMS)
+
+
+@pytest.mark.parametrize("name", available_backends())
+def test_available_backends_pass_self_test(name):
+    assert self_test(BACKENDS[name](RS_PARAMS))
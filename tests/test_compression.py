@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from pipeline.encode import encode_file
+from pipeline.recover import recover_file
+from src.encoding.compression import (
+    ChunkCompressor,
+    chunk_spans,
+    compress_chunk,
+    decompress_chunk,
+)
+from src.recover.metadata2_remover import Metadata2Remover
+from src.recover.range_reader import RangeRecovery
+
+CHUNK = 16384
+
+
+def _text(size, seed=0):
+    rng = random.Random(seed)
+    words = [rng.randbytes(rng.randrange(2, 9)).hex().encode() for _ in range(50)]
+    out = b""
+    while len(out) < size:
+        out += rng.choice(words) + b" "
+    return out[:size]
+
+
+def _data():
+    """Compressible chunks around one random chunk, which is stored raw."""
+    return _text(2 * CHUNK) + random.Random(1).randbytes(CHUNK) + _text(CHUNK + 500)
+
+
+@pytest.fixture
+def compressed(config):
+    def configure(codec):
+        config["encoding"].update(compression=codec, compression_chunk=CHUNK)
+        return config
+
+    return configure
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+@pytest.mark.parametrize("streaming", [True, False])
+def test_round_trip(compressed, tmp_path, codec, streaming):
+    config = compressed(codec)
+    config["encoding"]["streaming"] = streaming
+    data = _data()
+    source = tmp_path / "in.bin"
+    source.write_bytes(data)
+
+    artifact = encode_file(config, source)
+    record = Metadata2Remover(config, artifact).read_metadata()[0]["compression"]
+
+    assert record["codec"] == codec
+    assert sum(record["chunks"]) < len(data)
+    assert [size == n for _, size, _, n in chunk_spans(record)] == [
+        False,
+        False,
+        True,
+        False,
+        False,
+    ]
+    assert recover_file(config, artifact).read_bytes() == data
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_incompressible_chunk_is_stored_raw(codec):
+    data = random.Random(2).randbytes(4096)
+    text = _text(4096)
+
+    assert compress_chunk(codec, 6, data) == data
+    assert decompress_chunk(codec, data, len(data)) == data
+    packed = compress_chunk(codec, 6, text)
+    assert len(packed) < len(text)
+    assert decompress_chunk(codec, packed, len(text)) == text
+    with pytest.raises(ValueError, match="expected"):
+        decompress_chunk(codec, packed, len(text) + 1)
+
+
+def test_compressor_falls_back_when_nothing_shrinks(compressed, tmp_path):
+    config = compressed("zlib")
+    data = random.Random(3).randbytes(3 * CHUNK)
+    source = tmp_path / "in.bin"
+    source.write_bytes(data)
+
+    compressor = ChunkCompressor(config, source)
+
+    assert compressor.run() is None
+    assert not compressor.out_path.exists()
+    assert source.read_bytes() == data
+
+    artifact = encode_file(config, source)
+    assert "compression" not in Metadata2Remover(config, artifact).read_metadata()[0]
+    assert recover_file(config, artifact).read_bytes() == data
+
+
+@pytest.mark.parametrize("offset, length", [(CHUNK - 100, 300), (CHUNK + 5, 3 * CHUNK)])
+def test_range_read_across_chunks(compressed, tmp_path, offset, length):
+    config = compressed("zlib")
+    data = _data()
+    source = tmp_path / "in.bin"
+    source.write_bytes(data)
+    artifact = encode_file(config, source)
+
+    reader = RangeRecovery(config, artifact)
+
+    assert reader.original_size == len(data)
+    assert reader.read(offset, length) == data[offset : offset + length]
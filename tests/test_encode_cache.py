@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+from pipeline.encode import encode_file
+from pipeline.recover import recover_file
+from src.encoding.encode_cache import EncodeCache, file_signature
+from src.encoding.file_ops import break_link
+
+
+@pytest.fixture
+def cache(config, tmp_path):
+    config["encoding"]["cache"] = {
+        "enabled": True,
+        "directory": str(tmp_path / "cache"),
+        "max_size": 0,
+    }
+    return EncodeCache(config)
+
+
+@pytest.fixture
+def store(cache, tmp_path):
+    """Store an artifact of ``size`` bytes under ``key``; returns its path."""
+    source = tmp_path / "in.bin"
+    source.write_bytes(b"input")
+    signature = file_signature(source)
+
+    def store(key, size):
+        artifact = tmp_path / f"{key}.dll"
+        artifact.write_bytes(os.urandom(size))
+        cache.store(key, artifact, source, signature)
+        return artifact
+
+    return store
+
+
+def _total(cache):
+    return int((cache.directory / "total").read_text())
+
+
+def _keys(cache):
+    return sorted(key for _, key, _ in cache._entries())
+
+
+def test_first_store_counts_the_entry_once(cache, store):
+    store("a", 1000)
+
+    assert _total(cache) == 1000 == cache._scan_total()
+
+
+def test_lost_total_is_rebuilt_without_counting_the_new_entry_twice(cache, store):
+    store("a", 1000)
+    (cache.directory / "total").unlink()
+
+    store("b", 500)
+
+    assert _total(cache) == 1500 == cache._scan_total()
+
+
+def test_storing_a_key_again_does_not_add_to_the_total(cache, store):
+    store("a", 1000)
+    store("a", 1000)
+
+    assert _total(cache) == 1000
+    assert _keys(cache) == ["a"]
+
+
+def test_evicts_least_recently_used_first(cache, store, tmp_path):
+    cache.max_size = 3000
+    for i, key in enumerate("abc"):
+        store(key, 1000)
+        os.utime(cache.objects / f"{key}.json", (100 + i, 100 + i))
+    # Using "a" makes "b" and then "c" the least recently used.
+    assert cache.fetch("a", tmp_path / "out") is not None
+
+    store("d", 1000)
+
+    # 4000 bytes exceed max_size; entries go until at most 90% of it is left.
+    assert _keys(cache) == ["a", "d"]
+    assert _total(cache) == 2000 == cache._scan_total()
+    assert not (cache.objects / "b").exists()
+
+
+def test_dropping_an_entry_takes_it_off_the_total(cache, store):
+    store("a", 1000)
+    store("b", 300)
+
+    cache._drop("a")
+
+    assert _keys(cache) == ["b"]
+    assert _total(cache) == 300 == cache._scan_total()
+
+
+def test_break_link_leaves_other_links_alone(tmp_path):
+    original = tmp_path / "entry"
+    original.write_bytes(b"cached artifact")
+    linked = tmp_path / "artifact.dll"
+    os.link(original, linked)
+
+    assert break_link(linked)
+    linked.write_bytes(b"changed")
+
+    assert original.read_bytes() == b"cached artifact"
+    assert not break_link(linked)
+
+
+def test_recovering_a_cached_artifact_keeps_the_entry(config, cache, tmp_path):
+    source = tmp_path / "in.bin"
+    data = os.urandom(50_000)
+    source.write_bytes(data)
+
+    artifact = encode_file(config, source)
+    (key,) = _keys(cache)
+    entry = cache.objects / key
+    signature = file_signature(entry)
+    assert recover_file(config, artifact).read_bytes() == data
+
+    assert file_signature(entry) == signature
+    # The next encode of the same input is served from the entry.
+    source.write_bytes(data)
+    assert cache.fetch(key, tmp_path / "again") is not None
+    assert recover_file(config, tmp_path / "again" / artifact.name).read_bytes() == data
@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+import reedsolo
+
+from src.encoding.codec_backends import NumpyBackend
+from src.encoding.gf_batch import BatchRSCodec
+from src.recover.rs_decode import decode_codewords
+
+PARAMS = [
+    dict(nsym=32, nsize=255, fcr=0, prim=0x11D, generator=2, c_exp=8),
+    dict(nsym=10, nsize=255, fcr=1, prim=0x11D, generator=2, c_exp=8),
+    dict(nsym=2, nsize=20, fcr=0, prim=0x11D, generator=2, c_exp=8),
+    dict(nsym=16, nsize=100, fcr=3, prim=0x11B, generator=3, c_exp=8),
+]
+
+
+def _ids(params):
+    return f"n{params['nsize']}-k{params['nsize'] - params['nsym']}-fcr{params['fcr']}"
+
+
+@pytest.fixture(params=PARAMS, ids=_ids)
+def params(request):
+    return request.param
+
+
+def _reference_encode(rs, blocks):
+    return np.array(
+        [
+            np.frombuffer(bytes(rs.encode(bytearray(b.tobytes()))), np.uint8)
+            for b in blocks
+        ]
+    )
+
+
+def _blocks(rng, n, k):
+    return np.vstack(
+        [
+            np.zeros((1, k), dtype=np.uint8),
+            np.full((1, k), 0xFF, dtype=np.uint8),
+            (np.arange(k) % 256).astype(np.uint8)[None],
+            rng.integers(0, 256, size=(n, k), dtype=np.uint8),
+        ]
+    )
+
+
+def test_parity_matches_reedsolo(params):
+    codec = BatchRSCodec(**params)
+    rs = reedsolo.RSCodec(**params)
+    blocks = _blocks(np.random.default_rng(1), 64, codec.block_size)
+
+    codewords = codec.encode_blocks(blocks)
+
+    assert np.array_equal(codewords, _reference_encode(rs, blocks))
+    assert np.array_equal(codewords[:, : codec.block_size], blocks)
+
+
+@pytest.mark.parametrize("n_blocks", [1, BatchRSCodec.SLICE_BLOCKS + 1])
+def test_parity_across_batch_sizes(n_blocks):
+    params = PARAMS[0]
+    codec = BatchRSCodec(**params)
+    rs = reedsolo.RSCodec(**params)
+    blocks = np.random.default_rng(n_blocks).integers(
+        0, 256, size=(n_blocks, codec.block_size), dtype=np.uint8
+    )
+
+    codewords = codec.encode_blocks(blocks)
+
+    # Spot-check the slice boundary and the ends against reedsolo.
+    picks = sorted({0, n_blocks - 1, min(BatchRSCodec.SLICE_BLOCKS, n_blocks - 1)})
+    assert np.array_equal(codewords[picks], _reference_encode(rs, blocks[picks]))
+
+
+def test_rejects_wrong_block_shape():
+    codec = BatchRSCodec(**PARAMS[0])
+    with pytest.raises(ValueError):
+        codec.parity(np.zeros((2, codec.block_size + 1), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        codec.syndromes(np.zeros((2, codec.nsize - 1), dtype=np.uint8))
+
+
+def test_syndromes_match_reedsolo(params):
+    codec = BatchRSCodec(**params)
+    rs = reedsolo.RSCodec(**params)
+    rng = np.random.default_rng(2)
+    codewords = codec.encode_blocks(_blocks(rng, 32, codec.block_size))
+    damaged = codewords.copy()
+    for row in damaged[1::2]:
+        pos = rng.choice(
+            codec.nsize, size=rng.integers(1, codec.nsym + 1), replace=False
+        )
+        row[pos] ^= rng.integers(1, 256, size=len(pos), dtype=np.uint8)
+
+    assert not codec.syndromes(codewords).any()
+    syndromes = codec.syndromes(damaged)
+    # RSCodec() set reedsolo's module tables up for these parameters.
+    reedsolo.init_tables(params["prim"], params["generator"], params["c_exp"])
+    for row, got in zip(damaged, syndromes):
+        expected = reedsolo.rs_calc_syndromes(
+            bytearray(row.tobytes()), codec.nsym, params["fcr"], params["generator"]
+        )[1:]
+        assert list(got) == list(expected)
+    assert np.array_equal(
+        codec.dirty_mask(damaged),
+        [not rs.check(bytearray(row.tobytes()))[0] for row in damaged],
+    )
+
+
+def test_decodes_errors_and_erasures_up_to_nsym(params):
+    backend = NumpyBackend(params)
+    nsym = backend.nsym
+    rng = np.random.default_rng(3)
+    blocks = rng.integers(0, 256, size=(nsym + 1, backend.block_size), dtype=np.uint8)
+    codewords = backend.encode_blocks(blocks)
+
+    # Every split of the budget 2 * errors + erasures <= nsym.
+    for erasures in range(nsym + 1):
+        errors = (nsym - erasures) // 2
+        damaged = codewords[erasures].copy()
+        pos = rng.choice(backend.nsize, size=errors + erasures, replace=False)
+        damaged[pos] ^= rng.integers(1, 256, size=len(pos), dtype=np.uint8)
+        erase_pos = [int(p) for p in pos[:erasures]]
+
+        message = backend.decode(damaged.tobytes(), erase_pos or None)
+
+        assert message == blocks[erasures].tobytes()
+
+
+def test_batch_decode_corrects_up_to_half_nsym(params):
+    backend = NumpyBackend(params)
+    rng = np.random.default_rng(4)
+    blocks = rng.integers(0, 256, size=(50, backend.block_size), dtype=np.uint8)
+    codewords = backend.encode_blocks(blocks)
+    damaged = codewords.copy()
+    for row in damaged[::3]:
+        pos = rng.choice(backend.nsize, size=backend.nsym // 2, replace=False)
+        row[pos] ^= rng.integers(1, 256, size=len(pos), dtype=np.uint8)
+
+    messages, dirty = decode_codewords(backend, damaged)
+
+    assert np.array_equal(messages, blocks)
+    assert dirty == len(damaged[::3])
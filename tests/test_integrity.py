@@ -0,0 +1,83 @@
+import hashlib
+import os
+import random
+
+import pytest
+
+from pipeline.encode import encode_file
+from pipeline.recover import recover_file
+from src.encoding.checksums import index_size
+from src.encoding.integrity import IntegrityError, update_pieces
+from src.encoding.metadata2_trailer import build_record
+from src.recover.metadata2_remover import Metadata2Remover
+
+
+def _data(size=200_000, seed=0):
+    rng = random.Random(seed)
+    # Random bytes around a zero run, which the encoder skips as a hole.
+    return rng.randbytes(size // 2) + bytes(size // 4) + rng.randbytes(size // 4)
+
+
+def _encode(config, tmp_path, data):
+    source = tmp_path / "in.bin"
+    source.write_bytes(data)
+    return encode_file(config, source)
+
+
+def _tamper_digest(config, artifact):
+    """Rewrite Metadata2 of ``artifact`` with a wrong digest."""
+    metadata, record_start = Metadata2Remover(config, artifact).read_metadata()
+    hexdigest = metadata["digest"]["hexdigest"]
+    metadata["digest"]["hexdigest"] = "0" * len(hexdigest)
+    json_start = record_start + index_size(metadata)
+    with open(artifact, "r+b") as f:
+        f.truncate(json_start)
+        os.pwrite(f.fileno(), build_record(metadata), json_start)
+
+
+def test_update_pieces_hashes_counts_as_zeros():
+    digest = hashlib.sha256()
+    update_pieces(digest, [b"abc", 5, b"", 3, b"de"])
+
+    assert digest.digest() == hashlib.sha256(b"abc" + bytes(8) + b"de").digest()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("streaming", [True, False])
+def test_digest_matches_original_data(config, tmp_path, workers, streaming):
+    config["encoding"].update(workers=workers, streaming=streaming)
+    config["decoding"]["workers"] = workers
+    data = _data()
+
+    artifact = _encode(config, tmp_path, data)
+    metadata, _ = Metadata2Remover(config, artifact).read_metadata()
+
+    assert metadata["digest"] == {
+        "algorithm": "blake2b",
+        "hexdigest": hashlib.blake2b(data).hexdigest(),
+    }
+    assert recover_file(config, artifact).read_bytes() == data
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_tampered_digest_raises_and_removes_output(config, tmp_path, workers):
+    config["decoding"]["workers"] = workers
+    artifact = _encode(config, tmp_path, _data())
+    _tamper_digest(config, artifact)
+
+    with pytest.raises(IntegrityError):
+        recover_file(config, artifact)
+
+    assert not list(artifact.parent.glob("*_decoded*"))
+
+
+def test_tampered_digest_of_compressed_data_raises(config, tmp_path):
+    config["encoding"].update(compression="zlib", compression_chunk=16384)
+    config["decoding"]["workers"] = 2
+    artifact = _encode(config, tmp_path, _data())
+    _tamper_digest(config, artifact)
+
+    with pytest.raises(IntegrityError):
+        recover_file(config, artifact)
+
+    assert not list(artifact.parent.glob("*.raw"))
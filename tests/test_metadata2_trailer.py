@@ -0,0 +1,91 @@
+import json
+import os
+
+import pytest
+
+from src.encoding.metadata2_trailer import TRAILER, build_record, read_record
+from src.recover.metadata2_remover import Metadata2Remover
+
+DELIMITER = b"\xde\xad\xbe\xef"
+CONFIG = {"encoding": {"metadata2": {"delimiter": 'b"\\xDE\\xAD\\xBE\\xEF"'}}}
+METADATA = {
+    "size_before_padding": 1234,
+    "padding": 16,
+    "rs": {"nsym": 32, "nsize": 255},
+    "metadata1": {"name": "data.bin", "size": 1234},
+}
+
+
+def _artifact(tmp_path, payload, record):
+    path = tmp_path / "artifact.dll"
+    path.write_bytes(payload + record)
+    return path
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return read_record(f.fileno(), os.fstat(f.fileno()).st_size)
+
+
+def test_round_trip(tmp_path):
+    payload = bytes(range(256)) * 4
+    path = _artifact(tmp_path, payload, build_record(METADATA))
+
+    metadata, start = _read(path)
+
+    assert metadata == METADATA
+    assert start == len(payload)
+
+
+def test_round_trip_without_payload(tmp_path):
+    path = _artifact(tmp_path, b"", build_record(METADATA))
+
+    assert _read(path) == (METADATA, 0)
+
+
+def test_corrupted_crc_raises(tmp_path):
+    record = bytearray(build_record(METADATA))
+    # Flip a byte of the JSON, leaving the trailer intact.
+    record[5] ^= 0x01
+    path = _artifact(tmp_path, b"payload", bytes(record))
+
+    with pytest.raises(ValueError, match="checksum"):
+        _read(path)
+
+
+def test_unsupported_version_raises(tmp_path):
+    record = bytearray(build_record(METADATA))
+    record[-TRAILER.size : -TRAILER.size + 2] = (99).to_bytes(2, "big")
+    path = _artifact(tmp_path, b"payload", bytes(record))
+
+    with pytest.raises(ValueError, match="version"):
+        _read(path)
+
+
+def test_no_trailer_returns_none(tmp_path):
+    assert _read(_artifact(tmp_path, b"x" * 100, b"")) is None
+    assert _read(_artifact(tmp_path, b"", b"")) is None
+
+
+def test_legacy_artifact_falls_back_to_delimiter(tmp_path):
+    payload = b"\x00\x01" * 500
+    json_bytes = json.dumps(METADATA).encode("utf-8")
+    legacy = DELIMITER + len(json_bytes).to_bytes(4, "big") + json_bytes
+    path = _artifact(tmp_path, payload, legacy)
+    assert _read(path) is None
+
+    remover = Metadata2Remover(CONFIG, path)
+    metadata, start = remover.read_metadata()
+
+    assert metadata == METADATA
+    assert start == len(payload)
+    assert remover.remove_metadata2() == METADATA
+    assert path.read_bytes() == payload
+
+
+def test_remove_metadata2_truncates_trailer(tmp_path):
+    payload = b"payload" * 10
+    path = _artifact(tmp_path, payload, build_record(METADATA))
+
+    assert Metadata2Remover(CONFIG, path).remove_metadata2() == METADATA
+    assert path.read_bytes() == payload
@@ -0,0 +1,49 @@
+from src.encoding.parallel import BATCHES_PER_CHUNK, block_ranges, run_ranges
+
+
+def _span(scale, first, last):
+    return (first * scale, last * scale)
+
+
+def test_block_ranges_cover_everything():
+    assert block_ranges(10, 4) == [(0, 4), (4, 8), (8, 10)]
+    assert block_ranges(0, 4) == []
+
+
+def test_in_process_progress_is_reported_per_batch():
+    calls = []
+    total = 3 * 7 + 2
+
+    results = run_ranges(
+        _span, total, 7, 1, 2, progress=lambda done, n: calls.append((done, n))
+    )
+
+    assert results == [(0, 14), (14, 28), (28, 42), (42, 46)]
+    assert calls == [(7, total), (14, total), (21, total), (total, total)]
+
+
+def test_single_range_with_workers_still_reports_each_batch():
+    calls = []
+    total = 5 * BATCHES_PER_CHUNK - 1
+
+    results = run_ranges(_span, total, 5, 4, 1, progress=lambda d, n: calls.append(d))
+
+    assert [r[1] - r[0] for r in results] == [5] * (BATCHES_PER_CHUNK - 1) + [4]
+    assert len(calls) == BATCHES_PER_CHUNK
+    assert calls[-1] == total
+
+
+def test_process_pool_results_are_in_block_order():
+    calls = []
+    batch = 3
+    total = batch * BATCHES_PER_CHUNK * 3 + 1
+
+    results = run_ranges(
+        _span, total, batch, 2, 1, progress=lambda d, n: calls.append(d)
+    )
+
+    assert results == [
+        _span(1, first, last)
+        for first, last in block_ranges(total, batch * BATCHES_PER_CHUNK)
+    ]
+    assert calls[-1] == total
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+from reedsolo import ReedSolomonError
+
+from pipeline.encode import encode_file
+from src.encoding.checksums import index_size
+from src.encoding.codec_backends import get_backend
+from src.encoding.metadata2_trailer import build_record
+from src.recover.metadata2_remover import Metadata2Remover
+from src.recover.range_reader import RangeRecovery
+from src.recover.rs_decode import correct_codeword, data_codewords
+
+RS = {"nsize": 255, "nsym": 32}
+
+
+@pytest.fixture
+def codeword():
+    codec = get_backend(tuple(sorted(RS.items())), "reedsolo")
+    message = np.frombuffer(os.urandom(223), dtype=np.uint8).reshape(1, -1)
+    return codec, message.tobytes(), codec.encode_blocks(message)[0]
+
+
+def _damage(codeword, positions):
+    damaged = codeword.copy()
+    damaged[positions] ^= 0xFF
+    return damaged.tobytes()
+
+
+def test_correct_codeword_uses_erasures_beyond_half_the_parity(codeword):
+    codec, message, encoded = codeword
+    bad = list(range(0, 250, 9))  # 28 symbols
+    damaged = _damage(encoded, bad)
+
+    with pytest.raises(ReedSolomonError):
+        correct_codeword(codec, damaged)
+    result, corrected, _ = correct_codeword(codec, damaged, bad)
+    assert result == message
+    assert corrected == encoded.tobytes()
+
+
+def test_correct_codeword_combines_erasures_and_errors(codeword):
+    codec, message, encoded = codeword
+    flagged = list(range(20))
+    # 20 erasures and 6 errors outside them: 20 + 2 * 6 <= nsym.
+    damaged = _damage(encoded, flagged + [100, 120, 140, 160, 180, 200])
+
+    assert correct_codeword(codec, damaged, flagged)[0] == message
+
+
+def test_correct_codeword_ignores_too_many_erasures(codeword):
+    codec, message, encoded = codeword
+    damaged = _damage(encoded, [5, 50])
+
+    assert correct_codeword(codec, damaged, list(range(40)))[0] == message
+
+
+def test_data_codewords_matches_payload_size():
+    metadata = {"rs": RS, "size_before_padding": 3 * 255, "payload_size": 223 * 2 + 1}
+
+    assert data_codewords(metadata) == 3
+
+
+def test_data_codewords_without_payload_size():
+    assert data_codewords({"rs": RS, "size_before_padding": 5 * 255}) == 5
+
+
+def test_data_codewords_rejects_a_wrong_payload_size():
+    metadata = {"rs": RS, "size_before_padding": 3 * 255, "payload_size": 223 * 3 + 1}
+
+    with pytest.raises(ValueError, match="payload"):
+        data_codewords(metadata)
+
+
+def test_range_reader_checks_payload_size(config, tmp_path):
+    source = tmp_path / "in.bin"
+    source.write_bytes(os.urandom(20_000))
+    artifact = encode_file(config, source)
+    metadata, record_start = Metadata2Remover(config, artifact).read_metadata()
+    assert RangeRecovery(config, artifact).read(0, 20_000) == source.read_bytes()
+
+    metadata["payload_size"] += 10 * 223
+    json_start = record_start + index_size(metadata)
+    with open(artifact, "r+b") as f:
+        f.truncate(json_start)
+        os.pwrite(f.fileno(), build_record(metadata), json_start)
+
+    with pytest.raises(ValueError, match="payload"):
+        RangeRecovery(config, artifact)
@@ -0,0 +1,146 @@
+import hashlib
+import os
+
+import numpy as np
+import pytest
+
+from pipeline.encode import encode_file
+from pipeline.recover import recover_file
+from src.encoding import rs_encoding
+from src.encoding.checksums import INDEX_DTYPE, compute_index, index_size
+from src.encoding.file_ops import punch_hole
+from src.encoding.sparse import (
+    HOLE_BYTES,
+    data_extents,
+    has_data,
+    page_runs,
+    pwrite_sparse,
+)
+from src.recover.metadata2_remover import Metadata2Remover
+
+MB = 1 << 20
+
+
+def _allocated(path):
+    return os.stat(path).st_blocks * 512
+
+
+@pytest.fixture
+def sparse_file(tmp_path):
+    """A 1 MB file with data in its first and 128th pages only."""
+    path = tmp_path / "sparse.bin"
+    with open(path, "wb") as f:
+        f.write(b"x" * HOLE_BYTES)
+        f.truncate(MB)
+        f.seek(128 * HOLE_BYTES)
+        f.write(b"y" * HOLE_BYTES)
+    if _allocated(path) >= MB:
+        pytest.skip("the filesystem does not keep holes")
+    return path
+
+
+def test_data_extents_skip_holes(sparse_file):
+    with open(sparse_file, "rb") as f:
+        fd = f.fileno()
+        if data_extents(fd, 0, MB) == [(0, MB)]:
+            pytest.skip("SEEK_DATA is not supported")
+
+        assert data_extents(fd, 0, MB) == [
+            (0, HOLE_BYTES),
+            (128 * HOLE_BYTES, 129 * HOLE_BYTES),
+        ]
+        assert data_extents(fd, 100, 128 * HOLE_BYTES + 5) == [
+            (100, HOLE_BYTES),
+            (128 * HOLE_BYTES, 128 * HOLE_BYTES + 5),
+        ]
+        assert data_extents(fd, 2 * HOLE_BYTES, 100 * HOLE_BYTES) == []
+        assert data_extents(fd, 200 * HOLE_BYTES, MB) == []
+
+
+def test_has_data():
+    extents = [(0, 10), (50, 60)]
+
+    assert has_data(extents, 5, 20)
+    assert has_data(extents, 40, 51)
+    assert not has_data(extents, 10, 50)
+    assert not has_data([], 0, 100)
+
+
+def test_page_runs():
+    data = bytes(HOLE_BYTES) + b"a" * HOLE_BYTES + bytes(2 * HOLE_BYTES) + b"b" * 10
+    buf, runs = page_runs(data)
+
+    assert buf.tobytes() == data
+    assert runs == [
+        (0, HOLE_BYTES, False),
+        (HOLE_BYTES, 2 * HOLE_BYTES, True),
+        (2 * HOLE_BYTES, 4 * HOLE_BYTES, False),
+        (4 * HOLE_BYTES, 4 * HOLE_BYTES + 10, True),
+    ]
+    assert page_runs(b"abc")[1] == [(0, 3, True)]
+    assert page_runs(bytes(10))[1] == [(0, 10, False)]
+
+
+def test_pwrite_sparse_leaves_zero_pages_as_holes(tmp_path):
+    data = np.zeros(64 * HOLE_BYTES, dtype=np.uint8)
+    data[:HOLE_BYTES] = 1
+    data[-10:] = 2
+    path = tmp_path / "out.bin"
+    with open(path, "wb") as f:
+        f.truncate(HOLE_BYTES + data.nbytes)
+        written = pwrite_sparse(f.fileno(), data, HOLE_BYTES)
+
+    # The last page is written whole, as it is not all zeros.
+    assert written == 2 * HOLE_BYTES
+    assert path.read_bytes() == bytes(HOLE_BYTES) + data.tobytes()
+    if _allocated(path) >= data.nbytes:
+        pytest.skip("the filesystem does not keep holes")
+    assert _allocated(path) <= 4 * HOLE_BYTES
+
+
+def test_encode_and_recover_a_file_with_a_punched_hole(config, tmp_path, monkeypatch):
+    # Whole segments of codewords then lie in the hole and stay holes.
+    config["encoding"]["interleave_depth"] = 256
+    data = bytearray(os.urandom(2 * MB))
+    hole = (256 * 1024, 256 * 1024 + MB)
+    data[hole[0] : hole[1]] = bytes(MB)
+    source = tmp_path / "in.bin"
+    source.write_bytes(os.urandom(2 * MB))
+    with open(source, "r+b") as f:
+        os.pwrite(f.fileno(), data[: hole[0]], 0)
+        os.pwrite(f.fileno(), data[hole[1] :], hole[1])
+        if not punch_hole(f.fileno(), hole[0], hole[1] - hole[0]):
+            pytest.skip("fallocate cannot punch holes here")
+    assert source.read_bytes() == data
+
+    reads = []
+    read_payload = rs_encoding._read_payload
+
+    def record_reads(fd, offset, length, *args):
+        reads.append((offset, offset + length))
+        return read_payload(fd, offset, length, *args)
+
+    monkeypatch.setattr(rs_encoding, "_read_payload", record_reads)
+    artifact = encode_file(config, source)
+
+    # Batches lying in the hole are not read; they are hashed as zeros.
+    assert reads
+    assert not any(hole[0] <= lo and hi <= hole[1] for lo, hi in reads)
+    metadata, record_start = Metadata2Remover(config, artifact).read_metadata()
+    digest = hashlib.new(metadata["digest"]["algorithm"], data)
+    assert metadata["digest"]["hexdigest"] == digest.hexdigest()
+    with open(artifact, "rb") as f:
+        stored = os.pread(f.fileno(), index_size(metadata), record_start)
+    actual = compute_index(
+        artifact,
+        metadata["padding"],
+        metadata["size_before_padding"],
+        metadata["checksums"]["region"],
+    )
+    assert np.array_equal(np.frombuffer(stored, dtype=INDEX_DTYPE), actual)
+    assert _allocated(artifact) < artifact.stat().st_size - MB // 2
+
+    recovered = recover_file(config, artifact)
+
+    assert recovered.read_bytes() == data
+    assert _allocated(recovered) < len(data) - MB // 2
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from pipeline.encode import encode_file
+from pipeline.verify import repair_file, verify_file
+from src.recover.verifier import ArtifactVerifier
+
+
+@pytest.fixture
+def artifact(config, tmp_path):
+    source = tmp_path / "in.bin"
+    source.write_bytes(os.urandom(200_000))
+    return encode_file(config, source)
+
+
+def _flip(path, offset):
+    with open(path, "r+b") as f:
+        old = os.pread(f.fileno(), 1, offset)
+        os.pwrite(f.fileno(), bytes([old[0] ^ 0xFF]), offset)
+
+
+def _corrupt(config, artifact, codeword, symbols, mirror=False):
+    """
+    Flip ``symbols`` of ``codeword`` in the interleaved data and, with
+    ``mirror``, in the padding copy of the data as well.
+    """
+    verifier = ArtifactVerifier(config, artifact)
+    for symbol in symbols:
+        offset = verifier.layout.symbol_offset(codeword, symbol)
+        _flip(artifact, verifier.data_offset + offset)
+        if mirror and offset < verifier.data_offset:
+            _flip(artifact, offset)
+
+
+def test_clean_artifact_is_healthy(config, artifact):
+    report = verify_file(config, artifact)
+
+    assert report["clean"] == report["codewords"]
+    assert report["correctable"] == report["uncorrectable"] == 0
+    assert report["error_histogram"] == {}
+    assert report["healthy"]
+
+
+def test_verify_counts_symbol_errors(config, artifact):
+    _corrupt(config, artifact, 10, range(3))
+    _corrupt(config, artifact, 20, range(40, 56))
+    _corrupt(config, artifact, 30, range(100, 133))
+    before = artifact.read_bytes()
+
+    report = verify_file(config, artifact)
+
+    assert report["clean"] == report["codewords"] - 3
+    assert report["correctable"] == 2
+    assert report["uncorrectable"] == 1
+    assert report["uncorrectable_codewords"] == [30]
+    assert report["worst_errors"] == 16
+    assert report["error_histogram"] == {"3": 1, "16": 1}
+    assert not report["healthy"]
+    # Verifying never writes to the artifact.
+    assert artifact.read_bytes() == before
+
+
+def test_repair_restores_data_and_padding(config, artifact):
+    original = artifact.read_bytes()
+    verifier = ArtifactVerifier(config, artifact)
+    mirrored = [
+        symbol
+        for symbol in range(12)
+        if verifier.layout.symbol_offset(10, symbol) < verifier.data_offset
+    ]
+    assert 0 < len(mirrored) < 12
+    _corrupt(config, artifact, 10, range(12), mirror=True)
+    _corrupt(config, artifact, 500, range(200, 205))
+    assert (
+        artifact.read_bytes()[: verifier.data_offset]
+        != original[: verifier.data_offset]
+    )
+
+    report = repair_file(config, artifact)
+
+    assert report["correctable"] == 2
+    assert report["symbols_repaired"] == 17
+    assert artifact.read_bytes() == original
+    assert verify_file(config, artifact)["clean"] == report["codewords"]